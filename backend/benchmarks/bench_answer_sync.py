@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compare full-payload autosave with delta sync on a coding assessment.
+
+A candidate works through --questions coding questions, editing the code of
+the current one between autosaves. "save" posts every answer so far to
+POST /api/submissions/{id}/save, as the full-dict autosave does; "sync" posts
+only the operations since the last acknowledgement to .../sync.
+
+Usage: python benchmarks/bench_answer_sync.py [--questions N] [--saves-per-question N] [--code-kb N]
+"""
+
+import argparse
+import json
+import logging
+import statistics
+
+from common import BenchSession, reset_database, make_client, auth_headers, timer
+from models import (
+    User, UserRole, Assessment, AssessmentStatus, Question, QuestionType, Submission, SubmissionStatus
+)
+from services.autosave_buffer import autosave_buffer
+
+
+def seed(question_count):
+    reset_database()
+    db = BenchSession()
+    recruiter = User(email="r@bench.io", username="recruiter", hashed_password="x", role=UserRole.RECRUITER)
+    candidate = User(email="c@bench.io", username="candidate", hashed_password="x", role=UserRole.INTERVIEWEE)
+    db.add_all([recruiter, candidate])
+    db.flush()
+    assessment = Assessment(title="Coding", creator_id=recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db.add(assessment)
+    db.flush()
+    questions = [
+        Question(assessment_id=assessment.id, question_type=QuestionType.CODING, title=f"Q{index}", order=index)
+        for index in range(question_count)
+    ]
+    db.add_all(questions)
+    submission = Submission(assessment_id=assessment.id, interviewee_id=candidate.id, status=SubmissionStatus.IN_PROGRESS)
+    db.add(submission)
+    db.commit()
+    ids = candidate.id, submission.id, [question.id for question in questions]
+    db.close()
+    return ids
+
+
+def edits(question_ids, saves_per_question, code_kb):
+    """(question_id, code) for every autosave, the code growing as the candidate types"""
+    line = "    result = [value * 2 for value in values if value % 3]\n"
+    for question_id in question_ids:
+        for save in range(1, saves_per_question + 1):
+            yield question_id, line * (code_kb * 1024 * save // saves_per_question // len(line) + 1)
+
+
+def run(client, url, headers, payloads):
+    sizes, latencies = [], []
+    for payload in payloads:
+        body = json.dumps(payload)
+        with timer() as elapsed:
+            response = client.post(url, content=body, headers={**headers, "Content-Type": "application/json"})
+        assert response.status_code == 200, response.text
+        sizes.append(len(body))
+        latencies.append(elapsed["elapsed_ms"])
+    return sum(sizes), max(sizes), statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--saves-per-question", type=int, default=10)
+    parser.add_argument("--code-kb", type=int, default=8, help="size of a finished solution")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # Compare request handling, not buffering
+    autosave_buffer.durability = "sync"
+
+    client = make_client()
+    rows = []
+
+    candidate_id, submission_id, question_ids = seed(args.questions)
+    answers = {}
+    full_payloads = []
+    for question_id, code in edits(question_ids, args.saves_per_question, args.code_kb):
+        answers[str(question_id)] = {"code_solution": code}
+        full_payloads.append({"answers": dict(answers)})
+    rows.append(("save", *run(client, f"/api/submissions/{submission_id}/save",
+                             auth_headers(candidate_id), full_payloads)))
+
+    candidate_id, submission_id, question_ids = seed(args.questions)
+    sync_payloads = [
+        {"ops": [{"seq": seq, "question_id": question_id, "code_solution": code}]}
+        for seq, (question_id, code) in enumerate(edits(question_ids, args.saves_per_question, args.code_kb), 1)
+    ]
+    rows.append(("sync", *run(client, f"/api/submissions/{submission_id}/sync",
+                             auth_headers(candidate_id), sync_payloads)))
+
+    print(f"{args.questions} coding questions, {args.saves_per_question} autosaves each, ~{args.code_kb} KB solutions")
+    print(f"{'endpoint':>9} {'total KB':>10} {'max KB':>8} {'p50 ms':>8} {'max ms':>8}")
+    for name, total, largest, p50, worst in rows:
+        print(f"{name:>9} {total / 1024:>10.0f} {largest / 1024:>8.1f} {p50:>8.2f} {worst:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Compare the sync and async request paths under many concurrent polls.
+
+GET /api/notifications runs on the event loop with an AsyncSession. For
+comparison the script registers the previous sync implementation (get_db and
+a sync token lookup, run on the threadpool) at /bench/notifications-sync.
+Both are driven in-process through httpx's ASGI transport with N requests in
+flight at once, using pooled engines configured like the application's.
+
+Point BENCHMARK_DATABASE_URL at a remote PostgreSQL instance to include real
+network round trips; against local SQLite the difference is mostly scheduling.
+
+With more requests in flight than the sync pool has connections, the sync path
+can stall: threadpool workers block waiting for a connection while requests
+that hold one wait for a worker to serialize their response. Those requests
+fail with a pool timeout and are reported in the errors column.
+
+Usage: python benchmarks/bench_async_reads.py [concurrency levels...] [--rounds N] [--pool-timeout S]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from common import BENCHMARK_DATABASE_URL, BenchSession, async_url, reset_database, auth_headers
+import anyio.to_thread
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from typing import List
+from config import get_settings
+from database import engine_options, async_engine_options, get_db, get_async_db
+from models import User, UserRole, Notification
+from schemas import Notification as NotificationSchema
+
+NOTIFICATIONS = 50
+
+settings = get_settings()
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+
+
+def seed():
+    reset_database()
+    db = BenchSession()
+    candidate = User(email="c@bench.io", username="candidate", hashed_password="x", role=UserRole.INTERVIEWEE)
+    db.add(candidate)
+    db.flush()
+    db.add_all([
+        Notification(user_id=candidate.id, title=f"Notification {index}", message="Your assessment is ready")
+        for index in range(NOTIFICATIONS)
+    ])
+    db.commit()
+    candidate_id = candidate.id
+    db.close()
+    return candidate_id
+
+
+def sync_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+    payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    user = db.query(User).filter(User.id == int(payload["sub"])).first()
+    if user is None:
+        raise HTTPException(status_code=401)
+    return user
+
+
+def get_notifications_sync(current_user=Depends(sync_current_user), db=Depends(get_db)):
+    return db.query(Notification).filter(
+        Notification.user_id == current_user.id
+    ).order_by(Notification.created_at.desc()).limit(100).all()
+
+
+def with_pool_timeout(options, pool_timeout):
+    if options.get("poolclass") is NullPool:
+        return options
+    return {**options, "pool_timeout": pool_timeout}
+
+
+def build_app(pool_timeout):
+    from main import app
+
+    sqlite = BENCHMARK_DATABASE_URL.startswith("sqlite")
+    sync_engine = create_engine(
+        BENCHMARK_DATABASE_URL,
+        connect_args={"check_same_thread": False} if sqlite else {},
+        **with_pool_timeout(engine_options(settings), pool_timeout)
+    )
+    sync_sessions = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    async_sessions = async_sessionmaker(
+        create_async_engine(async_url(), **with_pool_timeout(async_engine_options(settings), pool_timeout)),
+        autoflush=False, expire_on_commit=False
+    )
+
+    def override_get_db():
+        db = sync_sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with async_sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.add_api_route("/bench/notifications-sync", get_notifications_sync,
+                      response_model=List[NotificationSchema])
+    return app
+
+
+async def run(client, path, headers, concurrency, rounds):
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        if response.status_code != 200:
+            errors += 1
+            return
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": latencies[max(int(len(latencies) * 0.95) - 1, 0)] if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("levels", nargs="*", type=int, default=[50, 200, 500])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--pool-timeout", type=float, default=5,
+                        help="seconds a request may wait for a pooled connection")
+    args = parser.parse_args()
+
+    headers = auth_headers(seed())
+    app = build_app(args.pool_timeout)
+    threads = anyio.to_thread.current_default_thread_limiter().total_tokens
+    print(f"threadpool size: {threads}")
+    print(f"{'concurrency':>11} {'path':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/bench/notifications-sync", "/api/notifications"):
+            await client.get(path, headers=headers)  # warm up pools
+        for concurrency in args.levels:
+            for name, path in (("sync", "/bench/notifications-sync"), ("async", "/api/notifications")):
+                result = await run(client, path, headers, concurrency, args.rounds)
+                print(f"{concurrency:>11} {name:>6} {result['throughput']:>9.1f} "
+                      f"{result['p50']:>9.1f} {result['p95']:>9.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
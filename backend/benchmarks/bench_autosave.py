@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Benchmark POST /api/submissions/{id}/save for a 40-question assessment.
+
+A candidate autosaves every few seconds but changes only an answer or two
+in between. "before" is the previous handler body, which deleted every answer
+and inserted them all again; "after" is answer_store.save_answers, which
+upserts the changed answers and turns unchanged ones into no-ops; "endpoint"
+is the full request, including authentication and the response.
+
+WAL bytes per save are read from pg_current_wal_lsn() and only reported on
+PostgreSQL (set BENCHMARK_DATABASE_URL); SQLite shows latency and rows written.
+
+The peak section replays an exam window: --candidates candidates each
+autosave every 3 seconds for --rounds rounds, through the /save endpoint, with the
+autosave buffer in "sync" mode and in "buffered" mode flushing once a second.
+It counts database transactions and checks every final answer arrived.
+
+Usage: python benchmarks/bench_autosave.py [--questions N] [--saves N] [--changed N]
+                                           [--candidates N] [--rounds N]
+"""
+
+import argparse
+import logging
+import statistics
+
+from sqlalchemy import event, text
+
+from common import BenchSession, engine, reset_database, make_client, auth_headers, timer
+from database import engine as app_engine
+from services import answer_store
+from services.autosave_buffer import autosave_buffer
+from models import (
+    User, UserRole, Assessment, AssessmentStatus, Question, QuestionType, Submission, SubmissionStatus, Answer
+)
+
+
+def seed(question_count):
+    reset_database()
+    db = BenchSession()
+    recruiter = User(email="r@bench.io", username="recruiter", hashed_password="x", role=UserRole.RECRUITER)
+    candidate = User(email="c@bench.io", username="candidate", hashed_password="x", role=UserRole.INTERVIEWEE)
+    db.add_all([recruiter, candidate])
+    db.flush()
+    assessment = Assessment(title="Autosave", creator_id=recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db.add(assessment)
+    db.flush()
+    questions = [
+        Question(assessment_id=assessment.id, question_type=QuestionType.SUBJECTIVE, title=f"Q{index}", order=index)
+        for index in range(question_count)
+    ]
+    db.add_all(questions)
+    submission = Submission(assessment_id=assessment.id, interviewee_id=candidate.id, status=SubmissionStatus.IN_PROGRESS)
+    db.add(submission)
+    db.commit()
+    ids = candidate.id, submission.id, [question.id for question in questions]
+    db.close()
+    return ids
+
+
+def payloads(question_ids, saves, changed):
+    """Each save edits `changed` answers of an essay that grows as the candidate types"""
+    answers = {str(question_id): "An answer that is a few sentences long. " * 10 for question_id in question_ids}
+    for save in range(saves):
+        for offset in range(changed):
+            question_id = str(question_ids[(save + offset) % len(question_ids)])
+            answers[question_id] += f"Edit {save}. "
+        yield {"answers": dict(answers)}
+
+
+def run_legacy(submission_id, payload):
+    """The body of save_answers before it upserted"""
+    db = BenchSession()
+    try:
+        db.query(Answer).filter(Answer.submission_id == submission_id).delete()
+        for question_id, answer_text in payload.get("answers", {}).items():
+            db.add(Answer(submission_id=submission_id, question_id=int(question_id), answer_text=answer_text))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_upsert(submission_id, payload):
+    db = BenchSession()
+    try:
+        answer_store.save_answers(db, submission_id, payload.get("answers", {}))
+        db.commit()
+    finally:
+        db.close()
+
+
+def wal_position():
+    if engine.dialect.name != "postgresql":
+        return None
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT pg_current_wal_lsn()")).scalar()
+
+
+def wal_bytes(start, end):
+    if start is None:
+        return None
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT pg_wal_lsn_diff(:end, :start)"), {"start": start, "end": end}).scalar()
+
+
+def measure(save, saves_payloads):
+    saves_payloads = list(saves_payloads)
+    # The first save of a session inserts every answer; time the steady state after it
+    save(saves_payloads[0])
+    latencies, wal = [], []
+    for payload in saves_payloads[1:]:
+        start = wal_position()
+        with timer() as elapsed:
+            save(payload)
+        latencies.append(elapsed["elapsed_ms"])
+        wal.append(wal_bytes(start, wal_position()))
+    wal_per_save = statistics.mean(wal) if wal[0] is not None else None
+    return statistics.median(latencies), max(latencies), wal_per_save
+
+
+def seed_cohort(candidate_count, question_count):
+    reset_database()
+    db = BenchSession()
+    recruiter = User(email="r@bench.io", username="recruiter", hashed_password="x", role=UserRole.RECRUITER)
+    db.add(recruiter)
+    db.flush()
+    assessment = Assessment(title="Exam window", creator_id=recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db.add(assessment)
+    db.flush()
+    questions = [
+        Question(assessment_id=assessment.id, question_type=QuestionType.SUBJECTIVE, title=f"Q{index}", order=index)
+        for index in range(question_count)
+    ]
+    db.add_all(questions)
+    sessions = []
+    for index in range(candidate_count):
+        candidate = User(email=f"c{index}@bench.io", username=f"c{index}", hashed_password="x",
+                         role=UserRole.INTERVIEWEE)
+        db.add(candidate)
+        db.flush()
+        submission = Submission(assessment_id=assessment.id, interviewee_id=candidate.id,
+                                status=SubmissionStatus.IN_PROGRESS)
+        db.add(submission)
+        db.flush()
+        sessions.append((auth_headers(candidate.id), submission.id))
+    db.commit()
+    question_ids = [question.id for question in questions]
+    db.close()
+    return sessions, question_ids
+
+
+def peak(client, candidate_count, question_count, rounds, durability):
+    """Transactions for `rounds` autosaves per candidate, saves every 3 s, flushes every 1 s"""
+    sessions, question_ids = seed_cohort(candidate_count, question_count)
+    autosave_buffer.durability = durability
+    commits = []
+
+    def listener(conn):
+        commits.append(conn)
+
+    # Requests use the benchmark engine, background flushes the application's own
+    engines = (engine, app_engine)
+    for counted in engines:
+        event.listen(counted, "commit", listener)
+    try:
+        with timer() as elapsed:
+            for save in range(rounds):
+                # Each candidate has answered one more question since their last autosave
+                answers = {str(question_ids[done % question_count]): f"Round {done}" for done in range(save + 1)}
+                for index, (headers, submission_id) in enumerate(sessions):
+                    response = client.post(f"/api/submissions/{submission_id}/save", headers=headers,
+                                           json={"answers": answers})
+                    assert response.status_code == 200, response.text
+                    # Three flush intervals pass while every candidate saves once
+                    if index % max(1, candidate_count // 3) == 0:
+                        autosave_buffer.flush()
+            autosave_buffer.flush()
+    finally:
+        for counted in engines:
+            event.remove(counted, "commit", listener)
+
+    db = BenchSession()
+    final = {(a.submission_id, a.question_id): a.answer_text for a in db.query(Answer)}
+    db.close()
+    expected = {
+        (submission_id, question_ids[save % question_count]): f"Round {save}"
+        for _, submission_id in sessions for save in range(rounds)
+    }
+    return len(commits), elapsed["elapsed_ms"], final == expected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--saves", type=int, default=50)
+    parser.add_argument("--changed", type=int, default=1, help="answers edited between two autosaves")
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    autosave_buffer.durability = "sync"
+    candidate_id, submission_id, question_ids = seed(args.questions)
+    client = make_client()
+    headers = auth_headers(candidate_id)
+
+    def save(payload):
+        response = client.post(f"/api/submissions/{submission_id}/save", json=payload, headers=headers)
+        assert response.status_code == 200, response.text
+
+    def clear_answers():
+        db = BenchSession()
+        db.query(Answer).delete()
+        db.commit()
+        db.close()
+
+    rows = []
+    for name, handler, written in (
+        ("before", lambda payload: run_legacy(submission_id, payload), 2 * args.questions),
+        ("after", lambda payload: run_upsert(submission_id, payload), args.changed),
+        ("endpoint", save, args.changed),
+    ):
+        clear_answers()
+        rows.append((name, *measure(handler, payloads(question_ids, args.saves, args.changed)), written))
+    print(f"{args.questions} questions, {args.changed} changed answer(s) per save, {args.saves} saves")
+    print(f"{'handler':>9} {'p50 ms':>9} {'max ms':>9} {'WAL bytes/save':>15} {'rows written':>13}")
+    for name, p50, worst, wal, written in rows:
+        wal_column = f"{wal:>15.0f}" if wal is not None else f"{'n/a':>15}"
+        print(f"{name:>9} {p50:>9.2f} {worst:>9.2f} {wal_column} {written:>13}")
+
+    print(f"\npeak: {args.candidates} candidates x {args.rounds} autosaves, {args.questions} questions")
+    print(f"{'mode':>9} {'transactions':>13} {'total ms':>9} {'final answers intact':>21}")
+    for durability in ("sync", "buffered"):
+        transactions, total_ms, intact = peak(client, args.candidates, args.questions, args.rounds, durability)
+        print(f"{durability:>9} {transactions:>13} {total_ms:>9.0f} {str(intact):>21}")
+
+
+if __name__ == "__main__":
+    main()
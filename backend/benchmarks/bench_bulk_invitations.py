@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Benchmark POST /api/invitations/bulk for a large cohort.
+
+Compares the previous per-candidate loop (two lookups, an ORM add and a
+refresh per invitation) with the set-based endpoint and its streaming mode.
+
+Usage: python benchmarks/bench_bulk_invitations.py [cohort sizes...] [--legacy-max N]
+"""
+
+import argparse
+import json
+
+from common import BenchSession, reset_database, make_client, auth_headers, count_queries, timer
+from models import User, UserRole, Assessment, Invitation, Notification
+
+
+def seed(cohort_size):
+    reset_database()
+    db = BenchSession()
+    recruiter = User(email="r@bench.io", username="recruiter", hashed_password="x", role=UserRole.RECRUITER)
+    db.add(recruiter)
+    db.flush()
+    assessment = Assessment(title="Campus Cohort", creator_id=recruiter.id)
+    db.add(assessment)
+    db.execute(User.__table__.insert(), [
+        {"email": f"c{index}@bench.io", "username": f"c{index}", "hashed_password": "x", "role": UserRole.INTERVIEWEE}
+        for index in range(cohort_size)
+    ])
+    db.commit()
+    candidate_ids = [row.id for row in db.query(User.id).filter(User.role == UserRole.INTERVIEWEE)]
+    ids = recruiter.id, assessment.id
+    db.close()
+    return ids, candidate_ids
+
+
+def clear_invitations():
+    db = BenchSession()
+    db.query(Notification).delete()
+    db.query(Invitation).delete()
+    db.commit()
+    db.close()
+
+
+def run_legacy(assessment_id, candidate_ids):
+    """The loop create_bulk_invitations used before it became set-based"""
+    db = BenchSession()
+    try:
+        assessment = db.query(Assessment).filter(Assessment.id == assessment_id).first()
+        invitations = []
+        for interviewee_id in candidate_ids:
+            interviewee = db.query(User).filter(User.id == interviewee_id).first()
+            if not interviewee or interviewee.role != UserRole.INTERVIEWEE:
+                continue
+            existing = db.query(Invitation).filter(
+                Invitation.assessment_id == assessment_id,
+                Invitation.interviewee_id == interviewee_id
+            ).first()
+            if existing:
+                continue
+            invitation = Invitation(assessment_id=assessment_id, interviewee_id=interviewee_id)
+            db.add(invitation)
+            invitations.append(invitation)
+            db.add(Notification(
+                user_id=interviewee_id,
+                title="New Assessment Invitation",
+                message=f"You have been invited to take the assessment: {assessment.title}",
+                notification_type="invitation",
+                related_id=assessment_id
+            ))
+        db.commit()
+        for invitation in invitations:
+            db.refresh(invitation)
+        return len(invitations)
+    finally:
+        db.close()
+
+
+def run_stream(client, headers, payload):
+    response = client.post("/api/invitations/bulk?stream=true", headers=headers, json=payload)
+    return json.loads(response.text.splitlines()[-1])["created"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[1000, 10000])
+    parser.add_argument("--legacy-max", type=int, default=2000,
+                        help="skip the per-candidate loop above this cohort size")
+    args = parser.parse_args()
+
+    client = make_client()
+    print(f"{'cohort':>7} {'strategy':>9} {'created':>8} {'statements':>11} {'latency ms':>11}")
+    for size in args.sizes:
+        (recruiter_id, assessment_id), candidate_ids = seed(size)
+        headers = auth_headers(recruiter_id)
+        payload = {"assessment_id": assessment_id, "interviewee_ids": candidate_ids}
+
+        strategies = [
+            ("bulk", lambda: len(client.post("/api/invitations/bulk", headers=headers, json=payload).json())),
+            ("stream", lambda: run_stream(client, headers, payload)),
+        ]
+        if size <= args.legacy_max:
+            strategies.insert(0, ("legacy", lambda: run_legacy(assessment_id, candidate_ids)))
+
+        for name, run in strategies:
+            clear_invitations()
+            with count_queries() as statements, timer() as elapsed:
+                created = run()
+            print(f"{size:>7} {name:>9} {created:>8} {len(statements):>11} {elapsed['elapsed_ms']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
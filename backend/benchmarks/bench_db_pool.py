@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Load test the application's connection pool.
+
+Runs CONCURRENCY threads that each repeatedly check out a connection, hold it
+for the given time (pg_sleep on PostgreSQL, a client-side sleep elsewhere) and
+return it. Reports throughput, checkout waits and 'QueuePool limit' timeouts.
+Pool settings come from the usual DB_POOL_* environment variables.
+
+Usage: DATABASE_URL=postgresql://... python benchmarks/bench_db_pool.py [--concurrency N] [--hold-ms N] [--iterations N]
+"""
+
+import argparse
+import threading
+import time
+
+import common  # noqa: F401  (path and environment setup)
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from config import get_settings
+from database import SessionLocal, engine, get_pool_status
+
+
+def worker(iterations, hold_seconds, results):
+    is_postgres = engine.dialect.name == "postgresql"
+    for _ in range(iterations):
+        db = SessionLocal()
+        try:
+            if is_postgres:
+                db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": hold_seconds})
+            else:
+                db.execute(text("SELECT 1"))
+                time.sleep(hold_seconds)
+            results["ok"] += 1
+        except PoolTimeoutError:
+            results["timeouts"] += 1
+        except Exception as e:
+            results["errors"] += 1
+            results["last_error"] = str(e)
+        finally:
+            db.close()
+
+
+def main():
+    settings = get_settings()
+    capacity = settings.db_pool_size + settings.db_max_overflow
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=capacity * 2,
+                        help="defaults to twice pool_size + max_overflow")
+    parser.add_argument("--hold-ms", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {"ok": 0, "timeouts": 0, "errors": 0, "last_error": None}
+    threads = [
+        threading.Thread(target=worker, args=(args.iterations, args.hold_ms / 1000, results))
+        for _ in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    status = get_pool_status()
+    print(f"pool: {status['pool_class']} size={settings.db_pool_size} overflow={settings.db_max_overflow} "
+          f"timeout={settings.db_pool_timeout}s pgbouncer={settings.db_use_pgbouncer}")
+    print(f"concurrency={args.concurrency} hold={args.hold_ms}ms iterations={args.iterations}")
+    print(f"completed={results['ok']} timeouts={results['timeouts']} errors={results['errors']} "
+          f"throughput={results['ok'] / elapsed:.1f}/s")
+    print(f"checkout wait avg={status['avg_wait_ms']}ms max={status['max_wait_ms']}ms connects={status['connects']}")
+    if results["last_error"]:
+        print(f"last error: {results['last_error']}")
+
+
+if __name__ == "__main__":
+    main()
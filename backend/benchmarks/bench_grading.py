@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Benchmark auto-grading.
+
+"database" grades one submission of a --questions question assessment the
+way submit_assessment used to (walking submission.answers and lazy-loading
+each answer's question) and with grading.grade_submission, counting SQL
+statements. "pure" grades --submissions in-memory submissions with
+grading.grade_answers against a compiled key.
+
+Usage: python benchmarks/bench_grading.py [--questions N] [--submissions N]
+"""
+
+import argparse
+import random
+
+from common import BenchSession, reset_database, count_queries, timer
+from models import (
+    User, UserRole, Assessment, Question, QuestionType, Submission, SubmissionStatus, Answer
+)
+from services import grading
+
+OPTIONS = ["A", "B", "C", "D", "E"]
+
+
+def make_question(index, assessment_id=None):
+    if index % 2:
+        return Question(assessment_id=assessment_id, question_type=QuestionType.MULTIPLE_ANSWER, title=f"Q{index}",
+                        points=10, order=index, options=OPTIONS, correct_answers=["A", "C"])
+    return Question(assessment_id=assessment_id, question_type=QuestionType.MULTIPLE_CHOICE, title=f"Q{index}",
+                    points=10, order=index, options=OPTIONS, correct_answer="B")
+
+
+def random_answer(rng, question_type):
+    if question_type == QuestionType.MULTIPLE_ANSWER:
+        return None, rng.sample(OPTIONS, rng.randint(1, 3))
+    return rng.choice(OPTIONS), None
+
+
+def seed(question_count):
+    reset_database()
+    rng = random.Random(1)
+    db = BenchSession()
+    recruiter = User(email="r@bench.io", username="recruiter", hashed_password="x", role=UserRole.RECRUITER)
+    candidate = User(email="c@bench.io", username="candidate", hashed_password="x", role=UserRole.INTERVIEWEE)
+    db.add_all([recruiter, candidate])
+    db.flush()
+    assessment = Assessment(title="Quiz", creator_id=recruiter.id)
+    db.add(assessment)
+    db.flush()
+    questions = [make_question(index, assessment.id) for index in range(question_count)]
+    db.add_all(questions)
+    submission = Submission(assessment_id=assessment.id, interviewee_id=candidate.id, status=SubmissionStatus.IN_PROGRESS)
+    db.add(submission)
+    db.flush()
+    for question in questions:
+        answer_text, selected = random_answer(rng, question.question_type)
+        db.add(Answer(submission_id=submission.id, question_id=question.id,
+                      answer_text=answer_text, selected_answers=selected))
+    db.commit()
+    submission_id = submission.id
+    db.close()
+    return submission_id
+
+
+def grade_legacy(db, submission):
+    """The loop submit_assessment used before the grading engine"""
+    total_score = 0.0
+    for answer in submission.answers:
+        question = answer.question
+        if question.question_type == QuestionType.MULTIPLE_CHOICE:
+            if answer.answer_text == question.correct_answer:
+                answer.is_correct = True
+                answer.points_earned = question.points
+                total_score += question.points
+            else:
+                answer.is_correct = False
+                answer.points_earned = 0
+    db.flush()
+    return total_score
+
+
+def measure_database(submission_id, grade):
+    db = BenchSession()
+    try:
+        submission = db.get(Submission, submission_id)
+        submission.assessment  # loaded by submit_assessment either way
+        with count_queries() as statements, timer() as elapsed:
+            grade(db, submission)
+        db.rollback()
+        return len(statements), elapsed["elapsed_ms"]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--submissions", type=int, default=10000)
+    args = parser.parse_args()
+
+    submission_id = seed(args.questions)
+    grading.answer_keys.clear()
+    measure_database(submission_id, grading.grade_submission)  # compile and cache the key
+    print(f"one submission, {args.questions} questions")
+    print(f"{'grader':>8} {'statements':>11} {'ms':>8}")
+    for name, grade in (("before", grade_legacy), ("engine", grading.grade_submission)):
+        statements, elapsed_ms = measure_database(submission_id, grade)
+        print(f"{name:>8} {statements:>11} {elapsed_ms:>8.2f}")
+
+    rng = random.Random(2)
+    questions = [make_question(index) for index in range(args.questions)]
+    for index, question in enumerate(questions, 1):
+        question.id = index
+    key = grading.compile_key(questions)
+    submissions = [
+        [(question.id, *random_answer(rng, question.question_type)) for question in questions]
+        for _ in range(args.submissions)
+    ]
+    with timer() as elapsed:
+        scores = [sum(result.points_earned for result in grading.grade_answers(key, answers)) for answers in submissions]
+    rate = args.submissions / (elapsed["elapsed_ms"] / 1000)
+    print(f"\npure: {args.submissions} submissions in {elapsed['elapsed_ms']:.0f} ms "
+          f"({rate:,.0f} submissions/s, mean score {sum(scores) / len(scores):.1f})")
+
+
+if __name__ == "__main__":
+    main()
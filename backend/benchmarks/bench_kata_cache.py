@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Compare kata lookups before and after the kata cache.
+
+"before" is the previous client: a bare requests.get per lookup, so a fresh
+connection every time. "after" is CodewarsService: the first lookup goes to the
+network, repeats come from the in-process LRU, and a new process (empty LRU)
+reads the kata_cache table.
+
+By default the API is a local stub that adds --latency-ms before answering, to
+stand in for the round trip to Codewars; pass --real to use the live API.
+
+Usage: python benchmarks/bench_kata_cache.py [--lookups N] [--latency-ms MS] [--real]
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from common import BenchSession, reset_database
+
+KATA_ID = "5266876b8f4bf2da9b000362"
+
+
+def start_stub(latency_ms):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency_ms / 1000)
+            body = json.dumps({"id": KATA_ID, "name": "Likes vs Dislikes", "description": "x" * 2000}).encode()
+            self.send_response(200)
+            self.send_header("ETag", '"bench"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def measure(lookup, lookups):
+    latencies = []
+    for _ in range(lookups):
+        start = time.perf_counter()
+        lookup()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--real", action="store_true", help="query api.codewars.com instead of a local stub")
+    args = parser.parse_args()
+
+    from config import get_settings
+    from services.codewars_service import CodewarsService, KataCache
+
+    reset_database()
+    base_url = get_settings().codewars_base_url if args.real else start_stub(args.latency_ms)
+
+    def uncached():
+        requests.get(f"{base_url}/code-challenges/{KATA_ID}", timeout=10).json()
+
+    service = CodewarsService(base_url, KataCache(BenchSession))
+    print(f"{'path':>14} {'p50 ms':>9} {'max ms':>9}")
+    rows = [("before", *measure(uncached, args.lookups))]
+    rows.append(("first lookup", *measure(lambda: service.get_kata_by_id(KATA_ID), 1)))
+    rows.append(("memory", *measure(lambda: service.get_kata_by_id(KATA_ID), args.lookups)))
+
+    def from_database():
+        service.cache.clear_memory()
+        service.get_kata_by_id(KATA_ID)
+
+    rows.append(("database", *measure(from_database, args.lookups)))
+    for name, p50, worst in rows:
+        print(f"{name:>14} {p50:>9.3f} {worst:>9.3f}")
+    print(f"network requests made by the cached service: {service.network_requests}")
+
+
+if __name__ == "__main__":
+    main()
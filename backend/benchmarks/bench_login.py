@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Measure login throughput and how a login storm affects other requests.
+
+"before" is the previous sync login (bcrypt on the request threadpool) mounted
+at /bench/login-sync; "after" is POST /api/auth/login, which verifies in the
+dedicated hashing pool. While the logins run, a probe keeps calling /health
+(a sync handler) so the table also shows how long other requests wait for a
+threadpool worker.
+
+Usage: python benchmarks/bench_login.py [--logins N] [--concurrency N] [--cost N]
+                                        [--executor thread|process] [--workers N]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--logins", type=int, default=200)
+parser.add_argument("--concurrency", type=int, default=100)
+parser.add_argument("--cost", type=int, help="bcrypt rounds (BCRYPT_ROUNDS)")
+parser.add_argument("--executor", choices=["thread", "process"], help="PASSWORD_HASH_EXECUTOR")
+parser.add_argument("--workers", type=int, help="PASSWORD_HASH_WORKERS")
+args = parser.parse_args()
+
+# Settings are read on first import, so apply overrides before importing the app
+if args.cost:
+    os.environ["BCRYPT_ROUNDS"] = str(args.cost)
+if args.executor:
+    os.environ["PASSWORD_HASH_EXECUTOR"] = args.executor
+if args.workers:
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+
+import common  # noqa: E402
+from common import BenchSession, AsyncBenchSession, reset_database  # noqa: E402
+
+
+def seed():
+    from auth import get_password_hash
+    from models import User, UserRole
+
+    reset_database()
+    db = BenchSession()
+    db.add(User(
+        email="c@bench.io",
+        username="candidate",
+        hashed_password=get_password_hash("password123"),
+        role=UserRole.INTERVIEWEE
+    ))
+    db.commit()
+    db.close()
+
+
+def build_app():
+    from fastapi import Depends, HTTPException
+    from fastapi.security import OAuth2PasswordRequestForm
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
+    from auth import verify_password, create_access_token
+    from database import get_db, get_async_db
+    from models import User
+    from main import app
+
+    # Unpooled so the sync path is limited by bcrypt, not by waiting for connections
+    sync_sessions = sessionmaker(bind=create_engine(
+        common.BENCHMARK_DATABASE_URL, poolclass=NullPool,
+        connect_args={"check_same_thread": False} if common.BENCHMARK_DATABASE_URL.startswith("sqlite") else {}
+    ))
+
+    def override_get_db():
+        db = sync_sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncBenchSession() as db:
+            yield db
+
+    def login_sync(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_db)):
+        user = db.query(User).filter(User.username == form_data.username).first()
+        if not user or not verify_password(form_data.password, user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {"access_token": create_access_token({"sub": str(user.id)}), "token_type": "bearer"}
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.add_api_route("/bench/login-sync", login_sync, methods=["POST"])
+    return app
+
+
+async def storm(client, path, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async def login():
+        async with semaphore:
+            response = await client.post(path, data={"username": "candidate", "password": "password123"})
+            response.raise_for_status()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/health")
+            probe_latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.01)
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+
+    probe_latencies.sort()
+    return {
+        "throughput": logins / elapsed,
+        "probe_p50": statistics.median(probe_latencies) if probe_latencies else 0.0,
+        "probe_max": probe_latencies[-1] if probe_latencies else 0.0,
+    }
+
+
+async def main():
+    import httpx
+    from config import get_settings
+
+    settings = get_settings()
+    seed()
+    app = build_app()
+    cores = os.cpu_count() or 1
+    print(f"bcrypt rounds={settings.bcrypt_rounds} executor={settings.password_hash_executor} "
+          f"workers={settings.password_hash_workers or cores} cores={cores}")
+    print(f"{'path':>7} {'logins/s':>9} {'per core':>9} {'/health p50 ms':>15} {'/health max ms':>15}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, path in (("before", "/bench/login-sync"), ("after", "/api/auth/login")):
+            result = await storm(client, path, args.logins, args.concurrency)
+            print(f"{name:>7} {result['throughput']:>9.1f} {result['throughput'] / cores:>9.1f} "
+                  f"{result['probe_p50']:>15.1f} {result['probe_max']:>15.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Benchmark GET /api/analytics/question-analysis as the question count grows.
+
+Usage: python benchmarks/bench_question_analysis.py [question counts...]
+"""
+
+import sys
+
+from common import BenchSession, reset_database, make_client, auth_headers, count_queries, timer
+from models import (
+    User, UserRole, Assessment, AssessmentStatus, Question, QuestionType,
+    Submission, SubmissionStatus, Answer
+)
+
+ANSWERS_PER_QUESTION = 20
+
+
+def seed(question_count):
+    reset_database()
+    db = BenchSession()
+    recruiter = User(email="r@bench.io", username="recruiter", hashed_password="x", role=UserRole.RECRUITER)
+    db.add(recruiter)
+    db.flush()
+    candidates = [
+        User(email=f"c{i}@bench.io", username=f"c{i}", hashed_password="x", role=UserRole.INTERVIEWEE)
+        for i in range(ANSWERS_PER_QUESTION)
+    ]
+    db.add_all(candidates)
+    assessment = Assessment(title="Bench", creator_id=recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db.add(assessment)
+    db.flush()
+
+    questions = []
+    for index in range(question_count):
+        question_type = QuestionType.CODING if index % 2 else QuestionType.MULTIPLE_CHOICE
+        questions.append(Question(
+            assessment_id=assessment.id,
+            question_type=question_type,
+            title=f"Question {index}",
+            points=10,
+            options=["A", "B", "C"],
+            correct_answer="A"
+        ))
+    db.add_all(questions)
+    db.flush()
+
+    for candidate_index, candidate in enumerate(candidates):
+        submission = Submission(
+            assessment_id=assessment.id,
+            interviewee_id=candidate.id,
+            status=SubmissionStatus.GRADED
+        )
+        db.add(submission)
+        db.flush()
+        db.add_all([
+            Answer(
+                submission_id=submission.id,
+                question_id=question.id,
+                answer_text="ABC"[candidate_index % 3],
+                code_solution="def solution():\n    return 42\n" * (candidate_index % 4 + 1),
+                points_earned=10 if candidate_index % 3 == 0 else 0
+            )
+            for question in questions
+        ])
+    db.commit()
+    recruiter_id = recruiter.id
+    db.close()
+    return recruiter_id
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 100, 500]
+    client = make_client()
+
+    print(f"{'questions':>10} {'answers':>10} {'queries':>8} {'latency ms':>11}")
+    for question_count in counts:
+        recruiter_id = seed(question_count)
+        headers = auth_headers(recruiter_id)
+        client.get("/api/analytics/question-analysis", headers=headers)  # warm up
+
+        with count_queries() as statements, timer() as elapsed:
+            response = client.get("/api/analytics/question-analysis", headers=headers)
+        response.raise_for_status()
+
+        print(f"{question_count:>10} {question_count * ANSWERS_PER_QUESTION:>10} "
+              f"{len(statements):>8} {elapsed['elapsed_ms']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Benchmark regrading an assessment after its answer key changes.
+
+Seeds --submissions graded submissions of a --questions question assessment,
+flips the correct answer of one question, then regrades:
+
+  before  one submission at a time, as repeated grade_submission calls and a
+          commit each would; run on the first --legacy-max submissions and
+          extrapolated
+  after   grading.regrade_chunks: chunked, one batched UPDATE per chunk for the
+          answers and one set-based UPDATE for the scores
+
+Usage: python benchmarks/bench_regrade.py [--submissions N] [--questions N] [--chunk-size N] [--legacy-max N]
+"""
+
+import argparse
+import random
+
+from sqlalchemy import insert, select
+
+from common import BenchSession, reset_database, count_queries, timer
+from models import (
+    User, UserRole, Assessment, Question, QuestionType, Submission, SubmissionStatus, Answer
+)
+from services import grading
+
+OPTIONS = ["A", "B", "C", "D"]
+
+
+def seed(submission_count, question_count):
+    reset_database()
+    rng = random.Random(1)
+    db = BenchSession()
+    recruiter = User(email="r@bench.io", username="recruiter", hashed_password="x", role=UserRole.RECRUITER)
+    candidate = User(email="c@bench.io", username="candidate", hashed_password="x", role=UserRole.INTERVIEWEE)
+    db.add_all([recruiter, candidate])
+    db.flush()
+    assessment = Assessment(title="Large cohort", creator_id=recruiter.id)
+    db.add(assessment)
+    db.flush()
+    questions = [
+        Question(assessment_id=assessment.id, question_type=QuestionType.MULTIPLE_CHOICE, title=f"Q{index}",
+                 points=10, order=index, options=OPTIONS, correct_answer="A")
+        for index in range(question_count)
+    ]
+    db.add_all(questions)
+    db.flush()
+    for start in range(0, submission_count, 5000):
+        count = min(5000, submission_count - start)
+        # Graded against the original key, where "A" is always right
+        choices = [[rng.choice(OPTIONS) for _ in questions] for _ in range(count)]
+        submission_ids = db.scalars(insert(Submission).returning(Submission.id), [
+            {"assessment_id": assessment.id, "interviewee_id": candidate.id, "status": SubmissionStatus.SUBMITTED,
+             "score": 10.0 * picked.count("A")}
+            for picked in choices
+        ]).all()
+        db.execute(insert(Answer), [
+            {"submission_id": submission_id, "question_id": question.id, "answer_text": choice,
+             "is_correct": choice == "A", "points_earned": 10.0 if choice == "A" else 0.0}
+            for submission_id, picked in zip(submission_ids, choices)
+            for question, choice in zip(questions, picked)
+        ])
+    db.commit()
+    ids = assessment.id, questions[0].id
+    db.close()
+    return ids
+
+
+def change_key(assessment_id, question_id):
+    db = BenchSession()
+    assessment = db.get(Assessment, assessment_id)
+    db.get(Question, question_id).correct_answer = "B"
+    grading.invalidate(assessment)
+    db.commit()
+    db.close()
+
+
+def run_legacy(assessment_id, limit):
+    db = BenchSession()
+    try:
+        submission_ids = db.scalars(
+            select(Submission.id).filter(Submission.assessment_id == assessment_id).order_by(Submission.id).limit(limit)
+        ).all()
+        for submission_id in submission_ids:
+            submission = db.get(Submission, submission_id)
+            submission.score = grading.grade_submission(db, submission)
+            db.commit()
+        return len(submission_ids)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=50000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=grading.REGRADE_CHUNK_SIZE)
+    parser.add_argument("--legacy-max", type=int, default=2000)
+    args = parser.parse_args()
+
+    assessment_id, question_id = seed(args.submissions, args.questions)
+    change_key(assessment_id, question_id)
+    with count_queries() as statements, timer() as elapsed:
+        graded = run_legacy(assessment_id, min(args.legacy_max, args.submissions))
+    legacy_ms = elapsed["elapsed_ms"] * args.submissions / graded
+    legacy_statements = len(statements) * args.submissions // graded
+
+    # Same data again, so the chunked regrade has the full amount of work to do
+    assessment_id, question_id = seed(args.submissions, args.questions)
+    change_key(assessment_id, question_id)
+    db = BenchSession()
+    with count_queries() as statements, timer() as elapsed:
+        report = grading.regrade_assessment(db, db.get(Assessment, assessment_id), args.chunk_size)
+    db.close()
+
+    print(f"{args.submissions} submissions x {args.questions} questions, one correct answer changed")
+    print(f"{'regrade':>8} {'statements':>11} {'seconds':>9}")
+    print(f"{'before':>8} {legacy_statements:>11} {legacy_ms / 1000:>9.1f}  (extrapolated from {graded})")
+    print(f"{'after':>8} {len(statements):>11} {elapsed['elapsed_ms'] / 1000:>9.1f}")
+    print(f"answers changed: {report['answers_changed']}, submissions rescored: {report['submissions_changed']}")
+
+
+if __name__ == "__main__":
+    main()
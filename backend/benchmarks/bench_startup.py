@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Time from launching uvicorn until GET /health answers.
+
+Codewars is pointed at an address that never answers (--codewars-url), the
+worst case for a cold start. Columns:
+
+  legacy fetch  the 20 sequential, timeout-less requests.get calls the old
+                import-time seed() made before uvicorn could serve
+  seed          python seed_katas.py now: concurrent fetches, then the snapshot
+  ready         uvicorn start until /health answers; nothing is seeded
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--codewars-url URL]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from common import BACKEND_DIR, BENCHMARK_DATABASE_URL, reset_database
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def environment(codewars_url):
+    return dict(
+        os.environ,
+        DATABASE_URL=BENCHMARK_DATABASE_URL,
+        CODEWARS_BASE_URL=codewars_url,
+        EMAIL_TRANSPORT="memory",
+    )
+
+
+def time_server_ready(env, timeout=120):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("server did not become ready")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def time_seed(env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "seed_katas.py"], cwd=BACKEND_DIR, env=env,
+                   stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def time_legacy_fetch(codewars_url, timeout):
+    import requests
+    from seed_katas import SEED_KATA_IDS
+
+    start = time.perf_counter()
+    for kata_id in SEED_KATA_IDS:
+        try:
+            requests.get(f"{codewars_url}/code-challenges/{kata_id}", timeout=timeout)
+        except requests.exceptions.RequestException:
+            pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--codewars-url", default="http://10.255.255.1/api/v1",
+                        help="unroutable by default, so every fetch waits for its timeout")
+    parser.add_argument("--legacy-timeout", type=float, default=5,
+                        help="cap each legacy fetch (the old code had none and waited for the OS)")
+    args = parser.parse_args()
+
+    env = environment(args.codewars_url)
+    print(f"{'run':>4} {'legacy fetch s':>15} {'seed s':>8} {'ready s':>8}")
+    for run in range(1, args.runs + 1):
+        legacy_seconds = time_legacy_fetch(args.codewars_url, args.legacy_timeout)
+        reset_database()
+        seed_seconds = time_seed(env)
+        reset_database()
+        ready_seconds = time_server_ready(env)
+        print(f"{run:>4} {legacy_seconds:>15.2f} {seed_seconds:>8.2f} {ready_seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Compare GET /api/submissions loading strategies.
+
+Reports database rows fetched, bytes read from the database, response bytes
+and latency for the old nested-joinedload query, the summary listing and the
+?detail=full listing.
+
+Usage: python benchmarks/bench_submission_list.py [sizes...] [--questions N] [--legacy-max N]
+"""
+
+import argparse
+import json
+
+from common import BenchSession, engine, reset_database, make_client, auth_headers, timer
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+from pydantic import TypeAdapter
+from typing import List
+from models import (
+    User, UserRole, Assessment, AssessmentStatus, Question, QuestionType,
+    Submission, SubmissionStatus, Answer
+)
+from schemas import SubmissionWithDetails
+
+
+def seed(submission_count, question_count):
+    reset_database()
+    db = BenchSession()
+    recruiter = User(email="r@bench.io", username="recruiter", hashed_password="x", role=UserRole.RECRUITER)
+    candidate = User(email="c@bench.io", username="candidate", hashed_password="x", role=UserRole.INTERVIEWEE)
+    db.add_all([recruiter, candidate])
+    db.flush()
+    assessment = Assessment(title="Bench", creator_id=recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db.add(assessment)
+    db.flush()
+    questions = [
+        Question(
+            assessment_id=assessment.id,
+            question_type=QuestionType.CODING,
+            title=f"Question {index}",
+            description="Implement the function described below. " * 10,
+            points=10
+        )
+        for index in range(question_count)
+    ]
+    db.add_all(questions)
+    db.flush()
+    question_ids = [q.id for q in questions]
+
+    submission_rows = [
+        {"assessment_id": assessment.id, "interviewee_id": candidate.id, "status": SubmissionStatus.SUBMITTED}
+        for _ in range(submission_count)
+    ]
+    db.execute(Submission.__table__.insert(), submission_rows)
+    submission_ids = [row.id for row in db.query(Submission.id).all()]
+    db.execute(Answer.__table__.insert(), [
+        {
+            "submission_id": submission_id,
+            "question_id": question_id,
+            "code_solution": "def solve(values):\n    return sorted(values)\n" * 5,
+            "points_earned": 0.0
+        }
+        for submission_id in submission_ids
+        for question_id in question_ids
+    ])
+    db.commit()
+    recruiter_id = recruiter.id
+    db.close()
+    return recruiter_id
+
+
+def replay(statements):
+    """Re-run captured SELECTs to count the rows and bytes they return"""
+    rows = 0
+    size = 0
+    with engine.connect() as conn:
+        raw = conn.connection.dbapi_connection.cursor()
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            raw.execute(statement, parameters)
+            for row in raw.fetchall():
+                rows += 1
+                size += sum(len(str(value)) for value in row if value is not None)
+    return rows, size
+
+
+class Capture:
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+
+def run_legacy(limit, recruiter_id):
+    db = BenchSession()
+    try:
+        query = db.query(Submission).options(
+            joinedload(Submission.answers).joinedload(Answer.question),
+            joinedload(Submission.assessment).joinedload(Assessment.questions),
+            joinedload(Submission.interviewee)
+        ).join(Assessment).filter(Assessment.creator_id == recruiter_id)
+        submissions = query.limit(limit).all()
+        payload = TypeAdapter(List[SubmissionWithDetails]).dump_python(submissions, mode="json")
+        return len(json.dumps(payload))
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[100, 1000, 10000])
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--legacy-max", type=int, default=1000,
+                        help="skip the joinedload strategy above this many submissions")
+    args = parser.parse_args()
+
+    client = make_client()
+    print(f"{'submissions':>11} {'strategy':>10} {'db rows':>10} {'db bytes':>12} {'resp bytes':>12} {'latency ms':>11}")
+    for size in args.sizes:
+        recruiter_id = seed(size, args.questions)
+        headers = auth_headers(recruiter_id)
+        strategies = [
+            ("summary", lambda: len(client.get(f"/api/submissions?limit={size}", headers=headers).content)),
+            ("full", lambda: len(client.get(f"/api/submissions?limit={size}&detail=full", headers=headers).content)),
+        ]
+        if size <= args.legacy_max:
+            strategies.insert(0, ("joinedload", lambda: run_legacy(size, recruiter_id)))
+
+        for name, run in strategies:
+            with Capture() as capture, timer() as elapsed:
+                response_bytes = run()
+            rows, size_bytes = replay(capture.statements)
+            print(f"{size:>11} {name:>10} {rows:>10} {size_bytes:>12} {response_bytes:>12} {elapsed['elapsed_ms']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Shared setup for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database by default. Set
+BENCHMARK_DATABASE_URL to point them at a PostgreSQL instance instead.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+_default_url = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'smart_recruiter_bench.db')}"
+BENCHMARK_DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL", _default_url)
+
+os.environ.setdefault("DATABASE_URL", BENCHMARK_DATABASE_URL)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+connect_args = {"check_same_thread": False} if BENCHMARK_DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(BENCHMARK_DATABASE_URL, connect_args=connect_args)
+BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def async_url():
+    from database import async_database_url
+
+    return async_database_url(BENCHMARK_DATABASE_URL)
+
+
+# TestClient may run each request on its own event loop, so async connections are not pooled
+async_engine = create_async_engine(async_url(), poolclass=NullPool)
+AsyncBenchSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def reset_database():
+    """Drop and recreate every table"""
+    from database import Base
+    from services.user_cache import user_cache
+    import models  # noqa: F401
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    user_cache.clear()
+
+
+def make_client():
+    """Return a TestClient whose database dependencies point at the benchmark database"""
+    from fastapi.testclient import TestClient
+    from database import get_db, get_async_db
+    from main import app
+
+    def override_get_db():
+        db = BenchSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncBenchSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return TestClient(app)
+
+
+def auth_headers(user_id):
+    from auth import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+@contextmanager
+def count_queries():
+    """Collect every SQL statement issued while the block runs"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def timer():
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["elapsed_ms"] = (time.perf_counter() - start) * 1000
@@ -14,6 +14,89 @@ class Settings(BaseSettings):
     email_sender: str = ""
     email_password: str = ""
     sendgrid_api_key: str = ""
+    # "sendgrid", "console" or "memory"; defaults to sendgrid when an API key is set
+    email_transport: str = ""
+    # Token bucket shared by all email API calls from this process
+    email_rate_limit_per_second: float = 10.0
+    email_rate_limit_burst: int = 20
+
+    # Email outbox delivery
+    email_outbox_workers: int = 2
+    email_outbox_batch_size: int = 20
+    email_outbox_poll_interval: float = 2.0
+    email_outbox_max_attempts: int = 8
+    email_outbox_lease_seconds: int = 120
+
+    # Assessment reminders
+    reminder_batch_size: int = 200
+    # Upper bound on the scheduler's sleep, so reminders added by other
+    # processes are noticed even when nothing is due sooner
+    reminder_max_sleep_seconds: float = 60.0
+
+    # Only one process runs the reminder scheduler; the others wait on this
+    # PostgreSQL advisory lock and take over if the leader goes away
+    scheduler_lock_id: int = 72_001
+    scheduler_standby_interval: float = 15.0
+    # Session-level advisory locks (scheduler leader, migrations) need a direct
+    # connection; set this when DATABASE_URL points at a transaction-mode PgBouncer
+    scheduler_lock_database_url: str = ""
+
+    # Answer autosave. "sync" writes every save in its own transaction;
+    # "buffered" coalesces saves in memory and writes them in batches, so a
+    # crash loses at most one flush interval; "journal" also appends each save
+    # to a local file that is replayed after a crash. The buffered modes need
+    # every request of a submission on the same process (one worker, or
+    # sticky routing), because submit only flushes its own process, so they
+    # are opt-in.
+    autosave_durability: str = "sync"
+    autosave_flush_interval_ms: int = 1000
+    autosave_max_entries: int = 500
+    autosave_journal_dir: str = "autosave_journal"
+
+    # Auto-grading. Multiple answer questions earn partial credit for a
+    # partly right selection unless this is off (then it is all or nothing).
+    multiple_answer_partial_credit: bool = True
+    answer_key_cache_size: int = 256
+
+    # Database connection pools. Each worker has a sync and an async engine,
+    # so it can open up to db_pool_size + db_max_overflow +
+    # db_async_pool_size + db_async_max_overflow connections; keep that times
+    # the worker count under the server's max_connections.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # The async engine only serves the hot read endpoints
+    db_async_pool_size: int = 2
+    db_async_max_overflow: int = 3
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Behind PgBouncer in transaction mode, let the bouncer do the pooling
+    db_use_pgbouncer: bool = False
+
+    # Password hashing. Hashes made with a different cost are upgraded at login.
+    bcrypt_rounds: int = 12
+    # "thread" or "process"; workers defaults to the CPU count
+    password_hash_executor: str = "thread"
+    password_hash_workers: int = 0
+
+    # Authenticated user cache
+    user_cache_ttl: int = 60
+    user_cache_size: int = 10000
+    # e.g. redis://localhost:6379/0 to share the cache between workers
+    user_cache_url: str = ""
+
+    # Codewars API client and kata cache
+    codewars_connect_timeout: float = 3.05
+    codewars_read_timeout: float = 10.0
+    codewars_pool_size: int = 10
+    # Overall deadline for fetching several katas at once; slower ones are left out
+    codewars_search_timeout: float = 10.0
+    # Kata content rarely changes; after this long a cached kata is revalidated with its ETag
+    kata_cache_ttl: int = 7 * 24 * 3600
+    kata_cache_size: int = 2000
+    # Seed the Codewars question bank in the background after startup.
+    # Off by default; run `python seed_katas.py` as a release step instead.
+    seed_katas_on_startup: bool = False
     
     class Config:
         env_file = os.path.join(os.path.dirname(__file__), '.env')
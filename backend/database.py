@@ -1,19 +1,167 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
 from config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(settings.database_url)
+_metrics_lock = threading.Lock()
+pool_metrics = {
+    "connects": 0,
+    "checkouts": 0,
+    "invalidations": 0,
+    "timeouts": 0,
+    "total_wait_ms": 0.0,
+    "max_wait_ms": 0.0,
+}
+
+
+def _increment(name, amount=1):
+    with _metrics_lock:
+        pool_metrics[name] += amount
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _increment("timeouts")
+            raise
+        finally:
+            waited = (time.perf_counter() - start) * 1000
+            with _metrics_lock:
+                pool_metrics["total_wait_ms"] += waited
+                pool_metrics["max_wait_ms"] = max(pool_metrics["max_wait_ms"], waited)
+
+
+def engine_options(settings):
+    """Pool configuration for the configured database"""
+    if settings.database_url.startswith("sqlite"):
+        return {}
+    if settings.db_use_pgbouncer:
+        return {"poolclass": NullPool, "pool_pre_ping": settings.db_pool_pre_ping}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def async_database_url(database_url):
+    """Map the configured database URL onto its asyncio driver (asyncpg or aiosqlite)"""
+    url = make_url(database_url.replace("postgres://", "postgresql://", 1))
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+
+    url = url.set(drivername="postgresql+asyncpg")
+    # asyncpg takes ``ssl`` rather than libpq's ``sslmode``
+    if "sslmode" in url.query:
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+
+def async_engine_options(settings):
+    """Pool configuration for the asyncio engine, mirroring engine_options"""
+    if settings.database_url.startswith("sqlite"):
+        return {}
+    if settings.db_use_pgbouncer:
+        # Transaction-mode PgBouncer cannot keep asyncpg's prepared statements
+        return {
+            "poolclass": NullPool,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "connect_args": {"statement_cache_size": 0},
+        }
+    return {
+        "pool_size": settings.db_async_pool_size,
+        "max_overflow": settings.db_async_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+engine = create_engine(settings.database_url, **engine_options(settings))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(async_database_url(settings.database_url), **async_engine_options(settings))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    _increment("connects")
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _increment("checkouts")
+
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    _increment("invalidations")
+
+
+def get_pool_status():
+    """Snapshot of pool occupancy and checkout metrics"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "timeout": pool.timeout(),
+        })
+    with _metrics_lock:
+        metrics = dict(pool_metrics)
+    metrics["avg_wait_ms"] = round(metrics["total_wait_ms"] / metrics["checkouts"], 3) if metrics["checkouts"] else 0.0
+    metrics["total_wait_ms"] = round(metrics["total_wait_ms"], 3)
+    metrics["max_wait_ms"] = round(metrics["max_wait_ms"], 3)
+    status.update(metrics)
+    return status
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async counterpart of get_db for handlers that run on the event loop.
+
+    Objects loaded here are detached once the request finishes, so relationships
+    must be eager loaded and changes must be made through a session of their own.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def dialect_insert(db, model):
+    """Return an INSERT for the session's backend that supports ON CONFLICT clauses"""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
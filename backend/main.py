@@ -1,8 +1,8 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
-from database import engine, Base
+from database import engine, get_db, get_pool_status
 from config import get_settings
 from routers import (
     auth,
@@ -14,10 +14,17 @@ from routers import (
     users,
     analytics,
 )
-from services.notification_scheduler import start_scheduler, stop_scheduler
+from services.notification_scheduler import notification_scheduler, start_scheduler, stop_scheduler
+from services.user_cache import user_cache
+from services.email_outbox import outbox_workers
+from services.autosave_buffer import autosave_buffer
+from auth import shutdown_password_executor
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 import asyncio
 import logging
 import os
+import time
 
 settings = get_settings()
 
@@ -25,110 +32,15 @@ settings = get_settings()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
+# Apply pending migrations; a single SELECT when the schema is current
 try:
-    # Run migration first
     from migrate import upgrade
 
-    upgrade()
-    logger.info("Database migration completed")
+    applied = upgrade()
+    logger.info(f"Database migration completed ({applied} step(s) applied)")
 except Exception as e:
     logger.error(f"Migration failed: {e}")
 
-try:
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created")
-except Exception as e:
-    logger.error(f"Failed to create tables: {e}")
-
-# Add new columns and normalize data BEFORE seeding
-try:
-    import psycopg2
-    from psycopg2 import OperationalError
-
-    try:
-        conn = psycopg2.connect(settings.database_url)
-        cursor = conn.cursor()
-
-        # Verify hashed_password column exists and add if missing
-        cursor.execute("""
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_name = 'users' AND column_name = 'hashed_password';
-        """)
-        hashed_password_exists = cursor.fetchone() is not None
-
-        if not hashed_password_exists:
-            print(
-                "⚠️  hashed_password column missing from users table. Adding it now..."
-            )
-            try:
-                cursor.execute("""
-                    ALTER TABLE users
-                    ADD COLUMN hashed_password VARCHAR(255) NOT NULL DEFAULT 'temp_hash_please_reset';
-                """)
-                conn.commit()
-                print("✅ hashed_password column added successfully")
-            except Exception as e:
-                print(f"❌ Failed to add hashed_password: {e}")
-                conn.rollback()
-        else:
-            print("✅ hashed_password column exists")
-
-        # Add correct_answers column to questions table
-        try:
-            cursor.execute(
-                "ALTER TABLE questions ADD COLUMN IF NOT EXISTS correct_answers JSONB;"
-            )
-            conn.commit()
-            print("✅ correct_answers column check done")
-        except Exception as e:
-            print(f"❌ correct_answers column issue: {e}")
-
-        # Add selected_answers column to answers table
-        try:
-            cursor.execute(
-                "ALTER TABLE answers ADD COLUMN IF NOT EXISTS selected_answers JSONB;"
-            )
-            conn.commit()
-            print("✅ selected_answers column check done")
-        except Exception as e:
-            print(f"❌ selected_answers column issue: {e}")
-
-        # Fix existing invalid role values in users table
-        try:
-            cursor.execute(
-                "UPDATE users SET role = 'INTERVIEWEE' WHERE role IN ('interviewee', 'user', 'candidate', 'field_agent');"
-            )
-            cursor.execute(
-                "UPDATE users SET role = 'RECRUITER' WHERE role = 'recruiter';"
-            )
-            conn.commit()
-            print("✅ Invalid role values fixed")
-        except Exception as e:
-            print(f"❌ Role values issue: {e}")
-
-        conn.close()
-        print("🎉 Database schema update completed")
-    except OperationalError as e:
-        logger.warning(f"Could not connect to database for schema update: {e}")
-    except Exception as e:
-        logger.error(f"Database schema update failed: {e}")
-
-except ImportError as e:
-    logger.warning(f"psycopg2 not available for schema update: {e}")
-except Exception as e:
-    logger.error(f"Unexpected error during schema update: {e}")
-
-# Seed database with assessments
-try:
-    from seed_katas import seed
-
-    seed()
-    logger.info("Database seeding completed")
-except Exception as e:
-    logger.error(f"Seeding failed: {e}")
-
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = "uploads"
 if not os.path.exists(UPLOAD_DIR):
@@ -199,6 +111,38 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/db")
+def database_health_check():
+    """Check database connectivity and report connection pool metrics"""
+    start = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"Database health check failed: {e}")
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "error": str(e), "pool": get_pool_status()},
+        )
+    return {
+        "status": "healthy",
+        "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        "pool": get_pool_status(),
+    }
+
+
+@app.get("/health/cache")
+def cache_health_check():
+    """Report authenticated user cache hit/miss counters"""
+    return user_cache.stats()
+
+
+@app.get("/health/scheduler")
+def scheduler_health_check(db: Session = Depends(get_db)):
+    """Report which process leads the notification scheduler and when it last ran"""
+    return notification_scheduler.status(db)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Start the notification scheduler when the app starts"""
@@ -208,12 +152,36 @@ async def startup_event():
         logger.info("Notification scheduler started successfully")
     except Exception as e:
         logger.error(f"Failed to start notification scheduler: {e}")
+    try:
+        await outbox_workers.start()
+    except Exception as e:
+        logger.error(f"Failed to start email outbox workers: {e}")
+    try:
+        await autosave_buffer.start()
+    except Exception as e:
+        logger.error(f"Failed to start autosave buffer: {e}")
+    if settings.seed_katas_on_startup:
+        # Deferred so the API serves requests while katas are fetched
+        app.state.seed_task = asyncio.create_task(seed_in_background())
+
+
+async def seed_in_background():
+    from seed_katas import seed
+
+    try:
+        await asyncio.to_thread(seed)
+        logger.info("Database seeding completed")
+    except Exception as e:
+        logger.error(f"Seeding failed: {e}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop the notification scheduler when the app shuts down"""
     logger.info("Shutting down Smart Recruiter API...")
+    shutdown_password_executor()
+    await outbox_workers.stop()
+    await autosave_buffer.stop()
     try:
         await stop_scheduler()
         logger.info("Notification scheduler stopped successfully")
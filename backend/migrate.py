@@ -1,52 +1,249 @@
-"""Add missing columns to users table"""
+"""Versioned schema migrations.
 
-from sqlalchemy import text, inspect
+MIGRATIONS is an ordered list of steps. Each one runs once, in its own
+transaction, which also records it in the schema_version table. The table
+also stores a fingerprint of the models' DDL, so a model change that only
+adds tables or indexes is picked up without a numbered step.
+
+When the stored version and fingerprint are current, upgrade() is a single
+SELECT. Otherwise it takes a PostgreSQL advisory lock, so that of several
+workers booting at once only one migrates and the rest wait and then skip.
+
+Usage: python migrate.py
+"""
+
+import hashlib
+from contextlib import contextmanager
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, create_engine, func, inspect, select, text, update
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateIndex, CreateTable
+from config import get_settings
 from database import engine, Base
+import models  # noqa: F401  (registers tables on Base.metadata)
+
+settings = get_settings()
+
+MIGRATION_LOCK_ID = 72_000
+
+# Kept off Base.metadata so it is not part of the models' fingerprint
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("fingerprint", String, nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), onupdate=func.now()),
+)
+
+
+def _add_missing_columns(conn, table: str, columns: dict):
+    """ALTER TABLE ... ADD COLUMN for each column the table does not have yet"""
+    existing = {column["name"] for column in inspect(conn).get_columns(table)}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def legacy_user_columns(conn):
+    """Columns missing from users tables created before the current model"""
+    _add_missing_columns(conn, "users", {
+        "hashed_password": "VARCHAR(255) NOT NULL DEFAULT 'invalid_hash_placeholder'",
+        "profile_picture": "VARCHAR(255)",
+        "role": "VARCHAR(50) DEFAULT 'interviewee'",
+        "is_active": "BOOLEAN DEFAULT true",
+        "created_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+        "updated_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+    })
+
+
+def multiple_answer_columns(conn):
+    """JSON lists of correct and selected options for MULTIPLE_ANSWER questions"""
+    _add_missing_columns(conn, "questions", {"correct_answers": "JSON"})
+    _add_missing_columns(conn, "answers", {"selected_answers": "JSON"})
 
 
-def upgrade():
-    # First create all tables if they don't exist
-    Base.metadata.create_all(bind=engine)
-
-    with engine.connect() as conn:
-        # Check if users table exists
-        inspector = inspect(engine)
-        if "users" not in inspector.get_table_names():
-            print("Users table does not exist, tables created from models")
-            return
-
-        # Add missing columns if they don't exist
-        conn.execute(
-            text("""
-            ALTER TABLE users
-            ADD COLUMN IF NOT EXISTS hashed_password VARCHAR(255) NOT NULL DEFAULT 'invalid_hash_placeholder',
-            ADD COLUMN IF NOT EXISTS profile_picture VARCHAR(255),
-            ADD COLUMN IF NOT EXISTS role VARCHAR(50) DEFAULT 'interviewee',
-            ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT true,
-            ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
-        """)
+def normalize_roles(conn):
+    conn.execute(text(
+        "UPDATE users SET role = 'INTERVIEWEE' WHERE role IN ('interviewee', 'user', 'candidate', 'field_agent')"
+    ))
+    conn.execute(text("UPDATE users SET role = 'RECRUITER' WHERE role = 'recruiter'"))
+
+
+def deduplicate_invitations(conn):
+    """Duplicates would block the unique (assessment_id, interviewee_id) index"""
+    removed = conn.execute(text("""
+        DELETE FROM invitations
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM invitations GROUP BY assessment_id, interviewee_id
         )
-        conn.commit()
+    """)).rowcount
+    if removed:
+        print(f"Removed {removed} duplicate invitation(s)")
+
+
+def email_outbox_batches(conn):
+    """Batch messages store their recipients as JSON and leave to_email NULL"""
+    _add_missing_columns(conn, "email_outbox", {"recipients": "JSON"})
+    # SQLite cannot drop NOT NULL; its tables are recreated from the models instead
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE email_outbox ALTER COLUMN to_email DROP NOT NULL"))
+
+
+def backfill_assessment_stats(conn):
+    from services import assessment_stats
+
+    rebuilt = assessment_stats.rebuild_all(Session(bind=conn))
+    print(f"Built statistics for {rebuilt} assessment(s)")
+
+
+def backfill_reminders(conn):
+    """Invitations accepted before reminders were scheduled on acceptance"""
+    from services import reminders
+
+    scheduled = reminders.backfill(Session(bind=conn))
+    if scheduled:
+        print(f"Scheduled {scheduled} assessment reminder(s)")
 
-        # Normalize legacy role values
-        conn.execute(
-            text("""
-            UPDATE users
-            SET role = 'INTERVIEWEE'
-            WHERE role IN ('interviewee', 'user', 'candidate', 'field_agent');
-        """)
+
+def load_kata_snapshot(conn):
+    from services import kata_catalog
+
+    loaded = kata_catalog.load_snapshot(Session(bind=conn))
+    if loaded:
+        print(f"Loaded {loaded} kata(s) into the catalog")
+
+
+def deduplicate_answers(conn):
+    """Keep the newest answer per question, so the unique (submission_id, question_id) index can be built"""
+    _add_missing_columns(conn, "answers", {"content_hash": "VARCHAR(64)"})
+    # Feedback on a duplicate moves to the answer that is kept
+    conn.execute(text("""
+        UPDATE feedbacks
+        SET answer_id = (
+            SELECT MAX(kept.id) FROM answers AS kept, answers AS duplicate
+            WHERE duplicate.id = feedbacks.answer_id
+              AND kept.submission_id = duplicate.submission_id
+              AND kept.question_id = duplicate.question_id
         )
-        conn.execute(
-            text("""
-            UPDATE users
-            SET role = 'RECRUITER'
-            WHERE role = 'recruiter';
-        """)
+        WHERE answer_id IS NOT NULL
+    """))
+    removed = conn.execute(text("""
+        DELETE FROM answers
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM answers GROUP BY submission_id, question_id
         )
+    """)).rowcount
+    if removed:
+        print(f"Removed {removed} duplicate answer(s)")
+
+
+def submission_sync_seq(conn):
+    _add_missing_columns(conn, "submissions", {"sync_seq": "INTEGER NOT NULL DEFAULT 0"})
+
+
+def assessment_answer_key_version(conn):
+    _add_missing_columns(conn, "assessments", {"answer_key_version": "INTEGER NOT NULL DEFAULT 0"})
+
+
+# Append new steps at the end; never renumber or edit a released one
+MIGRATIONS = [
+    (1, "add legacy users columns", legacy_user_columns),
+    (2, "add multiple-answer columns", multiple_answer_columns),
+    (3, "normalize legacy role values", normalize_roles),
+    (4, "remove duplicate invitations", deduplicate_invitations),
+    (5, "store email outbox batches", email_outbox_batches),
+    (6, "backfill assessment statistics", backfill_assessment_stats),
+    (7, "schedule reminders for accepted invitations", backfill_reminders),
+    (8, "load the bundled kata catalog snapshot", load_kata_snapshot),
+    (9, "hash answers and remove duplicates", deduplicate_answers),
+    (10, "track answer sync sequence numbers", submission_sync_seq),
+    (11, "version assessment answer keys", assessment_answer_key_version),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_fingerprint(dialect) -> str:
+    """Hash of the DDL the models would create; changes whenever a table, column or index does"""
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            statements.append(str(CreateIndex(index).compile(dialect=dialect)))
+    return hashlib.sha256("\n".join(statements).encode()).hexdigest()[:16]
+
+
+def current_version(bind):
+    """(version, fingerprint) recorded in the database, or (0, None) before the first run"""
+    with bind.connect() as conn:
+        try:
+            row = conn.execute(select(schema_version.c.version, schema_version.c.fingerprint)).first()
+        except Exception:
+            return 0, None
+    return (row.version, row.fingerprint) if row else (0, None)
+
+
+@contextmanager
+def migration_lock(bind):
+    """Serialize migrations across processes with a session-level advisory lock"""
+    if bind.dialect.name != "postgresql":
+        yield
+        return
+    # A transaction-mode PgBouncer cannot hold a session lock; use the direct URL if there is one
+    lock_engine = (
+        create_engine(settings.scheduler_lock_database_url, poolclass=NullPool)
+        if settings.scheduler_lock_database_url else bind
+    )
+    with lock_engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
         conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+            conn.commit()
+
+
+def upgrade(bind=engine) -> int:
+    """Bring the schema up to date; returns how many numbered steps ran"""
+    fingerprint = schema_fingerprint(bind.dialect)
+    if current_version(bind) == (LATEST_VERSION, fingerprint):
+        return 0
+
+    with migration_lock(bind):
+        # Another process may have finished while this one waited for the lock
+        version, stored_fingerprint = current_version(bind)
+        if (version, stored_fingerprint) == (LATEST_VERSION, fingerprint):
+            return 0
+
+        with bind.begin() as conn:
+            schema_version.create(conn, checkfirst=True)
+            if conn.execute(select(schema_version.c.id)).first() is None:
+                conn.execute(schema_version.insert().values(id=1, version=0, fingerprint=""))
+            # New tables; tables that already exist are left alone
+            Base.metadata.create_all(bind=conn)
+
+        applied = 0
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+            print(f"Migration {number}: {description}")
+            with bind.begin() as conn:
+                step(conn)
+                conn.execute(update(schema_version).values(version=number))
+            applied += 1
+
+        with bind.begin() as conn:
+            # create_all skips indexes on tables that already exist
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
+            conn.execute(update(schema_version).values(fingerprint=fingerprint))
+        return applied
 
 
 if __name__ == "__main__":
-    upgrade()
-    print("Migration completed successfully")
+    applied = upgrade()
+    print(f"Migration completed successfully ({applied} step(s) applied, schema version {LATEST_VERSION})")
@@ -9,9 +9,10 @@ from sqlalchemy import (
     JSON,
     Enum as SQLEnum,
     Float,
+    Index,
 )
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from database import Base
 import enum
 
@@ -48,6 +49,19 @@ class SubmissionStatus(str, enum.Enum):
     GRADED = "graded"
 
 
+class EmailStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class ReminderStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    SKIPPED = "skipped"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -73,6 +87,10 @@ class User(Base):
 
 class Assessment(Base):
     __tablename__ = "assessments"
+    __table_args__ = (
+        Index("ix_assessments_created_at_id", "created_at", "id"),
+        Index("ix_assessments_creator_created_at_id", "creator_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -87,6 +105,8 @@ class Assessment(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     published_at = Column(DateTime(timezone=True))
+    # Bumped when questions change, so cached answer keys are rebuilt
+    answer_key_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     creator = relationship(
@@ -101,6 +121,47 @@ class Assessment(Base):
     submissions = relationship(
         "Submission", back_populates="assessment", cascade="all, delete-orphan"
     )
+    stats = relationship(
+        "AssessmentStats",
+        back_populates="assessment",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+
+
+class AssessmentStats(Base):
+    """Running submission totals per assessment, maintained incrementally"""
+
+    __tablename__ = "assessment_stats"
+
+    assessment_id = Column(
+        Integer, ForeignKey("assessments.id", ondelete="CASCADE"), primary_key=True
+    )
+    submission_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    graded_count = Column(Integer, nullable=False, default=0)
+
+    # Raw scores of completed submissions
+    score_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_min = Column(Float)
+    score_max = Column(Float)
+
+    # Score percentages of graded submissions with a positive max score
+    percent_count = Column(Integer, nullable=False, default=0)
+    score_percent_sum = Column(Float, nullable=False, default=0.0)
+    pass_count = Column(Integer, nullable=False, default=0)
+
+    # Time taken (seconds) of completed submissions
+    time_taken_count = Column(Integer, nullable=False, default=0)
+    time_taken_sum = Column(Float, nullable=False, default=0.0)
+    time_taken_min = Column(Integer)
+    time_taken_max = Column(Integer)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    assessment = relationship("Assessment", back_populates="stats")
 
 
 class Question(Base):
@@ -137,6 +198,12 @@ class Question(Base):
 
 class Invitation(Base):
     __tablename__ = "invitations"
+    __table_args__ = (
+        Index("ix_invitations_assessment_invited_at_id", "assessment_id", "invited_at", "id"),
+        Index("ix_invitations_interviewee_invited_at_id", "interviewee_id", "invited_at", "id"),
+        # One invitation per candidate per assessment; bulk inserts rely on it for ON CONFLICT
+        Index("uq_invitations_assessment_interviewee", "assessment_id", "interviewee_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     assessment_id = Column(Integer, ForeignKey("assessments.id"), nullable=False)
@@ -154,6 +221,10 @@ class Invitation(Base):
 
 class Submission(Base):
     __tablename__ = "submissions"
+    __table_args__ = (
+        Index("ix_submissions_assessment_created_at_id", "assessment_id", "created_at", "id"),
+        Index("ix_submissions_interviewee_created_at_id", "interviewee_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     assessment_id = Column(Integer, ForeignKey("assessments.id"), nullable=False)
@@ -165,6 +236,8 @@ class Submission(Base):
     submitted_at = Column(DateTime(timezone=True))
     graded_at = Column(DateTime(timezone=True))
     time_taken = Column(Integer)  # in seconds
+    # Highest answer-sync operation applied; the client resends anything after it
+    sync_seq = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -182,6 +255,10 @@ class Submission(Base):
 
 class Answer(Base):
     __tablename__ = "answers"
+    __table_args__ = (
+        # One answer per question per submission; autosave upserts rely on it for ON CONFLICT
+        Index("uq_answers_submission_question", "submission_id", "question_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     submission_id = Column(Integer, ForeignKey("submissions.id"), nullable=False)
@@ -195,6 +272,7 @@ class Answer(Base):
     code_solution = Column(Text)  # For coding questions
     bdd_text = Column(Text)  # BDD for coding questions
     pseudocode = Column(Text)  # Pseudocode for coding questions
+    content_hash = Column(String(64))  # Hash of the content above; unchanged autosaves skip the write
 
     # Grading
     is_correct = Column(Boolean)
@@ -230,6 +308,9 @@ class Feedback(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -239,3 +320,104 @@ class Notification(Base):
     notification_type = Column(String)  # invitation, feedback, grade_released, etc.
     related_id = Column(Integer)  # ID of related entity (assessment, submission, etc.)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class EmailOutbox(Base):
+    """Outgoing email, written in the sender's transaction and delivered by background workers"""
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String)  # NULL for batch messages, which use recipients
+    # [{"email": ..., "substitutions": {...}}, ...] for a multi-recipient batch
+    recipients = Column(JSON)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    html_body = Column(Text)
+    status = Column(SQLEnum(EmailStatus), nullable=False, default=EmailStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    # A claimed message whose lease runs out is picked up again by another worker
+    locked_until = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+
+
+class ScheduledReminder(Base):
+    """A reminder email due for an accepted invitation at due_at"""
+
+    __tablename__ = "scheduled_reminders"
+    __table_args__ = (
+        # The scheduler only ever reads pending rows in due order
+        Index("ix_scheduled_reminders_status_due_at", "status", "due_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    invitation_id = Column(
+        Integer, ForeignKey("invitations.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    reminder_type = Column(String, nullable=False)  # "24_hours", "1_hour" or "reminder"
+    due_at = Column(DateTime(timezone=True), nullable=False)
+    status = Column(SQLEnum(ReminderStatus), nullable=False, default=ReminderStatus.PENDING)
+    sent_at = Column(DateTime(timezone=True))
+
+    invitation = relationship("Invitation")
+
+
+class SchedulerStatus(Base):
+    """Which process leads a background job and when it last ran"""
+
+    __tablename__ = "scheduler_status"
+
+    name = Column(String, primary_key=True)
+    leader_id = Column(String, nullable=False)  # hostname:pid
+    elected_at = Column(DateTime(timezone=True), nullable=False)
+    last_tick_at = Column(DateTime(timezone=True))
+
+
+class KataCache(Base):
+    """Codewars kata payloads kept locally, revalidated with their ETag once stale"""
+
+    __tablename__ = "kata_cache"
+
+    kata_id = Column(String, primary_key=True)
+    payload = Column(JSON, nullable=False)
+    etag = Column(String)
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class KataCatalog(Base):
+    """Searchable local copy of Codewars katas, filled from fetches and the bundled snapshot"""
+
+    __tablename__ = "kata_catalog"
+    __table_args__ = (
+        # GIN index for full-text search; PostgreSQL only, SQLite falls back to LIKE
+        Index(
+            "ix_kata_catalog_search_text",
+            text("to_tsvector('simple'::regconfig, search_text)"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id = Column(String, primary_key=True)  # Codewars kata id
+    name = Column(String, nullable=False)
+    description = Column(Text)
+    rank_name = Column(String, index=True)  # e.g. "6 kyu"
+    tags = Column(JSON)
+    languages = Column(JSON)
+    # Lower-cased name, tags and description; the full-text index is built over it
+    search_text = Column(Text, nullable=False)
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class KataLanguage(Base):
+    """One row per kata and language it can be solved in, for the language filter"""
+
+    __tablename__ = "kata_languages"
+
+    language = Column(String, primary_key=True)
+    kata_id = Column(String, ForeignKey("kata_catalog.id", ondelete="CASCADE"), primary_key=True)
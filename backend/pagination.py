@@ -0,0 +1,57 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, func, literal, tuple_
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Build an opaque cursor from the sort timestamp and id of the last row on a page"""
+    raw = json.dumps([sort_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _sort_key(db, expression):
+    # SQLite stores timestamps as text with varying fractional-second precision,
+    # so compare julian day numbers there. PostgreSQL compares the indexed column.
+    if db.get_bind().dialect.name == "sqlite":
+        return func.julianday(expression)
+    return expression
+
+
+def apply_cursor(query, db, sort_column, id_column, cursor: Optional[str], limit: int):
+    """Order a query newest first by (sort_column, id) and seek past the cursor.
+
+    Works on both ORM queries and select() statements. One extra row is fetched
+    so build_page can tell whether another page exists.
+    """
+    sort_key = _sort_key(db, sort_column)
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        boundary = _sort_key(db, literal(sort_value, DateTime(timezone=True)))
+        query = query.filter(tuple_(sort_key, id_column) < tuple_(boundary, row_id))
+    return query.order_by(sort_key.desc(), id_column.desc()).limit(limit + 1)
+
+
+def build_page(rows: List, limit: int, key: Callable) -> dict:
+    """Trim the look-ahead row and build the next cursor from the last row kept.
+
+    key(row) must return the (sort_value, id) pair the query was ordered by.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*key(rows[-1])) if has_more and rows else None
+    return {"items": rows, "next_cursor": next_cursor}
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case, literal_column
 from typing import List, Optional
 from datetime import datetime, timedelta
 import json
 
 from database import get_db
-from models import Assessment, Submission, Question, Answer, User, Invitation
+from models import Assessment, AssessmentStats, Submission, Question, Answer, User, Invitation, QuestionType
 from auth import get_current_user
 from schemas import UserRole
+from services import assessment_stats
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
@@ -103,6 +104,35 @@ def get_analytics_overview(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating analytics: {str(e)}")
 
+@router.get("/trends")
+def get_performance_trends(
+    current_user: User = Depends(require_recruiter),
+    db: Session = Depends(get_db),
+    assessment_id: Optional[int] = Query(None),
+    days: int = Query(30, ge=1, le=3660),
+    granularity: str = Query("day")
+):
+    """Get graded submission counts and average scores bucketed by day, week or month"""
+    if granularity not in TREND_GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid granularity: {granularity}. Must be one of {', '.join(TREND_GRANULARITIES)}"
+        )
+    
+    try:
+        base_query = db.query(Assessment.id).filter(Assessment.creator_id == current_user.id)
+        if assessment_id:
+            base_query = base_query.filter(Assessment.id == assessment_id)
+        
+        assessment_ids = [row.id for row in base_query.all()]
+        if not assessment_ids:
+            return []
+        
+        return calculate_performance_trends(db, assessment_ids, days=days, granularity=granularity)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating trends: {str(e)}")
+
 @router.get("/question-analysis")
 def get_question_analysis(
     current_user: User = Depends(require_recruiter),
@@ -122,32 +152,55 @@ def get_question_analysis(
         if not assessment_ids:
             return []
         
-        # Get all questions for these assessments
-        questions = db.query(Question).filter(Question.assessment_id.in_(assessment_ids)).all()
+        assessment_titles = {a.id: a.title for a in assessments}
+        
+        # Aggregate per-question answer statistics in the database
+        answer_stats = db.query(
+            Answer.question_id.label("question_id"),
+            func.count(Answer.id).label("total_attempts"),
+            func.sum(
+                case(
+                    (
+                        and_(
+                            Answer.points_earned != 0,
+                            Answer.points_earned >= Question.points * 0.7
+                        ),
+                        1
+                    ),
+                    else_=0
+                )
+            ).label("correct_answers"),
+            func.sum(func.coalesce(Answer.points_earned, 0)).label("total_points")
+        ).join(Question, Question.id == Answer.question_id).filter(
+            Question.assessment_id.in_(assessment_ids)
+        ).group_by(Answer.question_id).subquery()
+        
+        rows = db.query(
+            Question,
+            answer_stats.c.total_attempts,
+            answer_stats.c.correct_answers,
+            answer_stats.c.total_points
+        ).join(answer_stats, answer_stats.c.question_id == Question.id).all()
+        
+        answer_patterns = aggregate_answer_patterns(db, assessment_ids)
         
         question_analysis = []
         
-        for question in questions:
-            # Get all answers for this question
-            answers = db.query(Answer).filter(Answer.question_id == question.id).all()
-            
-            if not answers:
-                continue
-            
-            total_attempts = len(answers)
-            correct_answers = len([a for a in answers if a.points_earned and a.points_earned >= question.points * 0.7])
-            avg_score = sum([a.points_earned or 0 for a in answers]) / total_attempts
+        for question, total_attempts, correct_answers, total_points in rows:
+            correct_answers = int(correct_answers or 0)
+            avg_score = float(total_points or 0) / total_attempts
             max_score = question.points
             difficulty_percentage = (correct_answers / total_attempts) * 100 if total_attempts > 0 else 0
             
-            # Analyze answer patterns
-            answer_patterns = analyze_answer_patterns(question, answers)
+            patterns = answer_patterns.get(question.id)
+            if patterns is None:
+                patterns = {"option_distribution": {}, "most_common_option": None} if question.question_type == QuestionType.MULTIPLE_CHOICE else {}
             
             question_analysis.append({
                 "question_id": question.id,
                 "question_title": question.title,
                 "question_type": question.question_type,
-                "assessment_title": next((a.title for a in assessments if a.id == question.assessment_id), "Unknown"),
+                "assessment_title": assessment_titles.get(question.assessment_id, "Unknown"),
                 "total_attempts": total_attempts,
                 "correct_answers": correct_answers,
                 "avg_score": round(avg_score, 2),
@@ -155,7 +208,7 @@ def get_question_analysis(
                 "avg_score_percentage": round((avg_score / max_score) * 100, 2) if max_score > 0 else 0,
                 "difficulty_percentage": round(difficulty_percentage, 2),
                 "difficulty_level": get_difficulty_level(difficulty_percentage),
-                "answer_patterns": answer_patterns
+                "answer_patterns": patterns
             })
         
         # Sort by difficulty (hardest first)
@@ -278,52 +331,47 @@ def get_assessment_comparison(
 ):
     """Compare performance across different assessments"""
     try:
-        # Get recruiter's assessments
-        assessments = db.query(Assessment).filter(Assessment.creator_id == current_user.id).all()
+        # Get recruiter's assessments with their running statistics
+        rows = db.query(Assessment, AssessmentStats).outerjoin(
+            AssessmentStats, AssessmentStats.assessment_id == Assessment.id
+        ).filter(Assessment.creator_id == current_user.id).all()
+        
+        question_counts = dict(
+            db.query(Question.assessment_id, func.count(Question.id))
+            .join(Assessment, Assessment.id == Question.assessment_id)
+            .filter(Assessment.creator_id == current_user.id)
+            .group_by(Question.assessment_id)
+            .all()
+        )
         
         comparison_data = []
         
-        for assessment in assessments:
-            # Get submissions for this assessment
-            submissions = db.query(Submission).filter(
-                Submission.assessment_id == assessment.id
-            ).all()
+        for assessment, stats in rows:
+            if stats is None:
+                stats = assessment_stats.get_stats(db, assessment.id)
             
-            total_submissions = len(submissions)
-            graded_submissions = [s for s in submissions if s.status == 'graded']
+            total_submissions = stats.submission_count
+            graded_submissions = stats.graded_count
             
             if not graded_submissions:
                 continue
             
             # Calculate statistics
-            scores = [(s.score / s.max_score) * 100 for s in graded_submissions if s.max_score > 0]
-            average_score = sum(scores) / len(scores) if scores else 0
-            pass_rate = len([s for s in scores if s >= 70]) / len(scores) * 100 if scores else 0
-            
-            # Question analysis
-            questions = db.query(Question).filter(Question.assessment_id == assessment.id).all()
-            total_questions = len(questions)
-            
-            # Time analysis
-            completion_times = []
-            for submission in submissions:
-                if submission.started_at and submission.submitted_at:
-                    time_diff = (submission.submitted_at - submission.started_at).total_seconds() / 60
-                    completion_times.append(time_diff)
-            
-            avg_completion_time = sum(completion_times) / len(completion_times) if completion_times else 0
+            average_score = stats.score_percent_sum / stats.percent_count if stats.percent_count else 0
+            pass_rate = stats.pass_count / stats.percent_count * 100 if stats.percent_count else 0
+            avg_completion_time = stats.time_taken_sum / stats.time_taken_count / 60 if stats.time_taken_count else 0
             
             comparison_data.append({
                 "assessment_id": assessment.id,
                 "assessment_title": assessment.title,
-                "total_questions": total_questions,
+                "total_questions": question_counts.get(assessment.id, 0),
                 "total_submissions": total_submissions,
-                "graded_submissions": len(graded_submissions),
-                "completion_rate": round((len(graded_submissions) / total_submissions) * 100, 2) if total_submissions > 0 else 0,
+                "graded_submissions": graded_submissions,
+                "completion_rate": round((graded_submissions / total_submissions) * 100, 2) if total_submissions > 0 else 0,
                 "average_score": round(average_score, 2),
                 "pass_rate": round(pass_rate, 2),
                 "avg_completion_time_minutes": round(avg_completion_time, 2),
-                "difficulty_score": calculate_assessment_difficulty(assessment, graded_submissions),
+                "difficulty_score": calculate_assessment_difficulty(average_score),
                 "created_at": assessment.created_at.isoformat(),
                 "published_at": assessment.published_at.isoformat() if assessment.published_at else None
             })
@@ -355,62 +403,125 @@ def calculate_time_stats(submissions):
         "median_completion_time": round(sorted(completion_times)[len(completion_times) // 2], 2)
     }
 
-def calculate_performance_trends(db, assessment_ids, days=7):
+TREND_GRANULARITIES = ("day", "week", "month")
+
+def trend_bucket(db, column, granularity):
+    """Truncate a timestamp column to the start of its day, week or month"""
+    if granularity not in TREND_GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    if db.get_bind().dialect.name == "sqlite":
+        if granularity == "week":
+            return func.date(column, "-6 days", "weekday 1")
+        if granularity == "month":
+            return func.date(column, "start of month")
+        return func.date(column)
+    # Inline the unit so SELECT and GROUP BY render the same expression
+    return func.date_trunc(literal_column(f"'{granularity}'"), column)
+
+def bucket_start(value, granularity):
+    """Python equivalent of trend_bucket for a date"""
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    if granularity == "month":
+        return value.replace(day=1)
+    return value
+
+def next_bucket(value, granularity):
+    if granularity == "week":
+        return value + timedelta(days=7)
+    if granularity == "month":
+        return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return value + timedelta(days=1)
+
+def calculate_performance_trends(db, assessment_ids, days=7, granularity="day"):
     """Calculate performance trends over time"""
-    trends = []
-    for i in range(days):
-        date = datetime.utcnow() - timedelta(days=i)
-        date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        date_end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        submissions = db.query(Submission).filter(
-            and_(
-                Submission.assessment_id.in_(assessment_ids),
-                Submission.submitted_at.between(date_start, date_end),
-                Submission.status == 'graded'
+    today = datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+    window_start = datetime.combine(first_day, datetime.min.time())
+    
+    bucket = trend_bucket(db, Submission.submitted_at, granularity)
+    rows = db.query(
+        bucket.label("bucket"),
+        func.count(Submission.id),
+        func.avg(
+            case(
+                (Submission.max_score > 0, Submission.score * 100.0 / Submission.max_score),
+                else_=None
             )
-        ).all()
-        
-        if submissions:
-            scores = [(s.score / s.max_score) * 100 for s in submissions if s.max_score > 0]
-            avg_score = sum(scores) / len(scores) if scores else 0
-        else:
-            avg_score = 0
-        
+        )
+    ).filter(
+        and_(
+            Submission.assessment_id.in_(assessment_ids),
+            Submission.submitted_at >= window_start,
+            Submission.status == 'graded'
+        )
+    ).group_by(bucket).all()
+    
+    buckets = {}
+    for bucket_value, submissions_count, avg_score in rows:
+        if isinstance(bucket_value, str):
+            bucket_value = datetime.strptime(bucket_value[:10], "%Y-%m-%d")
+        buckets[bucket_value.strftime("%Y-%m-%d")] = (submissions_count, avg_score)
+    
+    trends = []
+    current = bucket_start(first_day, granularity)
+    while current <= today:
+        key = current.strftime("%Y-%m-%d")
+        submissions_count, avg_score = buckets.get(key, (0, None))
         trends.append({
-            "date": date_start.strftime("%Y-%m-%d"),
-            "submissions_count": len(submissions),
-            "average_score": round(avg_score, 2)
+            "date": key,
+            "submissions_count": submissions_count,
+            "average_score": round(float(avg_score or 0), 2)
         })
+        current = next_bucket(current, granularity)
     
-    return list(reversed(trends))
+    return trends
 
-def analyze_answer_patterns(question, answers):
-    """Analyze patterns in answers"""
+def aggregate_answer_patterns(db, assessment_ids):
+    """Aggregate answer patterns per question with a fixed number of grouped queries"""
     patterns = {}
     
-    if question.question_type == "multiple_choice":
-        # Count option selections
-        option_counts = {}
-        for answer in answers:
-            if answer.answer_text:
-                option = answer.answer_text.strip()
-                option_counts[option] = option_counts.get(option, 0) + 1
-        
-        patterns["option_distribution"] = option_counts
-        patterns["most_common_option"] = max(option_counts.items(), key=lambda x: x[1])[0] if option_counts else None
+    # Option distribution for multiple choice questions
+    option = func.trim(Answer.answer_text)
+    option_rows = db.query(
+        Answer.question_id,
+        option.label("option"),
+        func.count(Answer.id).label("selections")
+    ).join(Question, Question.id == Answer.question_id).filter(
+        Question.assessment_id.in_(assessment_ids),
+        Question.question_type == QuestionType.MULTIPLE_CHOICE,
+        Answer.answer_text.isnot(None),
+        Answer.answer_text != ""
+    ).group_by(Answer.question_id, option).all()
     
-    elif question.question_type == "coding":
-        # Analyze code submissions
-        code_lengths = []
-        for answer in answers:
-            if answer.code_solution:
-                code_lengths.append(len(answer.code_solution))
-        
-        if code_lengths:
-            patterns["avg_code_length"] = round(sum(code_lengths) / len(code_lengths), 2)
-            patterns["min_code_length"] = min(code_lengths)
-            patterns["max_code_length"] = max(code_lengths)
+    for question_id, option_text, selections in option_rows:
+        question_patterns = patterns.setdefault(question_id, {"option_distribution": {}})
+        question_patterns["option_distribution"][option_text] = selections
+    
+    for question_patterns in patterns.values():
+        option_counts = question_patterns["option_distribution"]
+        question_patterns["most_common_option"] = max(option_counts.items(), key=lambda x: x[1])[0] if option_counts else None
+    
+    # Code length statistics for coding questions
+    code_length = func.length(Answer.code_solution)
+    code_rows = db.query(
+        Answer.question_id,
+        func.avg(code_length),
+        func.min(code_length),
+        func.max(code_length)
+    ).join(Question, Question.id == Answer.question_id).filter(
+        Question.assessment_id.in_(assessment_ids),
+        Question.question_type == QuestionType.CODING,
+        Answer.code_solution.isnot(None),
+        Answer.code_solution != ""
+    ).group_by(Answer.question_id).all()
+    
+    for question_id, avg_length, min_length, max_length in code_rows:
+        patterns[question_id] = {
+            "avg_code_length": round(float(avg_length), 2),
+            "min_code_length": min_length,
+            "max_code_length": max_length
+        }
     
     return patterns
 
@@ -425,14 +536,8 @@ def get_difficulty_level(percentage):
     else:
         return "Very Hard"
 
-def calculate_assessment_difficulty(assessment, submissions):
-    """Calculate overall difficulty score for an assessment"""
-    if not submissions:
-        return 0
-    
-    scores = [(s.score / s.max_score) * 100 for s in submissions if s.max_score > 0]
-    avg_score = sum(scores) / len(scores) if scores else 0
-    
+def calculate_assessment_difficulty(average_score):
+    """Calculate overall difficulty score from an assessment's average score percentage"""
     # Difficulty score (inverse of average score, scaled 0-100)
-    difficulty_score = max(0, 100 - avg_score)
+    difficulty_score = max(0, 100 - average_score)
     return round(difficulty_score, 2)
@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+import json
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, select
+from typing import List, Optional, Union
 from datetime import datetime
 from database import get_db
-from models import User, Assessment, Question, Submission, AssessmentStatus, UserRole
+from models import User, Assessment, Question, Submission, Invitation, AssessmentStatus, UserRole
 from schemas import (
     AssessmentCreate, Assessment as AssessmentSchema, AssessmentUpdate,
-    AssessmentWithStats, QuestionCreate, Question as QuestionSchema,
-    AssessmentStatistics
+    AssessmentWithStats, QuestionCreate, QuestionUpdate, Question as QuestionSchema,
+    AssessmentStatistics, CursorPage, RegradeReport
 )
 from auth import get_current_active_user, require_role
+from pagination import apply_cursor, build_page
+from services import assessment_stats, grading, reminders
 
 router = APIRouter(prefix="/api/assessments", tags=["Assessments"])
 
@@ -47,6 +51,7 @@ def create_assessment(
                 order=idx,
                 options=question_data.options,
                 correct_answer=question_data.correct_answer,
+                correct_answers=question_data.correct_answers,
                 codewars_kata_id=question_data.codewars_kata_id,
                 test_cases=question_data.test_cases,
                 starter_code=question_data.starter_code
@@ -59,16 +64,40 @@ def create_assessment(
     return new_assessment
 
 
-@router.get("", response_model=List[AssessmentWithStats])
+@router.get("", response_model=Union[List[AssessmentWithStats], CursorPage[AssessmentWithStats]])
 def get_assessments(
     skip: int = 0,
     limit: int = 100,
     status: AssessmentStatus = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get all assessments based on user role"""
-    query = db.query(Assessment)
+    """Get all assessments based on user role.
+
+    Passing `cursor` (empty for the first page) switches to keyset pagination
+    and returns {items, next_cursor} instead of a plain list.
+    """
+    total_invitations = select(func.count(Invitation.id)).where(
+        Invitation.assessment_id == Assessment.id
+    ).correlate(Assessment).scalar_subquery()
+    total_submissions = select(func.count(Submission.id)).where(
+        Submission.assessment_id == Assessment.id
+    ).correlate(Assessment).scalar_subquery()
+    total_questions = select(func.count(Question.id)).where(
+        Question.assessment_id == Assessment.id
+    ).correlate(Assessment).scalar_subquery()
+    average_score = select(func.avg(Submission.score)).where(
+        Submission.assessment_id == Assessment.id
+    ).correlate(Assessment).scalar_subquery()
+    
+    query = db.query(
+        Assessment,
+        total_invitations,
+        total_submissions,
+        total_questions,
+        average_score
+    ).options(selectinload(Assessment.questions))
     
     if current_user.role == UserRole.RECRUITER:
         # Recruiters see their own assessments
@@ -83,28 +112,29 @@ def get_assessments(
     if status:
         query = query.filter(Assessment.status == status)
     
-    assessments = query.offset(skip).limit(limit).all()
+    page = None
+    if cursor is not None:
+        query = apply_cursor(query, db, Assessment.created_at, Assessment.id, cursor, limit)
+        page = build_page(query.all(), limit, lambda row: (row[0].created_at, row[0].id))
+        rows = page["items"]
+    else:
+        rows = query.offset(skip).limit(limit).all()
     
     # Add statistics
     result = []
-    for assessment in assessments:
-        total_invitations = len(assessment.invitations)
-        total_submissions = len(assessment.submissions)
-        total_questions = len(assessment.questions)
-
-        avg_score = db.query(func.avg(Submission.score)).filter(
-            Submission.assessment_id == assessment.id
-        ).scalar() or 0.0
-
+    for assessment, invitation_count, submission_count, question_count, avg_score in rows:
         assessment_dict = AssessmentSchema.from_orm(assessment).dict()
         assessment_dict.update({
-            "total_invitations": total_invitations,
-            "total_submissions": total_submissions,
-            "total_questions": total_questions,
-            "average_score": float(avg_score)
+            "total_invitations": invitation_count,
+            "total_submissions": submission_count,
+            "total_questions": question_count,
+            "average_score": float(avg_score or 0.0)
         })
         result.append(AssessmentWithStats(**assessment_dict))
     
+    if page is not None:
+        return {"items": result, "next_cursor": page["next_cursor"]}
+    
     return result
 
 
@@ -166,6 +196,8 @@ def update_assessment(
     update_data = assessment_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(assessment, field, value)
+    if "scheduled_start_time" in update_data:
+        reminders.reschedule_assessment(db, assessment)
     
     db.commit()
     db.refresh(assessment)
@@ -274,18 +306,111 @@ def add_question(
         order=question_data.order,
         options=question_data.options,
         correct_answer=question_data.correct_answer,
+        correct_answers=question_data.correct_answers,
         codewars_kata_id=question_data.codewars_kata_id,
         test_cases=question_data.test_cases,
         starter_code=question_data.starter_code
     )
     
     db.add(question)
+    grading.invalidate(assessment)
+    db.commit()
+    db.refresh(question)
+    
+    return question
+
+
+def get_own_assessment(db: Session, assessment_id: int, current_user: User) -> Assessment:
+    assessment = db.query(Assessment).filter(Assessment.id == assessment_id).first()
+    
+    if not assessment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assessment not found"
+        )
+    
+    if assessment.creator_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify this assessment"
+        )
+    return assessment
+
+
+@router.put("/{assessment_id}/questions/{question_id}", response_model=QuestionSchema)
+def update_question(
+    assessment_id: int,
+    question_id: int,
+    question_data: QuestionUpdate,
+    background_tasks: BackgroundTasks,
+    regrade: bool = True,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.RECRUITER))
+):
+    """Edit a question (Recruiter only).
+
+    When the edit changes how answers are graded, submitted answers are
+    regraded against the new key in the background once the response is
+    sent, unless `regrade=false`; use POST /{assessment_id}/regrade to run a
+    regrade and follow its progress.
+    """
+    assessment = get_own_assessment(db, assessment_id, current_user)
+    question = db.query(Question).filter(
+        Question.id == question_id, Question.assessment_id == assessment_id
+    ).first()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Question not found"
+        )
+    
+    update_data = question_data.model_dump(exclude_unset=True)
+    key_changed = any(
+        field in update_data and update_data[field] != getattr(question, field) for field in grading.KEY_FIELDS
+    )
+    # An answer to a question that leaves the key keeps no auto-awarded points
+    was_graded = key_changed and question.id in grading.answer_keys.get(db, assessment)
+    for field, value in update_data.items():
+        setattr(question, field, value)
+    if key_changed:
+        grading.invalidate(assessment)
+    
     db.commit()
+    if key_changed and regrade:
+        background_tasks.add_task(
+            grading.regrade_in_background, db.get_bind(), assessment_id, [question.id] if was_graded else []
+        )
     db.refresh(question)
     
     return question
 
 
+@router.post("/{assessment_id}/regrade", response_model=RegradeReport)
+def regrade_assessment(
+    assessment_id: int,
+    stream: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.RECRUITER))
+):
+    """Regrade every submitted answer against the current answer key (Recruiter only).
+
+    Runs in chunks of submissions, each committed on its own. With
+    `stream=true` every chunk is reported as a line of NDJSON as it completes.
+    """
+    assessment = get_own_assessment(db, assessment_id, current_user)
+    
+    if stream:
+        def progress():
+            for report in grading.regrade_chunks(db, assessment):
+                yield json.dumps(report) + "\n"
+
+        return StreamingResponse(progress(), media_type="application/x-ndjson")
+    
+    report = grading.regrade_assessment(db, assessment)
+    report.pop("done", None)
+    return report
+
+
 @router.get("/{assessment_id}/statistics", response_model=AssessmentStatistics)
 def get_assessment_statistics(
     assessment_id: int,
@@ -307,23 +432,19 @@ def get_assessment_statistics(
             detail="Not authorized to view statistics for this assessment"
         )
     
-    # Calculate statistics
-    submissions = assessment.submissions
-    total_invitations = len(assessment.invitations)
-    total_submissions = len(submissions)
-    completed_submissions = [s for s in submissions if s.submitted_at is not None]
-    
-    scores = [s.score for s in completed_submissions if s.score is not None]
-    times = [s.time_taken for s in completed_submissions if s.time_taken is not None]
+    stats = assessment_stats.get_stats(db, assessment_id)
+    total_invitations = db.query(func.count(Invitation.id)).filter(
+        Invitation.assessment_id == assessment_id
+    ).scalar()
     
     return AssessmentStatistics(
         assessment_id=assessment_id,
         total_invitations=total_invitations,
-        total_submissions=total_submissions,
-        completed_submissions=len(completed_submissions),
-        average_score=sum(scores) / len(scores) if scores else 0.0,
-        highest_score=max(scores) if scores else 0.0,
-        lowest_score=min(scores) if scores else 0.0,
-        average_time_taken=sum(times) / len(times) if times else 0.0,
+        total_submissions=stats.submission_count,
+        completed_submissions=stats.completed_count,
+        average_score=stats.score_sum / stats.score_count if stats.score_count else 0.0,
+        highest_score=stats.score_max if stats.score_max is not None else 0.0,
+        lowest_score=stats.score_min if stats.score_min is not None else 0.0,
+        average_time_taken=stats.time_taken_sum / stats.time_taken_count if stats.time_taken_count else 0.0,
         question_statistics=[]  # Can be expanded with per-question stats
     )
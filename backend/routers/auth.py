@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from database import get_db
+from database import get_async_db
 from models import User
 from schemas import UserCreate, UserLogin, Token, User as UserSchema
 from auth import (
-    verify_password,
-    get_password_hash,
+    hash_password,
+    verify_and_update_password,
     create_access_token,
     get_current_active_user,
 )
@@ -23,7 +24,7 @@ router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 @router.post(
     "/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED
 )
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         logger.info(
             f"Registration attempt for email: {user_data.email}, username: {user_data.username}, role: {user_data.role}"
@@ -38,12 +39,12 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
 
         # Check if user already exists
-        existing_user = (
-            db.query(User)
+        existing_user = await db.scalar(
+            select(User)
             .filter(
                 (User.email == user_data.email) | (User.username == user_data.username)
             )
-            .first()
+            .limit(1)
         )
 
         if existing_user:
@@ -56,7 +57,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
 
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         new_user = User(
             email=user_data.email,
             username=user_data.username,
@@ -66,8 +67,8 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
         logger.info(f"User registered successfully: {new_user.email}")
         return new_user
@@ -80,7 +81,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
         logger.error(f"Registration error: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error during registration: {str(e)}",
@@ -88,19 +89,28 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
     # Find user
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).filter(User.username == form_data.username))
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash:
+        # Stored hash used a different bcrypt cost; upgrade it transparently
+        user.hashed_password = new_hash
+        await db.commit()
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
 from typing import List, Dict
+from database import get_db
 from models import User, UserRole
 from auth import require_role
 from services.codewars_service import codewars_service
@@ -11,17 +13,17 @@ router = APIRouter(prefix="/api/codewars", tags=["Codewars"])
 def search_katas(
     query: str = "",
     difficulty: str = None,
+    language: str = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.RECRUITER))
 ):
-    """Search for Codewars katas (Recruiter only)"""
-    try:
-        katas = codewars_service.search_katas(query, difficulty)
-        return [codewars_service.format_kata_for_question(kata) for kata in katas]
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error fetching katas: {str(e)}"
-        )
+    """Search the local Codewars kata catalog (Recruiter only).
+
+    Every word of `query` matches as a prefix, so it works for typeahead;
+    `difficulty` is a rank such as "6 kyu".
+    """
+    return codewars_service.search_katas(db, query, difficulty, language, limit)
 
 
 @router.get("/katas/{kata_id}", response_model=Dict)
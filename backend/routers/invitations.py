@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional, Union
 from datetime import datetime
-from database import get_db
+import json
+from database import get_db, get_async_db, dialect_insert
 from models import User, Invitation, Assessment, InvitationStatus, UserRole, Notification
 from schemas import (
     InvitationCreate, BulkInvitationCreate, Invitation as InvitationSchema,
-    InvitationWithDetails
+    InvitationWithDetails, CursorPage
 )
 from auth import get_current_active_user, require_role
+from pagination import apply_cursor, build_page
+from services import reminders
 from services.email_service import email_service
 
 router = APIRouter(prefix="/api/invitations", tags=["Invitations"])
@@ -75,30 +81,91 @@ def create_invitation(
     )
     db.add(notification)
     
+    # Queue email notification
+    scheduled_start_str = invitation.scheduled_start.strftime('%Y-%m-%d %H:%M') if invitation.scheduled_start else None
+    email_service.send_invitation_email(
+        interviewee.email,
+        assessment.title,
+        scheduled_start_str,
+        db=db
+    )
+    
     db.commit()
     db.refresh(invitation)
     
-    # Send email notification
-    try:
-        scheduled_start_str = invitation.scheduled_start.strftime('%Y-%m-%d %H:%M') if invitation.scheduled_start else None
-        email_service.send_invitation_email(
-            interviewee.email,
+    return invitation
+
+
+BULK_INVITATION_CHUNK_SIZE = 500
+
+
+def invite_chunk(db: Session, assessment: Assessment, interviewee_ids: List[int],
+                 scheduled_start: Optional[datetime], scheduled_end: Optional[datetime]) -> List[Invitation]:
+    """Invite one chunk of candidates with a fixed number of statements.
+
+    Unknown ids, non-interviewees and candidates who are already invited are
+    filtered out by a single query; ON CONFLICT DO NOTHING covers invitations
+    created concurrently by another request.
+    """
+    already_invited = select(Invitation.id).filter(
+        Invitation.assessment_id == assessment.id,
+        Invitation.interviewee_id == User.id
+    ).exists()
+    eligible = dict(db.execute(
+        select(User.id, User.email).filter(
+            User.id.in_(interviewee_ids),
+            User.role == UserRole.INTERVIEWEE,
+            ~already_invited
+        )
+    ).all())
+    if not eligible:
+        return []
+
+    invitations = db.scalars(
+        dialect_insert(db, Invitation).values([
+            {
+                "assessment_id": assessment.id,
+                "interviewee_id": interviewee_id,
+                "scheduled_start": scheduled_start,
+                "scheduled_end": scheduled_end,
+            }
+            for interviewee_id in interviewee_ids if interviewee_id in eligible
+        ]).on_conflict_do_nothing().returning(Invitation)
+    ).all()
+
+    if invitations:
+        db.execute(insert(Notification), [
+            {
+                "user_id": invitation.interviewee_id,
+                "title": "New Assessment Invitation",
+                "message": f"You have been invited to take the assessment: {assessment.title}",
+                "notification_type": "invitation",
+                "related_id": assessment.id,
+            }
+            for invitation in invitations
+        ])
+        # One outbox row per chunk, delivered as a single multi-recipient request
+        email_service.send_invitation_batch(
+            [eligible[invitation.interviewee_id] for invitation in invitations],
             assessment.title,
-            scheduled_start_str
+            scheduled_start.strftime('%Y-%m-%d %H:%M') if scheduled_start else None,
+            db=db
         )
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-    
-    return invitation
+    return sorted(invitations, key=lambda invitation: invitation.id)
 
 
 @router.post("/bulk", response_model=List[InvitationSchema], status_code=status.HTTP_201_CREATED)
 def create_bulk_invitations(
     invitation_data: BulkInvitationCreate,
+    stream: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.RECRUITER))
 ):
-    """Create multiple invitations at once (Recruiter only)"""
+    """Create multiple invitations at once (Recruiter only).
+
+    With `stream=true` each chunk is committed on its own and reported as a line
+    of NDJSON, so very large cohorts make progress without one long request.
+    """
     # Verify assessment
     assessment = db.query(Assessment).filter(Assessment.id == invitation_data.assessment_id).first()
     if not assessment:
@@ -113,69 +180,75 @@ def create_bulk_invitations(
             detail="Not authorized to send invitations for this assessment"
         )
     
-    invitations = []
-    for interviewee_id in invitation_data.interviewee_ids:
-        # Check if interviewee exists
-        interviewee = db.query(User).filter(User.id == interviewee_id).first()
-        if not interviewee or interviewee.role != UserRole.INTERVIEWEE:
-            continue
-        
-        # Check if invitation already exists
-        existing = db.query(Invitation).filter(
-            Invitation.assessment_id == invitation_data.assessment_id,
-            Invitation.interviewee_id == interviewee_id
-        ).first()
-        
-        if existing:
-            continue
-        
-        # Create invitation
-        invitation = Invitation(
-            assessment_id=invitation_data.assessment_id,
-            interviewee_id=interviewee_id,
-            scheduled_start=invitation_data.scheduled_start,
-            scheduled_end=invitation_data.scheduled_end
-        )
-        db.add(invitation)
-        invitations.append(invitation)
-        
-        # Create notification
-        notification = Notification(
-            user_id=interviewee_id,
-            title="New Assessment Invitation",
-            message=f"You have been invited to take the assessment: {assessment.title}",
-            notification_type="invitation",
-            related_id=invitation_data.assessment_id
+    interviewee_ids = list(dict.fromkeys(invitation_data.interviewee_ids))
+    chunks = [
+        interviewee_ids[index:index + BULK_INVITATION_CHUNK_SIZE]
+        for index in range(0, len(interviewee_ids), BULK_INVITATION_CHUNK_SIZE)
+    ]
+
+    def invite(chunk):
+        return invite_chunk(
+            db, assessment, chunk, invitation_data.scheduled_start, invitation_data.scheduled_end
         )
-        db.add(notification)
-    
+
+    if stream:
+        def progress():
+            created = 0
+            for number, chunk in enumerate(chunks, start=1):
+                invitations = [
+                    InvitationSchema.model_validate(invitation).model_dump(mode="json")
+                    for invitation in invite(chunk)
+                ]
+                db.commit()
+                created += len(invitations)
+                yield json.dumps({"chunk": number, "requested": len(chunk), "created": invitations}) + "\n"
+            yield json.dumps({"done": True, "requested": len(interviewee_ids), "created": created}) + "\n"
+
+        return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+    invitations = []
+    for chunk in chunks:
+        invitations.extend(InvitationSchema.model_validate(invitation) for invitation in invite(chunk))
+    # Serialized before commit, which would expire every row and reload it one by one
     db.commit()
     
-    # Refresh all invitations
-    for invitation in invitations:
-        db.refresh(invitation)
-    
     return invitations
 
 
-@router.get("", response_model=List[InvitationWithDetails])
-def get_invitations(
+@router.get("", response_model=Union[List[InvitationWithDetails], CursorPage[InvitationWithDetails]])
+async def get_invitations(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get invitations based on user role"""
+    """Get invitations based on user role.
+
+    Passing `cursor` (empty for the first page) switches to keyset pagination
+    and returns {items, next_cursor} instead of a plain list.
+    """
+    query = select(Invitation).options(
+        selectinload(Invitation.assessment).selectinload(Assessment.questions),
+        joinedload(Invitation.interviewee)
+    )
     if current_user.role == UserRole.RECRUITER:
         # Get invitations for assessments created by this recruiter
-        invitations = db.query(Invitation).join(Assessment).filter(
+        query = query.join(Assessment).filter(
             Assessment.creator_id == current_user.id
-        ).offset(skip).limit(limit).all()
+        )
     else:
         # Get invitations for this interviewee
-        invitations = db.query(Invitation).filter(
+        query = query.filter(
             Invitation.interviewee_id == current_user.id
-        ).offset(skip).limit(limit).all()
+        )
+    
+    if cursor is not None:
+        query = apply_cursor(query, db, Invitation.invited_at, Invitation.id, cursor, limit)
+        rows = (await db.scalars(query)).all()
+        return build_page(rows, limit, lambda i: (i.invited_at, i.id))
+    
+    invitations = (await db.scalars(query.offset(skip).limit(limit))).all()
     
     return invitations
 
@@ -241,6 +314,7 @@ def accept_invitation(
     
     invitation.status = InvitationStatus.ACCEPTED
     invitation.responded_at = datetime.utcnow()
+    reminders.schedule_invitation(db, invitation)
     
     db.commit()
     db.refresh(invitation)
@@ -278,20 +352,16 @@ def decline_invitation(
     invitation.status = InvitationStatus.DECLINED
     invitation.responded_at = datetime.utcnow()
     
+    # Queue email notification to recruiter
+    assessment = invitation.assessment
+    email_service.send_invitation_declined_notification(
+        assessment.creator.email,
+        current_user.full_name or current_user.username,
+        assessment.title,
+        db=db
+    )
+    
     db.commit()
     db.refresh(invitation)
     
-    # Send email notification to recruiter
-    try:
-        # Get assessment details for email
-        assessment = db.query(Assessment).filter(Assessment.id == invitation.assessment_id).first()
-        if assessment:
-            email_service.send_invitation_declined_notification(
-                assessment.creator.email,
-                current_user.full_name or current_user.username,
-                assessment.title
-            )
-    except Exception as e:
-        print(f"Failed to send decline email: {e}")
-    
     return invitation
@@ -1,29 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from typing import List, Optional, Union
+from database import get_db, get_async_db
 from models import User, Notification
-from schemas import Notification as NotificationSchema
+from schemas import Notification as NotificationSchema, CursorPage
 from auth import get_current_active_user
+from pagination import apply_cursor, build_page
 
 router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
 
 
-@router.get("", response_model=List[NotificationSchema])
-def get_notifications(
+@router.get("", response_model=Union[List[NotificationSchema], CursorPage[NotificationSchema]])
+async def get_notifications(
     skip: int = 0,
     limit: int = 100,
     unread_only: bool = False,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get notifications for the current user"""
-    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    """Get notifications for the current user.
+
+    Passing `cursor` (empty for the first page) switches to keyset pagination
+    and returns {items, next_cursor} instead of a plain list.
+    """
+    query = select(Notification).filter(Notification.user_id == current_user.id)
     
     if unread_only:
         query = query.filter(Notification.is_read == False)
     
-    notifications = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    if cursor is not None:
+        query = apply_cursor(query, db, Notification.created_at, Notification.id, cursor, limit)
+        rows = (await db.scalars(query)).all()
+        return build_page(rows, limit, lambda n: (n.created_at, n.id))
+    
+    query = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
+    notifications = (await db.scalars(query)).all()
     
     return notifications
 
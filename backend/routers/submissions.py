@@ -1,23 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional, Union
 from datetime import datetime, timezone
-from database import get_db
+from database import get_db, get_async_db
 from models import (
-    User, Submission, Assessment, Answer, Question, Feedback,
-    SubmissionStatus, UserRole, QuestionType, Notification
+    User, Submission, Assessment, Answer, Feedback,
+    SubmissionStatus, UserRole, Notification
 )
 from schemas import (
-    SubmissionCreate, Submission as SubmissionSchema, SubmissionWithDetails,
+    SubmissionCreate, Submission as SubmissionSchema, SubmissionWithDetails, SubmissionSummary,
     SubmissionUpdate, AnswerCreate, Answer as AnswerSchema,
-    FeedbackCreate, Feedback as FeedbackSchema
+    FeedbackCreate, Feedback as FeedbackSchema, CursorPage, AnswerSync, AnswerSyncAck
 )
 from services.email_service import email_service
+from services import assessment_stats, answer_store, grading
+from services.autosave_buffer import autosave_buffer
 from auth import get_current_active_user, require_role
+from pagination import apply_cursor, build_page
 
 router = APIRouter(prefix="/api/submissions", tags=["Submissions"])
 
 
+def submission_detail_options():
+    """Eager-load everything SubmissionWithDetails serializes, one batched query per collection"""
+    return (
+        selectinload(Submission.answers).joinedload(Answer.question),
+        selectinload(Submission.assessment).selectinload(Assessment.questions),
+        joinedload(Submission.interviewee),
+        selectinload(Submission.feedbacks).joinedload(Feedback.recruiter),
+    )
+
+
+def submission_summary_options():
+    return (
+        joinedload(Submission.assessment),
+        joinedload(Submission.interviewee),
+    )
+
+
+_list_serializers = {
+    ("summary", False): TypeAdapter(List[SubmissionSummary]),
+    ("summary", True): TypeAdapter(CursorPage[SubmissionSummary]),
+    ("full", False): TypeAdapter(List[SubmissionWithDetails]),
+    ("full", True): TypeAdapter(CursorPage[SubmissionWithDetails]),
+}
+
+
+def check_questions(db: Session, submission: Submission, question_ids):
+    """400 unless every id is a question of the submission's assessment; returns the ids as ints"""
+    try:
+        question_ids = [int(question_id) for question_id in question_ids]
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Answers must be keyed by question id"
+        )
+    foreign = answer_store.foreign_questions(db, submission.assessment_id, question_ids)
+    if foreign:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Question(s) {foreign} are not part of this assessment"
+        )
+    return question_ids
+
+
 @router.post("", response_model=SubmissionSchema, status_code=status.HTTP_201_CREATED)
 def start_submission(
     submission_data: SubmissionCreate,
@@ -58,28 +108,35 @@ def start_submission(
     )
     
     db.add(submission)
+    db.flush()
+    assessment_stats.record_submission_change(db, submission, {}, assessment_stats.snapshot(submission))
     db.commit()
     db.refresh(submission)
     
     return submission
 
 
-@router.get("", response_model=List[SubmissionWithDetails])
+@router.get("", response_model=Union[
+    List[SubmissionSummary], CursorPage[SubmissionSummary],
+    List[SubmissionWithDetails], CursorPage[SubmissionWithDetails]
+])
 def get_submissions(
     assessment_id: int = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    detail: str = Query("summary", pattern="^(summary|full)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get submissions based on user role"""
-    from sqlalchemy.orm import joinedload
-    
-    query = db.query(Submission).options(
-        joinedload(Submission.answers).joinedload(Answer.question),
-        joinedload(Submission.assessment).joinedload(Assessment.questions),
-        joinedload(Submission.interviewee)
-    )
+    """Get submissions based on user role.
+
+    Returns slim summaries by default; `detail=full` includes answers, questions
+    and feedback. Passing `cursor` (empty for the first page) switches to keyset
+    pagination and returns {items, next_cursor} instead of a plain list.
+    """
+    options = submission_detail_options() if detail == "full" else submission_summary_options()
+    query = db.query(Submission).options(*options)
     
     if current_user.role == UserRole.RECRUITER:
         # Get submissions for assessments created by this recruiter
@@ -91,25 +148,29 @@ def get_submissions(
     if assessment_id:
         query = query.filter(Submission.assessment_id == assessment_id)
     
-    submissions = query.offset(skip).limit(limit).all()
+    if cursor is not None:
+        query = apply_cursor(query, db, Submission.created_at, Submission.id, cursor, limit)
+        content = build_page(query.all(), limit, lambda s: (s.created_at, s.id))
+    else:
+        content = query.offset(skip).limit(limit).all()
     
-    return submissions
+    # Serialize with the requested shape; the response_model union only documents it
+    serializer = _list_serializers[(detail, cursor is not None)]
+    return JSONResponse(serializer.dump_python(serializer.validate_python(content), mode="json"))
 
 
 @router.get("/{submission_id}", response_model=SubmissionWithDetails)
-def get_submission(
+async def get_submission(
     submission_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific submission"""
-    from sqlalchemy.orm import joinedload
-    
-    submission = db.query(Submission).options(
-        joinedload(Submission.answers).joinedload(Answer.question),
-        joinedload(Submission.assessment).joinedload(Assessment.questions),
-        joinedload(Submission.interviewee)
-    ).filter(Submission.id == submission_id).first()
+    submission = await db.scalar(
+        select(Submission).options(
+            *submission_detail_options()
+        ).filter(Submission.id == submission_id)
+    )
     
     if not submission:
         raise HTTPException(
@@ -162,39 +223,24 @@ def save_answer(
             detail="Cannot modify a submitted assessment"
         )
     
-    # Check if answer already exists
-    existing_answer = db.query(Answer).filter(
+    check_questions(db, submission, [answer_data.question_id])
+    content = answer_data.model_dump(exclude={"submission_id", "question_id"})
+    autosave_buffer.save(db, submission_id, {answer_data.question_id: content})
+    
+    answer = db.query(Answer).filter(
         Answer.submission_id == submission_id,
         Answer.question_id == answer_data.question_id
     ).first()
-    
-    if existing_answer:
-        # Update existing answer
-        existing_answer.answer_text = answer_data.answer_text
-        existing_answer.code_solution = answer_data.code_solution
-        existing_answer.bdd_text = answer_data.bdd_text
-        existing_answer.pseudocode = answer_data.pseudocode
-        existing_answer.updated_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(existing_answer)
-        return existing_answer
-    
-    # Create new answer
-    answer = Answer(
-        submission_id=submission_id,
-        question_id=answer_data.question_id,
-        answer_text=answer_data.answer_text,
-        code_solution=answer_data.code_solution,
-        bdd_text=answer_data.bdd_text,
-        pseudocode=answer_data.pseudocode
-    )
-    
-    db.add(answer)
-    db.commit()
-    db.refresh(answer)
-    
-    return answer
+    if answer is None:
+        # First save of this question: write it now so the response has the row
+        autosave_buffer.flush(db)
+        return db.query(Answer).filter(
+            Answer.submission_id == submission_id,
+            Answer.question_id == answer_data.question_id
+        ).first()
+    
+    # The row as it will be once the buffered save is flushed
+    return AnswerSchema.model_validate(answer).model_copy(update=content)
 
 
 @router.post("/{submission_id}/save", response_model=SubmissionSchema)
@@ -225,20 +271,59 @@ def save_answers(
             detail="Cannot save answers for a submitted assessment"
         )
     
-    # Clear existing answers and save new ones
-    db.query(Answer).filter(Answer.submission_id == submission_id).delete()
+    answers = payload.get("answers", {})
+    check_questions(db, submission, answers)
+    # Only answers whose content changed are written; grading and feedback survive
+    autosave_buffer.save(db, submission_id, answers, replace=True)
+    db.refresh(submission)
+    return submission
+
+
+@router.post("/{submission_id}/sync", response_model=AnswerSyncAck)
+def sync_answers(
+    submission_id: int,
+    sync: AnswerSync,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.INTERVIEWEE))
+):
+    """Apply a batch of per-question answer changes (Interviewee only).
+
+    Each operation carries the client's sequence number. The response
+    acknowledges the highest one stored; after a dropped connection the client
+    resends only what follows it. Resent operations are skipped, so retries are
+    safe. An empty batch just returns the acknowledgement.
+    """
+    # Saves still buffered from the bulk endpoints must not land after these changes
+    if autosave_buffer.pending(submission_id):
+        autosave_buffer.flush(db)
+    
+    # Row lock: concurrent batches for one submission apply one after the other
+    submission = db.query(Submission).filter(Submission.id == submission_id).with_for_update().first()
     
-    for question_id, answer_text in payload.get("answers", {}).items():
-        answer = Answer(
-            submission_id=submission_id,
-            question_id=int(question_id),
-            answer_text=answer_text
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found"
+        )
+    
+    if submission.interviewee_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify this submission"
         )
-        db.add(answer)
     
+    if submission.status == SubmissionStatus.SUBMITTED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot modify a submitted assessment"
+        )
+    
+    check_questions(db, submission, {operation.question_id for operation in sync.ops})
+    applied = answer_store.apply_operations(db, submission, [operation.model_dump() for operation in sync.ops])
+    acked_seq = submission.sync_seq
     db.commit()
-    db.refresh(submission)
-    return submission
+    
+    return AnswerSyncAck(submission_id=submission_id, acked_seq=acked_seq, applied=applied)
 
 
 @router.post("/{submission_id}/submit", response_model=SubmissionSchema)
@@ -269,6 +354,10 @@ def submit_assessment(
                 detail="Assessment already submitted"
             )
         
+        # Buffered autosaves must be in the database before the answers are graded
+        autosave_buffer.flush(db)
+        stats_before = assessment_stats.snapshot(submission)
+        
         # Calculate time taken
         if submission.started_at:
             now = datetime.now(timezone.utc)
@@ -276,36 +365,28 @@ def submit_assessment(
             time_taken = int((now - started).total_seconds())
             submission.time_taken = time_taken
         
-        # Auto-grade multiple choice questions
-        total_score = 0.0
-        for answer in submission.answers:
-            question = answer.question
-            if question.question_type == QuestionType.MULTIPLE_CHOICE:
-                if answer.answer_text == question.correct_answer:
-                    answer.is_correct = True
-                    answer.points_earned = question.points
-                    total_score += question.points
-                else:
-                    answer.is_correct = False
-                    answer.points_earned = 0
+        # Auto-grade multiple choice and multiple answer questions
+        total_score = grading.grade_submission(db, submission)
         
         submission.score = total_score
         submission.status = SubmissionStatus.SUBMITTED
         submission.submitted_at = datetime.now(timezone.utc)
         
+        assessment_stats.record_submission_change(
+            db, submission, stats_before, assessment_stats.snapshot(submission)
+        )
+        
+        # Queue email notification to recruiter
+        email_service.send_assessment_submitted_notification(
+            submission.assessment.creator.email,
+            submission.interviewee.full_name or submission.interviewee.username,
+            submission.assessment.title,
+            db=db
+        )
+        
         db.commit()
         db.refresh(submission)
         
-        # Send email notification to recruiter
-        try:
-            email_service.send_assessment_submitted_notification(
-                submission.assessment.creator.email,
-                submission.interviewee.full_name or submission.interviewee.username,
-                submission.assessment.title
-            )
-        except Exception as e:
-            print(f"Failed to send submission email: {e}")
-        
         return submission
     except Exception as e:
         print("Submit error:", e)
@@ -342,6 +423,8 @@ def grade_submission(
             detail="Can only grade submitted assessments"
         )
     
+    stats_before = assessment_stats.snapshot(submission)
+    
     # Calculate total score from all answers
     total_score = sum(answer.points_earned for answer in submission.answers)
     
@@ -349,6 +432,10 @@ def grade_submission(
     submission.status = SubmissionStatus.GRADED
     submission.graded_at = datetime.utcnow()
     
+    assessment_stats.record_submission_change(
+        db, submission, stats_before, assessment_stats.snapshot(submission)
+    )
+    
     # Create notification for interviewee
     notification = Notification(
         user_id=submission.interviewee_id,
@@ -359,20 +446,18 @@ def grade_submission(
     )
     db.add(notification)
     
+    # Queue grade notification email
+    email_service.send_result_notification(
+        submission.interviewee.email,
+        submission.assessment.title,
+        int(total_score),
+        "Graded",
+        db=db
+    )
+    
     db.commit()
     db.refresh(submission)
     
-    # Send grade notification email
-    try:
-        email_service.send_result_notification(
-            submission.interviewee.email,
-            submission.assessment.title,
-            int(total_score),
-            "Graded"
-        )
-    except Exception as e:
-        print(f"Failed to send grade email: {e}")
-    
     return submission
 
 
@@ -426,21 +511,19 @@ def add_feedback(
     )
     db.add(notification)
     
+    # Queue feedback email
+    email_service.send_feedback_notification(
+        submission.interviewee.email,
+        submission.interviewee.full_name or submission.interviewee.username,
+        submission.assessment.title,
+        feedback_data.feedback_text,
+        current_user.full_name or current_user.username,
+        db=db
+    )
+    
     db.commit()
     db.refresh(feedback)
     
-    # Send feedback email
-    try:
-        email_service.send_feedback_notification(
-            submission.interviewee.email,
-            submission.interviewee.full_name or submission.interviewee.username,
-            submission.assessment.title,
-            feedback_data.feedback_text,
-            current_user.full_name or current_user.username
-        )
-    except Exception as e:
-        print(f"Failed to send feedback email: {e}")
-    
     return feedback
 
 
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from schemas import UserCreate, User, PasswordChange
-from database import get_db
+from database import get_db, get_async_db
 from models import User as UserModel
-from auth import get_current_active_user, verify_password, get_password_hash
+from auth import get_current_active_user, hash_password, verify_and_update_password
 import os
 import uuid
 from pydantic import BaseModel
@@ -87,10 +88,12 @@ def update_profile(
     db: Session = Depends(get_db),
 ):
     """Update current user's profile"""
+    # current_user is detached from this session, so change a copy loaded here
+    user = db.get(UserModel, current_user.id)
 
     # Update only provided fields
     if profile_data.full_name is not None:
-        current_user.full_name = profile_data.full_name
+        user.full_name = profile_data.full_name
 
     if profile_data.username is not None:
         # Check if username is already taken
@@ -104,20 +107,20 @@ def update_profile(
         )
         if existing_user:
             raise HTTPException(status_code=400, detail="Username already taken")
-        current_user.username = profile_data.username
+        user.username = profile_data.username
 
     db.commit()
-    db.refresh(current_user)
+    db.refresh(user)
 
     return {
         "message": "Profile updated successfully",
         "user": {
-            "id": current_user.id,
-            "email": current_user.email,
-            "username": current_user.username,
-            "full_name": current_user.full_name,
-            "profile_picture": current_user.profile_picture,
-            "role": current_user.role,
+            "id": user.id,
+            "email": user.email,
+            "username": user.username,
+            "full_name": user.full_name,
+            "profile_picture": user.profile_picture,
+            "role": user.role,
         },
     }
 
@@ -150,34 +153,38 @@ async def upload_profile_picture(
             buffer.write(content)
 
         # Update user's profile picture in database
-        current_user.profile_picture = f"/uploads/profile_pictures/{unique_filename}"
+        user = db.get(UserModel, current_user.id)
+        user.profile_picture = f"/uploads/profile_pictures/{unique_filename}"
         db.commit()
-        db.refresh(current_user)
+        db.refresh(user)
 
         return {
             "message": "Profile picture uploaded successfully",
-            "profile_picture_url": current_user.profile_picture,
+            "profile_picture_url": user.profile_picture,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     password_data: PasswordChange,
     current_user: UserModel = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Change current user's password"""
-    if not verify_password(
-        password_data.current_password, current_user.hashed_password
-    ):
+    # The cached current_user carries no password hash
+    user = await db.get(UserModel, current_user.id)
+    valid, _ = await verify_and_update_password(
+        password_data.current_password, user.hashed_password
+    )
+    if not valid:
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
     if password_data.new_password != password_data.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match")
 
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    user.hashed_password = await hash_password(password_data.new_password)
+    await db.commit()
 
     return {"message": "Password changed successfully"}
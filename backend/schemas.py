@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Optional, List, Generic, Literal, TypeVar
 from datetime import datetime
 from models import UserRole, AssessmentStatus, QuestionType, InvitationStatus, SubmissionStatus
 
@@ -63,6 +63,7 @@ class QuestionBase(BaseModel):
     order: int = 0
     options: Optional[List[str]] = None
     correct_answer: Optional[str] = None
+    correct_answers: Optional[List[str]] = None  # For multiple answer questions
     codewars_kata_id: Optional[str] = None
     test_cases: Optional[dict] = None
     starter_code: Optional[str] = None
@@ -72,6 +73,28 @@ class QuestionCreate(QuestionBase):
     pass
 
 
+class QuestionUpdate(BaseModel):
+    question_type: Optional[QuestionType] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    points: Optional[int] = None
+    order: Optional[int] = None
+    options: Optional[List[str]] = None
+    correct_answer: Optional[str] = None
+    correct_answers: Optional[List[str]] = None
+    codewars_kata_id: Optional[str] = None
+    test_cases: Optional[dict] = None
+    starter_code: Optional[str] = None
+
+    @field_validator("question_type", "title", "points", "order")
+    @classmethod
+    def not_null(cls, value):
+        # May be left out, but not cleared
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+
 class Question(QuestionBase):
     id: int
     assessment_id: int
@@ -102,19 +125,28 @@ class AssessmentUpdate(BaseModel):
     status: Optional[AssessmentStatus] = None
 
 
-class Assessment(AssessmentBase):
+class AssessmentSummary(AssessmentBase):
     id: int
     status: AssessmentStatus
     creator_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
     published_at: Optional[datetime] = None
-    questions: List[Question] = []
 
     class Config:
         from_attributes = True
 
 
+class Assessment(AssessmentSummary):
+    questions: List[Question] = []
+
+
+class RegradeReport(BaseModel):
+    submissions: int = 0
+    answers_changed: int = 0
+    submissions_changed: int = 0
+
+
 class AssessmentWithStats(Assessment):
     total_invitations: int = 0
     total_submissions: int = 0
@@ -160,6 +192,7 @@ class InvitationWithDetails(Invitation):
 class AnswerBase(BaseModel):
     question_id: int
     answer_text: Optional[str] = None
+    selected_answers: Optional[List[str]] = None
     code_solution: Optional[str] = None
     bdd_text: Optional[str] = None
     pseudocode: Optional[str] = None
@@ -185,6 +218,29 @@ class AnswerWithQuestion(Answer):
     question: Question
 
 
+class AnswerOperation(BaseModel):
+    """One change to one answer; `seq` is the client's running sequence number"""
+    seq: int = Field(ge=1)
+    question_id: int
+    op: Literal["set", "delete"] = "set"
+    answer_text: Optional[str] = None
+    selected_answers: Optional[List[str]] = None
+    code_solution: Optional[str] = None
+    bdd_text: Optional[str] = None
+    pseudocode: Optional[str] = None
+
+
+class AnswerSync(BaseModel):
+    ops: List[AnswerOperation] = Field(default_factory=list, max_length=500)
+
+
+class AnswerSyncAck(BaseModel):
+    submission_id: int
+    # Every operation up to and including this sequence number is stored
+    acked_seq: int
+    applied: int
+
+
 # Submission Schemas
 class SubmissionBase(BaseModel):
     assessment_id: int
@@ -273,6 +329,12 @@ class Submission(SubmissionBase):
         from_attributes = True
 
 
+class SubmissionSummary(Submission):
+    """Submission list entry without answers, code or feedback"""
+    assessment: AssessmentSummary
+    interviewee: User
+
+
 class SubmissionWithDetails(Submission):
     assessment: Assessment
     interviewee: User
@@ -302,6 +364,15 @@ class Notification(NotificationBase):
         from_attributes = True
 
 
+# Pagination Schemas
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
 # Statistics Schemas
 class AssessmentStatistics(BaseModel):
     assessment_id: int
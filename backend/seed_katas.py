@@ -1,12 +1,17 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 from database import SessionLocal
-from services.codewars_service import codewars_service
+from services import kata_catalog
+from services.codewars_service import CodewarsService, codewars_service
 from models import (
     User,
     Assessment,
     Question,
     UserRole,
     AssessmentStatus,
-    QuestionType
+    QuestionType,
+    KataCatalog
 )
 
 SEED_KATA_IDS = [
@@ -41,8 +46,11 @@ SEED_KATA_IDS = [
     "5158c3a1a9f2a7a5d0000134",  # Find the least common multiple
 ]
 
-def seed():
-    db = SessionLocal()
+def seed(db: Optional[Session] = None, service: Optional[CodewarsService] = None):
+    """Create the Codewars question bank. Run it explicitly (python seed_katas.py);
+    the API no longer seeds on startup unless SEED_KATAS_ON_STARTUP is set."""
+    owns_session = db is None
+    db = db or SessionLocal()
 
     # Create system recruiter (if not exists)
     recruiter = db.query(User).filter(User.email == "system@smartrecruiter.io").first()
@@ -75,21 +83,43 @@ def seed():
         db.commit()
         db.refresh(assessment)
 
-    # Seed questions
-    for index, kata_id in enumerate(SEED_KATA_IDS):
-        print(f"Fetching kata {kata_id}...")
+    # Seed questions; ones saved without a description (e.g. from an old snapshot) are filled in
+    existing = {
+        question.codewars_kata_id: question
+        for question in db.scalars(select(Question).filter(Question.codewars_kata_id.in_(SEED_KATA_IDS)))
+    }
+    missing = [
+        kata_id for kata_id in SEED_KATA_IDS
+        if kata_id not in existing or not existing[kata_id].description
+    ]
+    print(f"{len(SEED_KATA_IDS) - len(missing)} seed katas already exist, fetching {len(missing)}...")
+
+    katas = {kata["id"]: kata for kata in (service or codewars_service).get_katas(missing)}
+
+    # Katas Codewars did not return (e.g. when offline) come from the bundled snapshot
+    offline = [kata_id for kata_id in missing if kata_id not in katas]
+    if offline:
+        kata_catalog.load_snapshot(db)
+        for kata in db.scalars(select(KataCatalog).filter(KataCatalog.id.in_(offline))):
+            if not kata.description:
+                # A blank question would never be fetched again; leave it for the next run
+                print(f" Skipped kata {kata.id}: its snapshot entry has no description")
+                continue
+            katas[kata.id] = {"id": kata.id, "name": kata.name, "description": kata.description}
 
-        kata = codewars_service.get_kata_by_id(kata_id)
+    for index, kata_id in enumerate(SEED_KATA_IDS):
+        if kata_id not in missing:
+            continue
+        kata = katas.get(kata_id)
         if not kata:
             print(f" Failed to fetch kata {kata_id}")
             continue
 
-        exists = db.query(Question).filter(
-            Question.codewars_kata_id == kata["id"]
-        ).first()
-
-        if exists:
-            print(f" {kata['name']} already exists")
+        question = existing.get(kata_id)
+        if question is not None:
+            question.title = kata["name"]
+            question.description = kata["description"]
+            print(f"Updated: {kata['name']}")
             continue
 
         question = Question(
@@ -99,7 +129,7 @@ def seed():
             description=kata["description"],
             points=10,
             order=index,
-            codewars_kata_id=kata["id"],
+            codewars_kata_id=kata_id,
             starter_code=None,
             test_cases=None
         )
@@ -108,7 +138,8 @@ def seed():
         print(f"Added: {kata['name']}")
 
     db.commit()
-    db.close()
+    if owns_session:
+        db.close()
     print("Codewars seeding complete")
 
 if __name__ == "__main__":
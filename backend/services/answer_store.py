@@ -0,0 +1,133 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models import Answer, Question
+
+# Columns a candidate writes; grading columns are left alone by saves
+CONTENT_FIELDS = ("answer_text", "selected_answers", "code_solution", "bdd_text", "pseudocode")
+
+
+def content_hash(content: Mapping[str, Any]) -> str:
+    values = {field: content.get(field) for field in CONTENT_FIELDS}
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+
+def hash_answer(answer: Answer) -> str:
+    return content_hash({field: getattr(answer, field) for field in CONTENT_FIELDS})
+
+
+def answer_content(value: Any) -> Dict[str, Any]:
+    """Content columns for one value of a save payload.
+
+    A string is the answer text, a list the selected options of a multiple
+    answer question, and a dict may set any of CONTENT_FIELDS.
+    """
+    if isinstance(value, dict):
+        content = {field: value.get(field) for field in CONTENT_FIELDS}
+    elif isinstance(value, list):
+        content = dict.fromkeys(CONTENT_FIELDS, None)
+        content["selected_answers"] = value
+    else:
+        content = dict.fromkeys(CONTENT_FIELDS, None)
+        content["answer_text"] = value
+    content["content_hash"] = content_hash(content)
+    return content
+
+
+def foreign_questions(db: Session, assessment_id: int, question_ids: Iterable[int]) -> List[int]:
+    """The ids among `question_ids` that are not questions of the assessment"""
+    question_ids = set(question_ids)
+    if not question_ids:
+        return []
+    known = set(db.scalars(
+        select(Question.id).filter(Question.assessment_id == assessment_id, Question.id.in_(question_ids))
+    ))
+    return sorted(question_ids - known)
+
+
+def upsert_answers(db: Session, submission_id: int, answers: Mapping[int, Any]) -> List[int]:
+    """Write the answers whose content changed; returns their question ids (the caller commits).
+
+    Each row is INSERT ... ON CONFLICT (submission_id, question_id) DO UPDATE,
+    and the update only fires when the content hash differs, so resaving an
+    unchanged answer writes nothing. Grading and feedback stay attached.
+    """
+    rows = [
+        {"submission_id": submission_id, "question_id": int(question_id), **answer_content(value)}
+        for question_id, value in answers.items()
+    ]
+    return [question_id for _, question_id in upsert_rows(db, rows)]
+
+
+def upsert_rows(db: Session, rows: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """Upsert answer rows of any number of submissions; returns (submission_id, question_id) of those written.
+
+    Rows carry submission_id, question_id and the output of answer_content.
+    """
+    if not rows:
+        return []
+    # Core insert: every row carries every column, so one multi-row statement covers the batch
+    table = Answer.__table__
+    statement = dialect_insert(db, table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.submission_id, table.c.question_id],
+        set_={
+            **{field: statement.excluded[field] for field in (*CONTENT_FIELDS, "content_hash")},
+            "updated_at": func.now(),
+        },
+        where=table.c.content_hash.is_distinct_from(statement.excluded.content_hash),
+    ).returning(table.c.submission_id, table.c.question_id)
+    return [tuple(row) for row in db.execute(statement, rows)]
+
+
+def save_answers(db: Session, submission_id: int, answers: Mapping[int, Any]) -> List[int]:
+    """Make the submission's answers match `answers`: upsert changes, delete answers left out"""
+    changed = upsert_answers(db, submission_id, answers)
+    delete_missing(db, submission_id, answers)
+    return changed
+
+
+def delete_missing(db: Session, submission_id: int, question_ids: Iterable[int]):
+    """Delete the submission's answers to questions other than `question_ids`"""
+    db.execute(
+        delete(Answer)
+        .where(Answer.submission_id == submission_id, Answer.question_id.not_in([int(q) for q in question_ids]))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_operations(db: Session, submission, operations: Iterable[Dict[str, Any]]) -> int:
+    """Apply answer-sync operations in sequence order; returns how many were applied (the caller commits).
+
+    Only the run that continues submission.sync_seq without a gap is applied:
+    operations at or below it were applied before and are skipped, and
+    anything after a missing number waits until the client resends from the
+    acknowledged sequence. Within the run the last operation per question wins.
+    """
+    expected = submission.sync_seq + 1
+    latest = {}
+    for operation in sorted(operations, key=lambda operation: operation["seq"]):
+        if operation["seq"] < expected:
+            continue
+        if operation["seq"] > expected:
+            break
+        latest[operation["question_id"]] = operation
+        expected += 1
+
+    upsert_answers(db, submission.id, {
+        question_id: {field: operation.get(field) for field in CONTENT_FIELDS}
+        for question_id, operation in latest.items() if operation["op"] == "set"
+    })
+    deleted = [question_id for question_id, operation in latest.items() if operation["op"] == "delete"]
+    if deleted:
+        db.execute(
+            delete(Answer)
+            .where(Answer.submission_id == submission.id, Answer.question_id.in_(deleted))
+            .execution_options(synchronize_session=False)
+        )
+    applied = expected - 1 - submission.sync_seq
+    submission.sync_seq = expected - 1
+    return applied
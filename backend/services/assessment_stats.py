@@ -0,0 +1,219 @@
+import logging
+import sys
+from typing import Dict, Iterable, Optional
+from sqlalchemy import func, case, and_
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models import Assessment, AssessmentStats, Submission, SubmissionStatus
+
+logger = logging.getLogger(__name__)
+
+PASS_PERCENTAGE = 70
+
+COUNTERS = (
+    "submission_count",
+    "completed_count",
+    "graded_count",
+    "score_count",
+    "score_sum",
+    "percent_count",
+    "score_percent_sum",
+    "pass_count",
+    "time_taken_count",
+    "time_taken_sum",
+)
+
+# (snapshot key, min column, max column)
+EXTREMES = (
+    ("score", "score_min", "score_max"),
+    ("time_taken", "time_taken_min", "time_taken_max"),
+)
+
+
+def snapshot(submission: Optional[Submission]) -> Dict:
+    """Capture what a submission currently contributes to its assessment's statistics.
+
+    Take one snapshot before changing a submission and pass it, together with a
+    snapshot taken afterwards, to record_submission_change.
+    """
+    if submission is None:
+        return {}
+
+    completed = submission.submitted_at is not None
+    graded = submission.status == SubmissionStatus.GRADED
+    values = {
+        "submission_count": 1,
+        "completed_count": int(completed),
+        "graded_count": int(graded),
+    }
+
+    if completed and submission.score is not None:
+        values.update(score_count=1, score_sum=submission.score, score=submission.score)
+
+    if graded and submission.max_score and submission.max_score > 0:
+        percent = (submission.score or 0) / submission.max_score * 100
+        values.update(
+            percent_count=1,
+            score_percent_sum=percent,
+            pass_count=int(percent >= PASS_PERCENTAGE),
+        )
+
+    if completed and submission.time_taken is not None:
+        values.update(
+            time_taken_count=1,
+            time_taken_sum=submission.time_taken,
+            time_taken=submission.time_taken,
+        )
+
+    return values
+
+
+def record_submission_change(db: Session, submission: Submission, before: Dict, after: Dict):
+    """Apply the difference between two snapshots of a submission to its statistics row.
+
+    Must be called inside the transaction that changes the submission, before commit.
+    """
+    stats, created = _lock_stats_row(db, submission.assessment_id, exclude_submission_id=submission.id)
+    if created:
+        # The fresh row was aggregated without this submission
+        before = {}
+
+    for name in COUNTERS:
+        delta = after.get(name, 0) - before.get(name, 0)
+        if delta:
+            setattr(stats, name, (getattr(stats, name) or 0) + delta)
+
+    needs_recompute = False
+    for key, min_column, max_column in EXTREMES:
+        old_value, new_value = before.get(key), after.get(key)
+        if old_value == new_value:
+            continue
+        current_min, current_max = getattr(stats, min_column), getattr(stats, max_column)
+        if old_value is not None and old_value in (current_min, current_max):
+            # The extreme may have been this submission; only a rescan can tell
+            needs_recompute = True
+        elif new_value is not None:
+            setattr(stats, min_column, new_value if current_min is None else min(current_min, new_value))
+            setattr(stats, max_column, new_value if current_max is None else max(current_max, new_value))
+
+    if needs_recompute:
+        db.flush()
+        aggregated = _aggregate(db, submission.assessment_id)
+        for _, min_column, max_column in EXTREMES:
+            setattr(stats, min_column, aggregated[min_column])
+            setattr(stats, max_column, aggregated[max_column])
+
+    stats.updated_at = func.now()
+
+
+def get_stats(db: Session, assessment_id: int) -> AssessmentStats:
+    """Return the statistics row for an assessment, building it if it does not exist yet"""
+    stats = db.query(AssessmentStats).filter(AssessmentStats.assessment_id == assessment_id).first()
+    if stats is None:
+        stats = rebuild(db, assessment_id)
+        db.commit()
+    return stats
+
+
+def rebuild(db: Session, assessment_id: int) -> AssessmentStats:
+    """Recompute an assessment's statistics row from its submissions (backfill and drift repair)"""
+    stats, created = _lock_stats_row(db, assessment_id)
+    if not created:
+        for name, value in _aggregate(db, assessment_id).items():
+            setattr(stats, name, value)
+        stats.updated_at = func.now()
+    return stats
+
+
+def rebuild_all(db: Session, assessment_ids: Optional[Iterable[int]] = None) -> int:
+    """Rebuild statistics for the given assessments, or for every assessment"""
+    if assessment_ids is None:
+        assessment_ids = [row.id for row in db.query(Assessment.id).all()]
+
+    count = 0
+    for assessment_id in assessment_ids:
+        rebuild(db, assessment_id)
+        db.commit()
+        count += 1
+    return count
+
+
+def _lock_stats_row(db: Session, assessment_id: int, exclude_submission_id: Optional[int] = None):
+    """Fetch the statistics row FOR UPDATE, creating it from an aggregate scan if missing"""
+    stats = db.query(AssessmentStats).filter(
+        AssessmentStats.assessment_id == assessment_id
+    ).with_for_update().first()
+    if stats is not None:
+        return stats, False
+
+    values = _aggregate(db, assessment_id, exclude_submission_id=exclude_submission_id)
+    db.execute(
+        dialect_insert(db, AssessmentStats)
+        .values(assessment_id=assessment_id, **values)
+        .on_conflict_do_nothing()
+    )
+    stats = db.query(AssessmentStats).filter(
+        AssessmentStats.assessment_id == assessment_id
+    ).with_for_update().populate_existing().one()
+    return stats, True
+
+
+def _aggregate(db: Session, assessment_id: int, exclude_submission_id: Optional[int] = None) -> Dict:
+    """Compute every statistics column for an assessment with a single aggregate query"""
+    completed = Submission.submitted_at.isnot(None)
+    graded = Submission.status == SubmissionStatus.GRADED
+    score = case((and_(completed, Submission.score.isnot(None)), Submission.score))
+    percent = case(
+        (and_(graded, Submission.max_score > 0), func.coalesce(Submission.score, 0) * 100.0 / Submission.max_score)
+    )
+    time_taken = case((completed, Submission.time_taken))
+
+    query = db.query(
+        func.count(Submission.id),
+        func.count(case((completed, 1))),
+        func.count(case((graded, 1))),
+        func.count(score),
+        func.coalesce(func.sum(score), 0.0),
+        func.min(score),
+        func.max(score),
+        func.count(percent),
+        func.coalesce(func.sum(percent), 0.0),
+        func.count(case((percent >= PASS_PERCENTAGE, 1))),
+        func.count(time_taken),
+        func.coalesce(func.sum(time_taken), 0),
+        func.min(time_taken),
+        func.max(time_taken),
+    ).filter(Submission.assessment_id == assessment_id)
+
+    if exclude_submission_id is not None:
+        query = query.filter(Submission.id != exclude_submission_id)
+
+    row = query.one()
+    return dict(zip((
+        "submission_count",
+        "completed_count",
+        "graded_count",
+        "score_count",
+        "score_sum",
+        "score_min",
+        "score_max",
+        "percent_count",
+        "score_percent_sum",
+        "pass_count",
+        "time_taken_count",
+        "time_taken_sum",
+        "time_taken_min",
+        "time_taken_max",
+    ), row))
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    ids = [int(arg) for arg in sys.argv[1:]] or None
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_all(db, ids)
+        print(f"Rebuilt statistics for {rebuilt} assessment(s)")
+    finally:
+        db.close()
@@ -0,0 +1,327 @@
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from models import Submission, SubmissionStatus
+from services import answer_store
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+DURABILITY_MODES = ("sync", "buffered", "journal")
+
+
+class AnswerJournal:
+    """Append-only log of buffered saves, so a crashed process loses none of them.
+
+    Saves go to numbered segment files. A flush starts a new segment and, once
+    its batch is committed, deletes the older ones. Each process holds an
+    exclusive lock on its own lock file; segments whose owner no longer holds
+    its lock belong to a dead process and are replayed by the next one to start.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.owner = uuid.uuid4().hex[:12]
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(self._lock_path(self.owner), "w")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._sequence = 0
+        self._segment = self._open_segment()
+
+    def _lock_path(self, owner: str) -> str:
+        return os.path.join(self.directory, f"autosave-{owner}.lock")
+
+    def _segments(self, owner: str) -> List[str]:
+        paths = glob.glob(os.path.join(self.directory, f"autosave-{owner}-*.jsonl"))
+        return sorted(paths, key=lambda path: int(path.rsplit("-", 1)[1].split(".")[0]))
+
+    def _open_segment(self):
+        self._sequence += 1
+        return open(os.path.join(self.directory, f"autosave-{self.owner}-{self._sequence}.jsonl"), "a")
+
+    def append(self, record: Dict):
+        # Written through to the OS: survives the process, not the machine
+        self._segment.write(json.dumps(record) + "\n")
+        self._segment.flush()
+
+    def rotate(self) -> int:
+        """Start a new segment; returns the sequence number of the one just closed"""
+        self._segment.close()
+        closed = self._sequence
+        self._segment = self._open_segment()
+        return closed
+
+    def discard_through(self, sequence: int):
+        for path in self._segments(self.owner):
+            if int(path.rsplit("-", 1)[1].split(".")[0]) <= sequence:
+                os.remove(path)
+
+    def orphans(self) -> Iterator[Tuple[str, List[Dict]]]:
+        """Yield (owner, records) left by processes that died before flushing.
+
+        The dead owner's files are deleted when the caller asks for the next
+        one, so records must be re-journaled before that.
+        """
+        for lock_path in glob.glob(os.path.join(self.directory, "autosave-*.lock")):
+            owner = os.path.basename(lock_path)[len("autosave-"):-len(".lock")]
+            if owner == self.owner:
+                continue
+            with open(lock_path, "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # the owner is alive
+                segments = self._segments(owner)
+                records = []
+                for path in segments:
+                    with open(path) as segment:
+                        # A torn last line is a save that was never acknowledged
+                        for line in segment:
+                            try:
+                                records.append(json.loads(line))
+                            except ValueError:
+                                break
+                yield owner, records
+                for path in segments:
+                    os.remove(path)
+                os.remove(lock_path)
+
+    def close(self):
+        self._segment.close()
+        self._lock_file.close()
+
+
+class AutosaveBuffer:
+    """Write-behind buffer for candidates' answers.
+
+    Keeps only the latest content per (submission_id, question_id) and writes
+    everything pending in one transaction with a multi-row upsert: every
+    `flush_interval_ms` from a background task, as soon as `max_entries`
+    answers are pending, and whenever flush() is called, e.g. by submit before
+    it grades. In "sync" durability mode every save is flushed at once.
+    """
+
+    def __init__(self, session_factory=SessionLocal, durability: Optional[str] = None,
+                 flush_interval_ms: Optional[int] = None, max_entries: Optional[int] = None,
+                 journal_dir: Optional[str] = None):
+        self.session_factory = session_factory
+        self.durability = durability or settings.autosave_durability
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown autosave durability mode: {self.durability}")
+        self.flush_interval = (flush_interval_ms or settings.autosave_flush_interval_ms) / 1000
+        self.max_entries = max_entries or settings.autosave_max_entries
+        self.journal_dir = journal_dir or settings.autosave_journal_dir
+        self.journal: Optional[AnswerJournal] = None
+
+        self._entries: Dict[Tuple[int, int], Dict] = {}
+        # Submissions whose last bulk save replaced the whole answer set, with the questions it kept
+        self._replaced: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+        # Serializes flushes, so an older batch never lands after a newer one
+        self._flush_lock = threading.Lock()
+        self._task = None
+        self.transactions = 0
+
+    @property
+    def buffering(self) -> bool:
+        return self.durability != "sync"
+
+    def _journal(self) -> Optional[AnswerJournal]:
+        if self.durability == "journal" and self.journal is None:
+            self.journal = AnswerJournal(self.journal_dir)
+        return self.journal
+
+    def _buffer(self, submission_id: int, contents: Mapping[int, Dict], replace: bool):
+        if replace:
+            for key in [key for key in self._entries if key[0] == submission_id and key[1] not in contents]:
+                del self._entries[key]
+            self._replaced[submission_id] = set(contents)
+        elif submission_id in self._replaced:
+            self._replaced[submission_id].update(contents)
+        for question_id, content in contents.items():
+            self._entries[(submission_id, question_id)] = content
+
+    def save(self, db: Session, submission_id: int, answers: Mapping[Any, Any], replace: bool = False):
+        """Buffer answers for a submission, keyed by question id.
+
+        With `replace`, answers to questions left out are deleted on the next
+        flush, as the bulk save endpoint does. Values are as accepted by
+        answer_store.answer_content. Synchronous flushes use `db`.
+        """
+        contents = {int(question_id): answer_store.answer_content(value) for question_id, value in answers.items()}
+        with self._lock:
+            self._buffer(submission_id, contents, replace)
+            journal = self._journal()
+            if journal is not None:
+                journal.append({
+                    "submission_id": submission_id,
+                    "answers": {str(question_id): content for question_id, content in contents.items()},
+                    "replace": replace,
+                })
+            pending = len(self._entries)
+        if not self.buffering or pending >= self.max_entries:
+            self.flush(db)
+
+    def pending(self, submission_id: int) -> Dict[int, Dict]:
+        """Buffered content per question for a submission, not yet in the database"""
+        with self._lock:
+            return {
+                question_id: content
+                for (pending_submission_id, question_id), content in self._entries.items()
+                if pending_submission_id == submission_id
+            }
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write everything pending in one transaction; returns how many answers changed.
+
+        If the database rejects the batch (a constraint or data error), the
+        answers are retried one per transaction and the rejected ones are
+        dropped and logged, so one bad row cannot hold back the rest. On any
+        other failure the batch is put back under newer saves and the error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries, replaced = self._entries, self._replaced
+                self._entries, self._replaced = {}, {}
+                segment = self.journal.rotate() if self.journal is not None else None
+            if not entries and not replaced:
+                if segment is not None:
+                    self.journal.discard_through(segment)
+                return 0
+
+            session = db or self.session_factory()
+            try:
+                written = self._write(session, entries, replaced)
+                session.commit()
+                self.transactions += 1
+            except (IntegrityError, DataError):
+                session.rollback()
+                # Requeues whatever it does not get to
+                written = self._write_each(session, entries, replaced)
+            except Exception:
+                session.rollback()
+                self._requeue(entries, replaced)
+                raise
+            finally:
+                if db is None:
+                    session.close()
+            if segment is not None:
+                self.journal.discard_through(segment)
+            return written
+
+    def _requeue(self, entries: Dict[Tuple[int, int], Dict], replaced: Dict[int, Set[int]]):
+        """Put unwritten saves back, under any newer ones"""
+        with self._lock:
+            for key, content in entries.items():
+                self._entries.setdefault(key, content)
+            for submission_id, kept in replaced.items():
+                self._replaced.setdefault(submission_id, kept)
+
+    def _write_each(self, db: Session, entries: Dict[Tuple[int, int], Dict], replaced: Dict[int, Set[int]]) -> int:
+        """Write answers one per transaction, dropping the ones the database rejects"""
+        written = 0
+        remaining = dict(entries)
+        try:
+            for key, content in entries.items():
+                try:
+                    written += self._write(db, {key: content}, {})
+                    db.commit()
+                    self.transactions += 1
+                except (IntegrityError, DataError) as e:
+                    db.rollback()
+                    logger.error(f"Dropped buffered answer for (submission, question) {key}: {e.orig}")
+                del remaining[key]
+            for submission_id, kept in list(replaced.items()):
+                self._write(db, {}, {submission_id: kept})
+                db.commit()
+                self.transactions += 1
+                del replaced[submission_id]
+        except Exception:
+            # Anything else (e.g. the database went away) is retried on the next flush
+            db.rollback()
+            self._requeue(remaining, replaced)
+            raise
+        return written
+
+    def _write(self, db: Session, entries: Dict[Tuple[int, int], Dict], replaced: Dict[int, Set[int]]) -> int:
+        submission_ids = {submission_id for submission_id, _ in entries} | set(replaced)
+        # Submissions deleted, submitted or graded since the save was accepted take no more answers
+        open_ids = set(db.scalars(
+            select(Submission.id).filter(
+                Submission.id.in_(submission_ids),
+                Submission.status.in_((SubmissionStatus.NOT_STARTED, SubmissionStatus.IN_PROGRESS)),
+            )
+        ))
+        dropped = submission_ids - open_ids
+        if dropped:
+            logger.warning(f"Dropped buffered answers for closed submission(s) {sorted(dropped)}")
+
+        rows = [
+            {"submission_id": submission_id, "question_id": question_id, **content}
+            for (submission_id, question_id), content in entries.items()
+            if submission_id in open_ids
+        ]
+        written = answer_store.upsert_rows(db, rows)
+        for submission_id, kept in replaced.items():
+            if submission_id in open_ids:
+                answer_store.delete_missing(db, submission_id, kept)
+        return len(written)
+
+    def recover(self) -> int:
+        """Replay saves that crashed processes journaled but never flushed"""
+        journal = self._journal()
+        if journal is None:
+            return 0
+        recovered = 0
+        for owner, records in journal.orphans():
+            with self._lock:
+                for record in records:
+                    contents = {int(question_id): content for question_id, content in record["answers"].items()}
+                    self._buffer(record["submission_id"], contents, record["replace"])
+                    journal.append(record)
+            recovered += len(records)
+        if recovered:
+            logger.info(f"Recovered {recovered} journaled autosave(s)")
+        return recovered
+
+    async def start(self):
+        if not self.buffering or self._task is not None:
+            return
+        await asyncio.to_thread(self.recover)
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            logger.error(f"Final autosave flush failed: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Autosave flush failed: {e}")
+
+
+# Singleton instance
+autosave_buffer = AutosaveBuffer()
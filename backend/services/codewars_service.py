@@ -1,53 +1,192 @@
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import OrderedDict
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
 from typing import Optional, List, Dict
+from urllib3.util.retry import Retry
 from config import get_settings
+from sqlalchemy.orm import Session
+from database import SessionLocal, dialect_insert
+from models import KataCache as KataCacheRow
+from services import kata_catalog
 
 settings = get_settings()
 
 
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class KataCache:
+    """Two-tier kata cache: a bounded in-process LRU in front of the kata_cache table.
+
+    Entries are {"payload", "etag", "fetched_at"}. Stale entries are still
+    returned by get() so the caller can revalidate them with If-None-Match.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_size: Optional[int] = None, ttl: Optional[int] = None):
+        self.session_factory = session_factory
+        self.max_size = max_size or settings.kata_cache_size
+        self.ttl = settings.kata_cache_ttl if ttl is None else ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return (datetime.now(timezone.utc) - entry["fetched_at"]).total_seconds() < self.ttl
+
+    def get(self, kata_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(kata_id)
+            if entry is not None:
+                self._entries.move_to_end(kata_id)
+                return entry
+        entry = self._load(kata_id)
+        if entry is not None:
+            self._remember(kata_id, entry)
+        return entry
+
+    def put(self, kata_id: str, payload: Dict, etag: Optional[str]) -> Dict:
+        entry = {"payload": payload, "etag": etag, "fetched_at": datetime.now(timezone.utc)}
+        self._remember(kata_id, entry)
+        self._store(kata_id, entry)
+        return entry
+
+    def clear_memory(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, kata_id: str, entry: Dict):
+        with self._lock:
+            self._entries[kata_id] = entry
+            self._entries.move_to_end(kata_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _load(self, kata_id: str) -> Optional[Dict]:
+        try:
+            with self.session_factory() as db:
+                row = db.get(KataCacheRow, kata_id)
+                if row is None:
+                    return None
+                return {"payload": row.payload, "etag": row.etag, "fetched_at": _utc(row.fetched_at)}
+        except Exception as e:
+            print(f"Kata cache lookup failed for {kata_id}: {e}")
+            return None
+
+    def _store(self, kata_id: str, entry: Dict):
+        try:
+            with self.session_factory() as db:
+                db.execute(
+                    dialect_insert(db, KataCacheRow)
+                    .values(kata_id=kata_id, **entry)
+                    .on_conflict_do_update(index_elements=[KataCacheRow.kata_id], set_=entry)
+                )
+                # Every fetched kata also becomes searchable in the local catalog
+                kata_catalog.upsert_katas(db, [entry["payload"]], entry["fetched_at"])
+                db.commit()
+        except Exception as e:
+            print(f"Kata cache store failed for {kata_id}: {e}")
+
+
 class CodewarsService:
-    BASE_URL = "https://www.codewars.com/api/v1"
-    
-    def __init__(self):
+    BASE_URL = settings.codewars_base_url
+
+    def __init__(self, base_url: Optional[str] = None, cache: Optional[KataCache] = None):
+        self.base_url = base_url or self.BASE_URL
         self.api_key = settings.codewars_api_key
         self.headers = {
             "Authorization": self.api_key
         } if self.api_key else {}
-    
-    def get_kata_by_id(self, kata_id: str) -> Optional[Dict]:
-        """Fetch a specific kata by ID"""
+        self.timeout = (settings.codewars_connect_timeout, settings.codewars_read_timeout)
+        self.cache = cache or KataCache()
+        self.network_requests = 0
+
+        # Keep-alive connections, so repeat fetches skip the TCP and TLS handshakes
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.codewars_pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("GET",)),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # One worker per pooled connection, so fan-out never waits on the pool
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.codewars_pool_size, thread_name_prefix="codewars"
+                )
+            return self._executor
+
+    def get_kata_by_id(self, kata_id: str, force: bool = False) -> Optional[Dict]:
+        """Fetch a specific kata by ID, from the cache when it is fresh.
+
+        A stale entry (or any entry, with `force`) is revalidated with its ETag,
+        and is still served if Codewars cannot be reached.
+        """
+        entry = self.cache.get(kata_id)
+        if entry is not None and not force and self.cache.is_fresh(entry):
+            return entry["payload"]
+
+        headers = {"If-None-Match": entry["etag"]} if entry and entry["etag"] else {}
         try:
-            url = f"{self.BASE_URL}/code-challenges/{kata_id}"
-            response = requests.get(url, headers=self.headers)
+            url = f"{self.base_url}/code-challenges/{kata_id}"
+            self.network_requests += 1
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry is not None:
+                return self.cache.put(kata_id, entry["payload"], entry["etag"])["payload"]
             response.raise_for_status()
-            return response.json()
+            kata = response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error fetching kata {kata_id}: {e}")
-            return None
-    
-    def search_katas(self, query: str = "", difficulty: Optional[str] = None) -> List[Dict]:
+            return entry["payload"] if entry else None
+        return self.cache.put(kata_id, kata, response.headers.get("ETag"))["payload"]
+
+    def search_katas(self, db: Session, query: str = "", difficulty: Optional[str] = None,
+                     language: Optional[str] = None, limit: int = kata_catalog.DEFAULT_LIMIT) -> List[Dict]:
+        """
+        Search for katas in the local catalog, already in our question format.
+        Codewars has no search endpoint, so the catalog is filled from fetched
+        katas and the bundled snapshot instead.
         """
-        Search for katas. Note: Codewars API has limited search capabilities.
-        This is a simplified version.
+        return [kata_catalog.as_question(kata) for kata in kata_catalog.search(db, query, difficulty, language, limit)]
+
+    def get_katas(self, kata_ids: List[str], timeout: Optional[float] = None, force: bool = False) -> List[Dict]:
+        """Fetch several katas concurrently, keeping the order of `kata_ids`.
+
+        Cache misses are fetched in parallel, so the call takes about as long as
+        the slowest fetch. Katas that fail, or are still outstanding after
+        `timeout` seconds, are left out of the result.
         """
-        # Codewars API doesn't have a direct search endpoint
-        # You would typically maintain a list of kata IDs or use their website
-        # For demo purposes, return some popular kata IDs
-        popular_katas = [
-            "5266876b8f4bf2da9b000362",  # Likes vs Dislikes
-            "54da5a58ea159efa38000836",  # Find the odd int
-            "5264d2b162488dc400000001",  # Stop gninnipS My sdroW!
-            "5667e8f4e3f572a8f2000039",  # Mumbling
-            "5390bac347d09b7da40006f6",  # Jaden Casing Strings
-        ]
-        
-        results = []
-        for kata_id in popular_katas[:5]:  # Limit to 5 for demo
-            kata = self.get_kata_by_id(kata_id)
-            if kata:
-                results.append(kata)
-        
-        return results
+        katas = {}
+        missing = []
+        for kata_id in dict.fromkeys(kata_ids):
+            entry = self.cache.get(kata_id)
+            if entry is not None and not force and self.cache.is_fresh(entry):
+                katas[kata_id] = entry["payload"]
+            else:
+                missing.append(kata_id)
+
+        if missing:
+            executor = self._get_executor()
+            futures = {executor.submit(self.get_kata_by_id, kata_id, force): kata_id for kata_id in missing}
+            done, not_done = wait(futures, timeout=timeout or settings.codewars_search_timeout)
+            for future in not_done:
+                print(f"Timed out fetching kata {futures[future]}")
+            for future in done:
+                try:
+                    katas[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Error fetching kata {futures[future]}: {e}")
+
+        return [katas[kata_id] for kata_id in dict.fromkeys(kata_ids) if katas.get(kata_id)]
     
     def format_kata_for_question(self, kata: Dict) -> Dict:
         """Format a Codewars kata into our question format"""
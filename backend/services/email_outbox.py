@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+from config import get_settings
+from models import EmailOutbox, EmailStatus
+from services.email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff after the given number of failed attempts"""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(EmailOutbox.status == EmailStatus.PENDING, EmailOutbox.next_attempt_at <= now),
+        # Claimed by a worker that never reported back
+        and_(EmailOutbox.status == EmailStatus.SENDING, EmailOutbox.locked_until < now),
+    )
+
+
+def claim_batch(db: Session, limit: int, lease_seconds: int) -> List:
+    """Lease up to `limit` due messages to the calling worker and commit the claim.
+
+    FOR UPDATE SKIP LOCKED keeps concurrent workers on PostgreSQL from waiting on
+    or taking each other's rows; the conditional UPDATE guards the same on
+    SQLite, which ignores row locks.
+    """
+    now = datetime.now(timezone.utc)
+    ids = db.scalars(
+        select(EmailOutbox.id)
+        .filter(_claimable(now))
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        db.rollback()
+        return []
+
+    claimed = db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), _claimable(now))
+        .values(
+            status=EmailStatus.SENDING,
+            locked_until=now + timedelta(seconds=lease_seconds),
+            attempts=EmailOutbox.attempts + 1,
+        )
+        .returning(
+            EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.recipients, EmailOutbox.subject,
+            EmailOutbox.body, EmailOutbox.html_body, EmailOutbox.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return claimed
+
+
+def mark_sent(db: Session, message_id: int):
+    db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id == message_id)
+        .values(status=EmailStatus.SENT, sent_at=datetime.now(timezone.utc), locked_until=None, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def mark_failed(db: Session, message_id: int, attempts: int, error: Exception, max_attempts: int):
+    """Schedule a retry with backoff, or give up after max_attempts"""
+    values = {"locked_until": None, "last_error": str(error)[:2000]}
+    if attempts >= max_attempts:
+        values["status"] = EmailStatus.FAILED
+    else:
+        values["status"] = EmailStatus.PENDING
+        values["next_attempt_at"] = datetime.now(timezone.utc) + backoff_delay(attempts)
+    db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id == message_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def process_batch(db: Session, transport=None, batch_size: Optional[int] = None) -> int:
+    """Claim and deliver one batch; returns how many messages were attempted"""
+    transport = transport or email_service.transport
+    messages = claim_batch(db, batch_size or settings.email_outbox_batch_size, settings.email_outbox_lease_seconds)
+    for message in messages:
+        try:
+            email_service.rate_limiter.acquire()
+            if message.recipients:
+                transport.send_batch(message.recipients, message.subject, message.body, message.html_body)
+            else:
+                transport.send(message.to_email, message.subject, message.body, message.html_body)
+        except Exception as e:
+            recipient = message.to_email or f"{len(message.recipients)} recipients"
+            logger.warning(f"Email {message.id} to {recipient} failed (attempt {message.attempts}): {e}")
+            mark_failed(db, message.id, message.attempts, e, settings.email_outbox_max_attempts)
+        else:
+            mark_sent(db, message.id)
+    return len(messages)
+
+
+class OutboxWorkerPool:
+    """Async workers that drain the outbox. Each batch runs in a thread so the
+    blocking database and SendGrid calls stay off the event loop."""
+
+    def __init__(self):
+        self.tasks = []
+        self.is_running = False
+
+    async def start(self, workers: Optional[int] = None):
+        if self.is_running:
+            return
+        self.is_running = True
+        for number in range(workers or settings.email_outbox_workers):
+            self.tasks.append(asyncio.create_task(self._worker_loop(number)))
+        logger.info(f"Started {len(self.tasks)} email outbox worker(s)")
+
+    async def stop(self):
+        self.is_running = False
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        logger.info("Email outbox workers stopped")
+
+    async def _worker_loop(self, number: int):
+        while self.is_running:
+            try:
+                processed = await asyncio.to_thread(self._run_once)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Email outbox worker {number} error: {e}")
+                processed = 0
+            if not processed:
+                await asyncio.sleep(settings.email_outbox_poll_interval)
+
+    def _run_once(self) -> int:
+        from database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            return process_batch(db)
+        finally:
+            db.close()
+
+
+outbox_workers = OutboxWorkerPool()
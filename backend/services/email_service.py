@@ -1,19 +1,147 @@
+import threading
+import time
 import sendgrid
-from sendgrid.helpers.mail import Mail
-from typing import List
+from sendgrid.helpers.mail import Mail, To
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
 from config import get_settings
+from models import EmailOutbox
 
 settings = get_settings()
 
+# SendGrid accepts at most 1,000 personalizations per request
+MAX_BATCH_RECIPIENTS = 1000
+
+
+def render(template: Optional[str], substitutions: Dict[str, str]) -> Optional[str]:
+    """Apply SendGrid-style substitutions locally"""
+    if template is None:
+        return None
+    for key, value in substitutions.items():
+        template = template.replace(key, str(value))
+    return template
+
+
+class TokenBucket:
+    """Blocks callers so API requests stay under `rate` per second, allowing bursts of `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SendGridTransport:
+    """Delivers through the SendGrid API; raises when the message is not accepted"""
+
+    def __init__(self, api_key: str, sender_email: str):
+        self.sg = sendgrid.SendGridAPIClient(api_key=api_key)
+        self.sender_email = sender_email
+
+    def send(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None):
+        mail = Mail(
+            from_email=self.sender_email,
+            to_emails=to_email,
+            subject=subject,
+            plain_text_content=body,
+            html_content=html_body
+        )
+        response = self.sg.send(mail)
+        if response.status_code >= 400:
+            raise RuntimeError(f"SendGrid returned {response.status_code}")
+        return response
+
+    def send_batch(self, recipients: List[Dict], subject: str, body: str, html_body: Optional[str] = None):
+        """One request with a personalization (and its substitutions) per recipient"""
+        mail = Mail(
+            from_email=self.sender_email,
+            to_emails=[To(r["email"], substitutions=r.get("substitutions") or None) for r in recipients],
+            subject=subject,
+            plain_text_content=body,
+            html_content=html_body,
+            is_multiple=True
+        )
+        response = self.sg.send(mail)
+        if response.status_code >= 400:
+            raise RuntimeError(f"SendGrid returned {response.status_code}")
+        return response
+
+
+class ConsoleTransport:
+    """Stand-in used when SendGrid is not configured"""
+
+    def send(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None):
+        print(f" Would send to {to_email}: {subject}")
+        print(f" Body preview: {body[:100]}...")
+
+    def send_batch(self, recipients: List[Dict], subject: str, body: str, html_body: Optional[str] = None):
+        print(f" Would send to {len(recipients)} recipients: {subject}")
+
+
+class MemoryTransport:
+    """Keeps sent messages in a list, for tests and local development"""
+
+    def __init__(self):
+        self.sent = []
+        self.requests = 0
+
+    def send(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None):
+        self.requests += 1
+        self.sent.append({"to_email": to_email, "subject": subject, "body": body, "html_body": html_body})
+
+    def send_batch(self, recipients: List[Dict], subject: str, body: str, html_body: Optional[str] = None):
+        self.requests += 1
+        for recipient in recipients:
+            substitutions = recipient.get("substitutions") or {}
+            self.sent.append({
+                "to_email": recipient["email"],
+                "subject": render(subject, substitutions),
+                "body": render(body, substitutions),
+                "html_body": render(html_body, substitutions),
+            })
+
+
+def create_transport(sender_email: str):
+    name = settings.email_transport or ("sendgrid" if settings.sendgrid_api_key else "console")
+    if name == "sendgrid":
+        return SendGridTransport(settings.sendgrid_api_key, sender_email)
+    if name == "memory":
+        return MemoryTransport()
+    return ConsoleTransport()
+
+
 class EmailService:
     def __init__(self):
         self.sender_email = settings.email_sender or "noreply@smartrecruiter.com"
-        self.sendgrid_api_key = settings.sendgrid_api_key
-        self.sg = sendgrid.SendGridAPIClient(api_key=self.sendgrid_api_key) if self.sendgrid_api_key else None
+        self.transport = create_transport(self.sender_email)
+        self.rate_limiter = TokenBucket(settings.email_rate_limit_per_second, settings.email_rate_limit_burst)
         self.frontend_url = settings.frontend_url
 
-    def send_invitation_email(self, to_email: str, assessment_title: str, scheduled_start: str = None):
+    def send_invitation_email(self, to_email: str, assessment_title: str, scheduled_start: str = None, db: Session = None):
         """Send invitation email to candidate"""
+        subject, body = self._invitation_content(assessment_title, scheduled_start)
+        self._send_email(to_email, subject, body, db=db)
+
+    def send_invitation_batch(self, to_emails: List[str], assessment_title: str, scheduled_start: str = None, db: Session = None):
+        """Send the invitation email to many candidates in as few requests as possible"""
+        subject, body = self._invitation_content(assessment_title, scheduled_start)
+        return self.send_batch([{"email": email} for email in to_emails], subject, body, db=db)
+
+    def _invitation_content(self, assessment_title: str, scheduled_start: str = None):
         subject = f"Invitation to Assessment: {assessment_title}"
         
         body = f"""
@@ -30,10 +158,9 @@ class EmailService:
         Best regards,
         Smart Recruiter Team
         """
+        return subject, body
 
-        self._send_email(to_email, subject, body)
-
-    def send_reminder_email(self, to_email: str, assessment_title: str, scheduled_start: str):
+    def send_reminder_email(self, to_email: str, assessment_title: str, scheduled_start: str, db: Session = None):
         """Send reminder email before assessment"""
         subject = f"Reminder: Assessment Starting Soon - {assessment_title}"
         
@@ -51,9 +178,9 @@ class EmailService:
         Smart Recruiter Team
         """
 
-        self._send_email(to_email, subject, body)
+        self._send_email(to_email, subject, body, db=db)
 
-    def send_result_notification(self, to_email: str, assessment_title: str, score: int, status: str):
+    def send_result_notification(self, to_email: str, assessment_title: str, score: int, status: str, db: Session = None):
         """Send notification when results are available"""
         subject = f"Assessment Results Available: {assessment_title}"
         
@@ -71,9 +198,9 @@ class EmailService:
         Smart Recruiter Team
         """
 
-        self._send_email(to_email, subject, body)
+        self._send_email(to_email, subject, body, db=db)
 
-    def send_feedback_notification(self, to_email: str, candidate_name: str, assessment_title: str, feedback_text: str, recruiter_name: str):
+    def send_feedback_notification(self, to_email: str, candidate_name: str, assessment_title: str, feedback_text: str, recruiter_name: str, db: Session = None):
         """Send notification to candidate when recruiter provides feedback"""
         subject = f"New Feedback: {assessment_title}"
         
@@ -91,9 +218,9 @@ class EmailService:
         Smart Recruiter Team
         """
 
-        self._send_email(to_email, subject, body)
+        self._send_email(to_email, subject, body, db=db)
 
-    def send_invitation_declined_notification(self, to_email: str, candidate_name: str, assessment_title: str):
+    def send_invitation_declined_notification(self, to_email: str, candidate_name: str, assessment_title: str, db: Session = None):
         """Send notification to recruiter when candidate declines invitation"""
         subject = f"Invitation Declined: {assessment_title}"
         
@@ -110,9 +237,9 @@ class EmailService:
         Smart Recruiter Team
         """
 
-        self._send_email(to_email, subject, body)
+        self._send_email(to_email, subject, body, db=db)
 
-    def send_assessment_submitted_notification(self, to_email: str, candidate_name: str, assessment_title: str):
+    def send_assessment_submitted_notification(self, to_email: str, candidate_name: str, assessment_title: str, db: Session = None):
         """Send notification to recruiter when candidate submits assessment"""
         subject = f"Assessment Submitted: {assessment_title}"
         
@@ -129,31 +256,57 @@ class EmailService:
         Smart Recruiter Team
         """
 
-        self._send_email(to_email, subject, body)
+        self._send_email(to_email, subject, body, db=db)
 
-    def _send_email(self, to_email: str, subject: str, body: str):
-        """Internal method to send email using SendGrid"""
-        if not self.sg:
-            print(f"  SENDGRID NOT CONFIGURED: Missing SENDGRID_API_KEY in .env")
-            print(f" Would send to {to_email}: {subject}")
-            print(f" Body preview: {body[:100]}...")
+    def _send_email(self, to_email: str, subject: str, body: str, html_body: str = None, db: Session = None):
+        """Queue an email in the outbox, or send it right away when no session is given.
+
+        Queued messages are committed with the caller's transaction and delivered
+        by the outbox workers (services/email_outbox.py).
+        """
+        if db is not None:
+            db.add(EmailOutbox(to_email=to_email, subject=subject, body=body, html_body=html_body))
             return
 
         try:
-            print(f" Sending email via SendGrid to {to_email}...")
-            
-            mail = Mail(
-                from_email=self.sender_email,
-                to_emails=to_email,
-                subject=subject,
-                plain_text_content=body
-            )
-            
-            response = self.sg.send(mail)
-            print(f" Email sent successfully to {to_email}. Status: {response.status_code}")
+            self.deliver(to_email, subject, body, html_body)
         except Exception as e:
             print(f" Failed to send email to {to_email}: {e}")
-            print(f" Check SENDGRID_API_KEY in .env file")
+
+    def deliver(self, to_email: str, subject: str, body: str, html_body: str = None):
+        """Hand a message to the configured transport, raising if it is rejected"""
+        self.rate_limiter.acquire()
+        return self.transport.send(to_email, subject, body, html_body)
+
+    def send_batch(self, recipients: List[Dict], subject: str, body: str, html_body: str = None,
+                   db: Session = None) -> List[Dict]:
+        """Send one template to many recipients, up to MAX_BATCH_RECIPIENTS per request.
+
+        Each recipient is {"email": ..., "substitutions": {"-key-": value}}; the
+        keys are replaced in the subject and bodies per recipient. With a
+        session every batch is queued in the outbox, otherwise it is sent now.
+        Returns one result per batch.
+        """
+        results = []
+        for start in range(0, len(recipients), MAX_BATCH_RECIPIENTS):
+            batch = recipients[start:start + MAX_BATCH_RECIPIENTS]
+            result = {"batch": len(results) + 1, "recipients": len(batch)}
+            if db is not None:
+                db.add(EmailOutbox(recipients=batch, subject=subject, body=body, html_body=html_body))
+                result["status"] = "queued"
+            else:
+                try:
+                    self.deliver_batch(batch, subject, body, html_body)
+                    result["status"] = "sent"
+                except Exception as e:
+                    print(f" Failed to send batch of {len(batch)} emails: {e}")
+                    result.update(status="failed", error=str(e))
+            results.append(result)
+        return results
+
+    def deliver_batch(self, recipients: List[Dict], subject: str, body: str, html_body: str = None):
+        self.rate_limiter.acquire()
+        return self.transport.send_batch(recipients, subject, body, html_body)
 
 # Singleton instance
 email_service = EmailService()
@@ -0,0 +1,289 @@
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+from config import get_settings
+from models import Answer, Assessment, Question, QuestionType, Submission, SubmissionStatus
+from services import assessment_stats
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+AUTO_GRADED_TYPES = (QuestionType.MULTIPLE_CHOICE, QuestionType.MULTIPLE_ANSWER)
+# Fields of a question that change how its answers are graded
+KEY_FIELDS = ("question_type", "points", "correct_answer", "correct_answers")
+
+REGRADE_CHUNK_SIZE = 1000
+
+
+class KeyEntry(NamedTuple):
+    question_type: QuestionType
+    points: float
+    # Stripped option for multiple choice, frozenset of stripped options for multiple answer
+    correct: Union[str, FrozenSet[str]]
+
+
+# question id -> KeyEntry, for the auto-gradable questions of one assessment
+AnswerKey = Dict[int, KeyEntry]
+
+
+class GradeResult(NamedTuple):
+    question_id: int
+    is_correct: bool
+    points_earned: float
+
+
+def _normalize(value) -> Optional[str]:
+    return value.strip() if isinstance(value, str) else None
+
+
+def _normalize_set(values) -> FrozenSet[str]:
+    return frozenset(value.strip() for value in values or () if isinstance(value, str))
+
+
+def compile_key(questions: Iterable) -> AnswerKey:
+    """Build an answer key from question rows (id, question_type, points, correct_answer, correct_answers).
+
+    Questions that cannot be auto-graded, or have no correct answer set, are left out.
+    """
+    key = {}
+    for question in questions:
+        if question.question_type == QuestionType.MULTIPLE_CHOICE:
+            correct = _normalize(question.correct_answer)
+            if correct is None:
+                continue
+        elif question.question_type == QuestionType.MULTIPLE_ANSWER:
+            correct = _normalize_set(question.correct_answers)
+            if not correct:
+                continue
+        else:
+            continue
+        key[question.id] = KeyEntry(question.question_type, float(question.points or 0), correct)
+    return key
+
+
+def score(entry: KeyEntry, answer_text: Optional[str], selected_answers: Optional[Sequence[str]],
+          partial_credit: Optional[bool] = None) -> Tuple[bool, float]:
+    """(is_correct, points_earned) for one answer.
+
+    Multiple answer questions score full points for the exact set. With partial
+    credit, any other selection earns points in proportion to correct picks
+    minus wrong picks, never below zero.
+    """
+    if entry.question_type == QuestionType.MULTIPLE_CHOICE:
+        is_correct = _normalize(answer_text) == entry.correct
+        return is_correct, entry.points if is_correct else 0.0
+
+    selected = _normalize_set(selected_answers)
+    if selected == entry.correct:
+        return True, entry.points
+    if partial_credit is None:
+        partial_credit = settings.multiple_answer_partial_credit
+    if not partial_credit:
+        return False, 0.0
+    hits = len(selected & entry.correct)
+    misses = len(selected - entry.correct)
+    return False, entry.points * max(0, hits - misses) / len(entry.correct)
+
+
+def grade_answers(key: AnswerKey, answers: Iterable, partial_credit: Optional[bool] = None) -> List[GradeResult]:
+    """Grade answer rows (question_id, answer_text, selected_answers) against a key in one pass.
+
+    Pure: no database access, so it can grade any number of submissions.
+    Answers to questions outside the key are skipped.
+    """
+    results = []
+    for question_id, answer_text, selected_answers in answers:
+        entry = key.get(question_id)
+        if entry is not None:
+            results.append(GradeResult(question_id, *score(entry, answer_text, selected_answers, partial_credit)))
+    return results
+
+
+class AnswerKeyCache:
+    """Compiled answer keys by (assessment id, answer_key_version).
+
+    Changing an assessment's questions bumps its version (see invalidate), so
+    every process stops using the old key without being told.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or settings.answer_key_cache_size
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self.compiled = 0
+
+    def get(self, db: Session, assessment: Assessment) -> AnswerKey:
+        cache_key = (assessment.id, assessment.answer_key_version)
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is not None:
+                self._keys.move_to_end(cache_key)
+                return key
+
+        key = compile_key(db.execute(
+            select(Question.id, Question.question_type, Question.points,
+                   Question.correct_answer, Question.correct_answers)
+            .filter(Question.assessment_id == assessment.id, Question.question_type.in_(AUTO_GRADED_TYPES))
+        ))
+        with self._lock:
+            self.compiled += 1
+            self._keys[cache_key] = key
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+answer_keys = AnswerKeyCache()
+
+
+def invalidate(assessment: Assessment):
+    """Call whenever an assessment's questions change (the caller commits)"""
+    assessment.answer_key_version = Assessment.answer_key_version + 1
+
+
+def grade_submission(db: Session, submission) -> float:
+    """Auto-grade a submission's answers; returns the points earned (the caller commits).
+
+    Reads the answers in one query and writes is_correct and points_earned
+    back with one batched UPDATE. Answers to questions that need a human are
+    left as they are.
+    """
+    key = answer_keys.get(db, submission.assessment)
+    rows = db.execute(
+        select(Answer.id, Answer.question_id, Answer.answer_text, Answer.selected_answers)
+        .filter(Answer.submission_id == submission.id)
+    ).all()
+    answer_ids = {row.question_id: row.id for row in rows}
+    results = grade_answers(key, ((row.question_id, row.answer_text, row.selected_answers) for row in rows))
+    if results:
+        db.execute(update(Answer), [
+            {"id": answer_ids[result.question_id], "is_correct": result.is_correct,
+             "points_earned": result.points_earned}
+            for result in results
+        ])
+    return sum(result.points_earned for result in results)
+
+
+def regrade_chunks(db: Session, assessment: Assessment, chunk_size: int = REGRADE_CHUNK_SIZE,
+                   reset_question_ids: Iterable[int] = ()) -> Iterator[Dict]:
+    """Regrade every submitted submission of an assessment against its current key.
+
+    Works through the submissions in id order, `chunk_size` at a time, and
+    commits each chunk: one SELECT of the auto-gradable answers, one batched
+    UPDATE of the answers whose grade changed, and one set-based UPDATE of the
+    submission scores and maximum scores that no longer match. Answers to
+    `reset_question_ids`, questions an edit took out of the key, lose their
+    auto-awarded grade. Yields a progress report after each chunk; statistics
+    are rebuilt after the last one.
+    """
+    key = answer_keys.get(db, assessment)
+    assessment_id = assessment.id  # commits below expire the instance
+    reset_ids = [question_id for question_id in reset_question_ids if question_id not in key]
+    question_ids = list(key) + reset_ids
+    max_score = float(db.scalar(
+        select(func.coalesce(func.sum(Question.points), 0)).filter(Question.assessment_id == assessment_id)
+    ))
+    new_score = (
+        select(func.coalesce(func.sum(Answer.points_earned), 0.0))
+        .filter(Answer.submission_id == Submission.id)
+        .scalar_subquery()
+    )
+    totals = {"submissions": 0, "answers_changed": 0, "submissions_changed": 0}
+    last_id = 0
+    chunk = 0
+    while True:
+        submission_ids = db.scalars(
+            select(Submission.id)
+            .filter(
+                Submission.assessment_id == assessment_id,
+                Submission.status.in_((SubmissionStatus.SUBMITTED, SubmissionStatus.GRADED)),
+                Submission.id > last_id,
+            )
+            .order_by(Submission.id)
+            .limit(chunk_size)
+        ).all()
+        if not submission_ids:
+            break
+        last_id = submission_ids[-1]
+        chunk += 1
+
+        rows = db.execute(
+            select(Answer.id, Answer.question_id, Answer.answer_text, Answer.selected_answers,
+                   Answer.is_correct, Answer.points_earned)
+            .filter(Answer.submission_id.in_(submission_ids), Answer.question_id.in_(question_ids))
+        ).all()
+        changes = []
+        for row in rows:
+            entry = key.get(row.question_id)
+            if entry is None:
+                is_correct, points_earned = None, 0.0
+            else:
+                is_correct, points_earned = score(entry, row.answer_text, row.selected_answers)
+            if (is_correct, points_earned) != (row.is_correct, row.points_earned):
+                changes.append({"id": row.id, "is_correct": is_correct, "points_earned": points_earned})
+        if changes:
+            db.execute(update(Answer), changes)
+
+        rescored = db.execute(
+            update(Submission)
+            .where(
+                Submission.id.in_(submission_ids),
+                or_(Submission.score.is_distinct_from(new_score), Submission.max_score.is_distinct_from(max_score)),
+            )
+            .values(score=new_score, max_score=max_score)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+
+        totals["submissions"] += len(submission_ids)
+        totals["answers_changed"] += len(changes)
+        totals["submissions_changed"] += rescored
+        report = {"chunk": chunk, "submissions": len(submission_ids), "answers_changed": len(changes),
+                  "submissions_changed": rescored}
+        logger.info(f"Regrade of assessment {assessment_id}: chunk {chunk} {report}, total {totals}")
+        yield report
+
+    if totals["submissions_changed"]:
+        assessment_stats.rebuild(db, assessment_id)
+        db.commit()
+    yield {"done": True, **totals}
+
+
+def regrade_assessment(db: Session, assessment: Assessment, chunk_size: int = REGRADE_CHUNK_SIZE,
+                       reset_question_ids: Iterable[int] = ()) -> Dict:
+    """Run regrade_chunks to the end; returns the totals"""
+    report = {}
+    for report in regrade_chunks(db, assessment, chunk_size, reset_question_ids):
+        pass
+    return report
+
+
+def regrade_in_background(bind, assessment_id: int, reset_question_ids: Iterable[int] = ()):
+    """Regrade with a session of its own, e.g. as a background task after the request's session is closed"""
+    with Session(bind=bind) as db:
+        assessment = db.get(Assessment, assessment_id)
+        if assessment is not None:
+            regrade_assessment(db, assessment, reset_question_ids=reset_question_ids)
+
+
+if __name__ == "__main__":
+    # python -m services.grading <assessment id> [...]
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        for assessment_id in (int(arg) for arg in sys.argv[1:]):
+            assessment = db.get(Assessment, assessment_id)
+            if assessment is None:
+                print(f"Assessment {assessment_id} not found")
+                continue
+            for report in regrade_chunks(db, assessment):
+                print(f"Assessment {assessment_id}: {report}")
@@ -0,0 +1,200 @@
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, insert, literal_column, select
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models import KataCatalog, KataLanguage
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "kata_catalog.json")
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Must match the expression of ix_kata_catalog_search_text for the index to be used
+SEARCH_VECTOR = literal_column("to_tsvector('simple'::regconfig, kata_catalog.search_text)")
+
+
+def _search_text(kata: Dict) -> str:
+    return " ".join([kata.get("name") or "", " ".join(kata.get("tags") or []), kata.get("description") or ""]).lower()
+
+
+def _row(kata: Dict, fetched_at: datetime) -> Dict:
+    return {
+        "id": kata["id"],
+        "name": kata.get("name") or "",
+        "description": kata.get("description") or "",
+        "rank_name": (kata.get("rank") or {}).get("name"),
+        "tags": kata.get("tags") or [],
+        "languages": [language.lower() for language in kata.get("languages") or []],
+        "search_text": _search_text(kata),
+        "fetched_at": fetched_at,
+    }
+
+
+def upsert_katas(db: Session, katas: Iterable[Dict], fetched_at: Optional[datetime] = None) -> int:
+    """Insert or refresh catalog rows from Codewars kata payloads (the caller commits)"""
+    fetched_at = fetched_at or datetime.now(timezone.utc)
+    rows = list({kata["id"]: _row(kata, fetched_at) for kata in katas if kata and kata.get("id")}.values())
+    if not rows:
+        return 0
+    statement = dialect_insert(db, KataCatalog)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[KataCatalog.id],
+            set_={column: statement.excluded[column] for column in rows[0] if column != "id"},
+        ),
+        rows
+    )
+    ids = [row["id"] for row in rows]
+    db.execute(delete(KataLanguage).where(KataLanguage.kata_id.in_(ids)))
+    languages = [
+        {"language": language, "kata_id": row["id"]}
+        for row in rows for language in dict.fromkeys(row["languages"])
+    ]
+    if languages:
+        db.execute(insert(KataLanguage), languages)
+    return len(rows)
+
+
+def _terms(query: str) -> List[str]:
+    # Word characters only, so the terms are safe to splice into a tsquery
+    return re.findall(r"\w+", query.lower())
+
+
+def search(db: Session, query: str = "", difficulty: Optional[str] = None, language: Optional[str] = None,
+           limit: int = DEFAULT_LIMIT) -> List[KataCatalog]:
+    """Search the catalog; every query word is matched as a prefix, for typeahead.
+
+    PostgreSQL answers from the GIN full-text index, other databases with LIKE.
+    Katas whose name starts with the query are listed first.
+    """
+    statement = select(KataCatalog)
+    if difficulty:
+        statement = statement.filter(KataCatalog.rank_name == difficulty)
+    if language:
+        statement = statement.filter(KataCatalog.id.in_(
+            select(KataLanguage.kata_id).filter(KataLanguage.language == language.lower())
+        ))
+
+    terms = _terms(query)
+    order = [KataCatalog.name]
+    if terms:
+        if db.get_bind().dialect.name == "postgresql":
+            tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), " & ".join(f"{term}:*" for term in terms))
+            statement = statement.filter(SEARCH_VECTOR.op("@@")(tsquery))
+            order = [func.ts_rank(SEARCH_VECTOR, tsquery).desc(), KataCatalog.name]
+        else:
+            for term in terms:
+                statement = statement.filter(KataCatalog.search_text.contains(term, autoescape=True))
+        order.insert(0, KataCatalog.name.istartswith(query.strip(), autoescape=True).desc())
+
+    limit = max(1, min(limit, MAX_LIMIT))
+    return db.scalars(statement.order_by(*order).limit(limit)).all()
+
+
+def as_question(kata: KataCatalog) -> Dict:
+    """Same shape as CodewarsService.format_kata_for_question"""
+    return {
+        "title": kata.name,
+        "description": kata.description,
+        "codewars_kata_id": kata.id,
+        "difficulty": kata.rank_name or "",
+        "tags": kata.tags or [],
+        "languages": kata.languages or [],
+    }
+
+
+def load_snapshot(db: Session, path: str = SNAPSHOT_PATH, only_missing: bool = True) -> int:
+    """Load the bundled snapshot; by default only katas the catalog does not have yet"""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        snapshot = json.load(f)
+    katas = snapshot["katas"]
+    if only_missing:
+        known = set(db.scalars(select(KataCatalog.id).filter(KataCatalog.id.in_([k["id"] for k in katas]))))
+        katas = [kata for kata in katas if kata["id"] not in known]
+    fetched_at = datetime.fromisoformat(snapshot["generated_at"])
+    return upsert_katas(db, katas, fetched_at)
+
+
+def write_snapshot(db: Session, path: str = SNAPSHOT_PATH) -> int:
+    rows = db.scalars(select(KataCatalog).order_by(KataCatalog.id)).all()
+    katas = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "description": row.description,
+            "rank": {"name": row.rank_name},
+            "tags": row.tags,
+            "languages": row.languages,
+        }
+        for row in rows
+    ]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"generated_at": datetime.now(timezone.utc).isoformat(), "katas": katas}, f, indent=1)
+    return len(katas)
+
+
+def regenerate_snapshot(db: Session, service=None, path: str = SNAPSHOT_PATH) -> int:
+    """Rewrite the snapshot from the catalog, first fetching the seed katas from Codewars.
+
+    The snapshot is seed_katas.py's offline fallback, so it must carry every
+    seed kata with its description. Katas that cannot be fetched now keep their
+    current entry; if any seed kata is still missing or blank, nothing is written.
+    """
+    from seed_katas import SEED_KATA_IDS
+    from services.codewars_service import codewars_service
+
+    upsert_katas(db, (service or codewars_service).get_katas(SEED_KATA_IDS, force=True))
+    load_snapshot(db, path)
+    described = set(db.scalars(
+        select(KataCatalog.id).filter(KataCatalog.id.in_(SEED_KATA_IDS), KataCatalog.description != "")
+    ))
+    incomplete = sorted(set(SEED_KATA_IDS) - described)
+    if incomplete:
+        raise RuntimeError(f"Seed katas missing or without a description, snapshot not written: {', '.join(incomplete)}")
+    return write_snapshot(db, path)
+
+
+def refresh(db: Session, max_age: timedelta, batch_size: int = 200) -> int:
+    """Re-fetch the katas that have gone longest without an update, oldest first.
+
+    Incremental: each run touches at most `batch_size` katas older than `max_age`.
+    """
+    from services.codewars_service import codewars_service
+
+    cutoff = datetime.now(timezone.utc) - max_age
+    stale = db.scalars(
+        select(KataCatalog.id)
+        .filter(KataCatalog.fetched_at < cutoff)
+        .order_by(KataCatalog.fetched_at)
+        .limit(batch_size)
+    ).all()
+    if not stale:
+        return 0
+    # Fetched katas are written to the catalog by the service itself
+    return len(codewars_service.get_katas(stale, force=True))
+
+
+if __name__ == "__main__":
+    # python -m services.kata_catalog [load-snapshot | write-snapshot | refresh [max age in hours]]
+    from config import get_settings
+    from database import SessionLocal
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "refresh"
+    with SessionLocal() as db:
+        if command == "load-snapshot":
+            count = load_snapshot(db, only_missing=False)
+        elif command == "write-snapshot":
+            count = regenerate_snapshot(db)
+        else:
+            hours = float(sys.argv[2]) if len(sys.argv) > 2 else get_settings().kata_cache_ttl / 3600
+            count = refresh(db, timedelta(hours=hours))
+        db.commit()
+    print(f"{command}: {count} kata(s)")
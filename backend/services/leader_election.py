@@ -0,0 +1,140 @@
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlalchemy import create_engine, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from config import get_settings
+from database import dialect_insert
+from models import SchedulerStatus
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderLock:
+    """Leadership held as a session-level PostgreSQL advisory lock.
+
+    The lock lives on a dedicated connection that the leader keeps open, so it
+    is released by the server as soon as the leader's process or connection
+    dies and a standby can take over on its next attempt. SQLite has no
+    advisory locks and is single-process in practice, so there every process
+    leads.
+    """
+
+    def __init__(self, name: str, lock_id: int, database_url: Optional[str] = None):
+        self.name = name
+        self.lock_id = lock_id
+        self.database_url = database_url or settings.scheduler_lock_database_url or settings.database_url
+        self.is_leader = False
+        self._engine = None
+        self._connection = None
+
+    @property
+    def is_advisory(self) -> bool:
+        return not self.database_url.startswith("sqlite")
+
+    def _get_engine(self):
+        if self._engine is None:
+            # Unpooled: the leader's connection is pinned for as long as it leads
+            self._engine = create_engine(self.database_url, poolclass=NullPool)
+        return self._engine
+
+    def try_acquire(self) -> bool:
+        """Become leader if nobody else is; returns whether this process leads"""
+        if self.is_leader:
+            return self.check()
+        if not self.is_advisory:
+            self.is_leader = True
+            return True
+        connection = self._get_engine().connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": self.lock_id}
+            ).scalar()
+            # End the implicit transaction; the session-level lock outlives it
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if acquired:
+            self._connection = connection
+            self.is_leader = True
+        else:
+            connection.close()
+        return self.is_leader
+
+    def check(self) -> bool:
+        """Confirm the lock's connection is still alive; a dropped connection means the lock is gone"""
+        if not self.is_leader or self._connection is None:
+            return self.is_leader
+        try:
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+        except Exception as e:
+            logger.warning(f"Lost {self.name} leadership: {e}")
+            self._discard()
+        return self.is_leader
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": self.lock_id})
+                self._connection.commit()
+            except Exception as e:
+                logger.warning(f"Could not release {self.name} lock: {e}")
+        self._discard()
+
+    def _discard(self):
+        self.is_leader = False
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+
+def record_election(db: Session, name: str):
+    now = datetime.now(timezone.utc)
+    db.execute(
+        dialect_insert(db, SchedulerStatus)
+        .values(name=name, leader_id=INSTANCE_ID, elected_at=now, last_tick_at=None)
+        .on_conflict_do_update(
+            index_elements=[SchedulerStatus.name],
+            set_={"leader_id": INSTANCE_ID, "elected_at": now, "last_tick_at": None},
+        )
+    )
+    db.commit()
+
+
+def record_tick(db: Session, name: str):
+    db.execute(
+        update(SchedulerStatus)
+        .where(SchedulerStatus.name == name, SchedulerStatus.leader_id == INSTANCE_ID)
+        .values(last_tick_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def get_status(db: Session, name: str, lock: LeaderLock, running: bool) -> Dict:
+    """This process's role together with the leader recorded in the database"""
+    row = db.scalar(select(SchedulerStatus).filter(SchedulerStatus.name == name))
+    if not running:
+        role = "stopped"
+    else:
+        role = "leader" if lock.is_leader else "standby"
+    return {
+        "name": name,
+        "instance": INSTANCE_ID,
+        "role": role,
+        "leader": row.leader_id if row else None,
+        "elected_at": row.elected_at if row else None,
+        "last_tick_at": row.last_tick_at if row else None,
+    }
@@ -1,10 +1,13 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+from datetime import datetime, timezone
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from models import Invitation, Assessment, User, Notification
+from sqlalchemy import select
+from models import Invitation, InvitationStatus, Assessment, Notification, ReminderStatus, Submission
+from services import reminders
+from services.leader_election import INSTANCE_ID, LeaderLock, get_status, record_election, record_tick
 from services.email_service import email_service
 from config import get_settings
 
@@ -16,9 +19,12 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 class NotificationScheduler:
+    name = "notifications"
+
     def __init__(self):
         self.is_running = False
         self.task = None
+        self.leader_lock = LeaderLock(self.name, settings.scheduler_lock_id)
 
     async def start(self):
         """Start the notification scheduler"""
@@ -39,114 +45,142 @@ class NotificationScheduler:
                 await self.task
             except asyncio.CancelledError:
                 pass
+        # Hand leadership to a standby straight away rather than when the connection drops
+        await asyncio.to_thread(self.leader_lock.release)
         logger.info("Notification scheduler stopped")
 
     async def _scheduler_loop(self):
-        """Main scheduler loop"""
+        """Main scheduler loop: send what is due, then sleep until the next reminder.
+
+        Every worker process runs this loop, but only the one holding the leader
+        lock does any work; the others check back every SCHEDULER_STANDBY_INTERVAL.
+        """
         while self.is_running:
             try:
-                await self._check_and_send_notifications()
-                # Check every 5 minutes
-                await asyncio.sleep(300)
+                if not await asyncio.to_thread(self._ensure_leadership):
+                    await asyncio.sleep(settings.scheduler_standby_interval)
+                    continue
+                next_due = await asyncio.to_thread(self._run_once)
+                await asyncio.sleep(self._seconds_until(next_due))
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in scheduler loop: {e}")
                 await asyncio.sleep(60)  # Wait 1 minute before retrying
 
-    async def _check_and_send_notifications(self):
-        """Check for upcoming assessments and send notifications"""
+    def _ensure_leadership(self) -> bool:
         from database import SessionLocal
-        
+
+        was_leader = self.leader_lock.is_leader
+        if not self.leader_lock.try_acquire():
+            return False
+        if not was_leader:
+            logger.info(f"{INSTANCE_ID} is now the notification scheduler leader")
+            db = SessionLocal()
+            try:
+                record_election(db, self.name)
+            finally:
+                db.close()
+        return True
+
+    def status(self, db: Session) -> dict:
+        return get_status(db, self.name, self.leader_lock, self.is_running)
+
+    def _seconds_until(self, next_due: Optional[datetime]) -> float:
+        if next_due is None:
+            return settings.reminder_max_sleep_seconds
+        remaining = (next_due - datetime.now(timezone.utc)).total_seconds()
+        # At least a second, so rows locked by another instance are not polled in a tight loop
+        return min(max(remaining, 1.0), settings.reminder_max_sleep_seconds)
+
+    def _run_once(self) -> Optional[datetime]:
+        from database import SessionLocal
+
         db = SessionLocal()
         try:
-            # Get upcoming assessments in the next 24 hours
-            now = datetime.utcnow()
-            tomorrow = now + timedelta(hours=24)
-            
-            # Find invitations for assessments starting soon
-            upcoming_invitations = db.query(Invitation).join(Assessment).filter(
-                and_(
-                    Invitation.status == 'accepted',
-                    Assessment.published_at <= now,
-                    Assessment.published_at >= now - timedelta(days=7),  # Assessments published in last week
-                    # Add scheduled_start_time field to Assessment model if needed
-                )
-            ).all()
-            
-            for invitation in upcoming_invitations:
-                await self._send_assessment_reminders(db, invitation)
-                
-        except Exception as e:
-            logger.error(f"Error checking notifications: {e}")
+            while self.process_due(db) == settings.reminder_batch_size:
+                pass
+            next_due = reminders.next_due_at(db)
+            record_tick(db, self.name)
+            return next_due
         finally:
             db.close()
 
-    async def _send_assessment_reminders(self, db: Session, invitation: Invitation):
-        """Send reminders for an assessment"""
-        try:
-            # Get assessment details
-            assessment = db.query(Assessment).filter(
-                Assessment.id == invitation.assessment_id
-            ).first()
-            
-            if not assessment:
-                return
-            
-            # Get candidate details
-            candidate = db.query(User).filter(
-                User.id == invitation.interviewee_id
-            ).first()
-            
-            if not candidate:
-                return
-            
-            # Check if we should send a reminder based on assessment timing
-            now = datetime.now(timezone.utc)
-            
-            # Send reminder 24 hours before (if assessment has a scheduled start time)
-            if hasattr(assessment, 'scheduled_start_time') and assessment.scheduled_start_time:
-                time_until_assessment = assessment.scheduled_start_time - now
-                
-                # Send 24-hour reminder
-                if timedelta(hours=23) <= time_until_assessment <= timedelta(hours=25):
-                    await self._send_reminder_email(
-                        candidate=candidate,
-                        assessment=assessment,
-                        reminder_type="24_hours",
-                        time_until=assessment.scheduled_start_time,
-                        invitation=invitation
-                    )
-                
-                # Send 1-hour reminder
-                elif timedelta(minutes=50) <= time_until_assessment <= timedelta(minutes=70):
-                    await self._send_reminder_email(
-                        candidate=candidate,
-                        assessment=assessment,
-                        reminder_type="1_hour",
-                        time_until=assessment.scheduled_start_time,
-                        invitation=invitation
-                    )
-            
-            # If no scheduled start time, send reminder based on invitation acceptance
-            else:
-                # Send reminder 1 day after acceptance if not started
-                days_since_acceptance = (now - invitation.responded_at).days if invitation.responded_at else 0
-                if days_since_acceptance == 1:
-                    await self._send_reminder_email(
-                        candidate=candidate,
-                        assessment=assessment,
-                        reminder_type="reminder",
-                        time_until=None,
-                        invitation=invitation
-                    )
-                    
-        except Exception as e:
-            logger.error(f"Error sending reminders for invitation {invitation.id}: {e}")
+    def process_due(self, db: Session, batch_size: Optional[int] = None) -> int:
+        """Send one batch of due reminders; returns how many were claimed.
+
+        Reading the scheduled_reminders index by due time keeps the cost
+        proportional to the reminders that are due, not to active invitations.
+        """
+        now = datetime.now(timezone.utc)
+        due = reminders.claim_due(db, batch_size or settings.reminder_batch_size, now)
+        if not due:
+            db.rollback()
+            return 0
 
-    async def _send_reminder_email(self, candidate: User, assessment: Assessment, 
-                                 reminder_type: str, time_until: Optional[datetime], invitation: Invitation):
-        """Send reminder email to candidate"""
+        # The follow-up reminder is only for candidates who have not started yet
+        started = set()
+        follow_ups = [r.invitation for r in due if r.reminder_type == "reminder"]
+        if follow_ups:
+            started = set(db.execute(
+                select(Submission.assessment_id, Submission.interviewee_id).filter(
+                    Submission.assessment_id.in_({i.assessment_id for i in follow_ups}),
+                    Submission.interviewee_id.in_({i.interviewee_id for i in follow_ups})
+                )
+            ).all())
+
+        # Candidates due the same reminder for the same start time share one batched send
+        groups = defaultdict(list)
+        skipped = []
+        for reminder in due:
+            invitation = reminder.invitation
+            if (
+                invitation.status != InvitationStatus.ACCEPTED
+                or reminders.is_stale(reminder, now)
+                or (invitation.assessment_id, invitation.interviewee_id) in started
+            ):
+                skipped.append(reminder.id)
+                continue
+            start = reminders.scheduled_start(invitation, invitation.assessment)
+            groups[(invitation.assessment_id, reminder.reminder_type, start)].append(reminder)
+
+        sent = []
+        failed = 0
+        for (_, reminder_type, start), group in groups.items():
+            queued = set(db.new)
+            try:
+                self._send_reminder_email(
+                    db=db,
+                    assessment=group[0].invitation.assessment,
+                    reminder_type=reminder_type,
+                    time_until=start,
+                    invitations=[reminder.invitation for reminder in group]
+                )
+            except Exception:
+                # Left pending, so a later run tries again until the reminder goes stale
+                for outbox_row in set(db.new) - queued:
+                    db.expunge(outbox_row)
+                failed += len(group)
+                continue
+            sent.extend(reminder.id for reminder in group)
+
+        # Queued emails and reminder states commit together
+        reminders.mark(db, sent, ReminderStatus.SENT)
+        reminders.mark(db, skipped, ReminderStatus.SKIPPED)
+        db.commit()
+        if failed:
+            # The scheduler loop backs off before the failed reminders are claimed again
+            raise RuntimeError(f"{failed} reminder(s) could not be queued")
+        return len(due)
+
+    def _send_reminder_email(self, db: Session, assessment: Assessment, reminder_type: str,
+                             time_until: Optional[datetime], invitations: List[Invitation]):
+        """Queue one reminder for every candidate in `invitations`.
+
+        The name and start link differ per candidate and are filled in through
+        the -name- and -link- substitutions of a batched send. Errors are
+        logged and raised, so the caller leaves the reminders pending.
+        """
         try:
             if reminder_type == "24_hours":
                 subject = f"Reminder: Assessment Tomorrow - {assessment.title}"
@@ -221,7 +255,7 @@ class NotificationScheduler:
                 </div>
                 
                 <div class="content">
-                    <h2>Hello {candidate.full_name or candidate.username},</h2>
+                    <h2>Hello -name-,</h2>
                     
                     <p>{time_text}</p>
                     
@@ -240,7 +274,7 @@ class NotificationScheduler:
                         <li>The assessment timer will start automatically when you begin</li>
                     </ul>
                     
-                    <a href="{settings.frontend_url}/interviewee/active-test/{invitation.id}" class="btn">
+                    <a href="-link-" class="btn">
                         Start Assessment
                     </a>
                     
@@ -255,7 +289,7 @@ class NotificationScheduler:
             """
 
             text_content = f"""
-Hello {candidate.full_name or candidate.username},
+Hello -name-,
 
 {time_text}
 
@@ -271,24 +305,29 @@ What you need to know:
 - The assessment timer will start automatically when you begin
 
 Start your assessment here:
-{settings.frontend_url}/interviewee/active-test/{invitation.id}
+-link-
 
 Best regards,
 Smart Recruiter Team
             """
 
-            # Send email
-            email_service._send_email(
-                to_email=candidate.email,
-                subject=subject,
-                html_content=html_content,
-                text_content=text_content
-            )
+            recipients = [
+                {
+                    "email": invitation.interviewee.email,
+                    "substitutions": {
+                        "-name-": invitation.interviewee.full_name or invitation.interviewee.username,
+                        "-link-": f"{settings.frontend_url}/interviewee/active-test/{invitation.id}",
+                    },
+                }
+                for invitation in invitations
+            ]
+            email_service.send_batch(recipients, subject, text_content, html_content, db=db)
             
-            logger.info(f"Sent {reminder_type} reminder to {candidate.email} for assessment {assessment.title}")
+            logger.info(f"Queued {reminder_type} reminder to {len(recipients)} candidate(s) for assessment {assessment.title}")
             
         except Exception as e:
             logger.error(f"Failed to send reminder email: {e}")
+            raise
 
     def create_assessment_reminder_notification(self, db: Session, user_id: int, 
                                               assessment_title: str, reminder_type: str):
@@ -0,0 +1,151 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session, selectinload
+from models import Assessment, Invitation, InvitationStatus, ReminderStatus, ScheduledReminder
+
+logger = logging.getLogger(__name__)
+
+# Reminders sent ahead of a scheduled start, by how long before it they are due
+BEFORE_START = {
+    "24_hours": timedelta(hours=24),
+    "1_hour": timedelta(hours=1),
+}
+# Without a scheduled start, candidates get one reminder a day after accepting
+FOLLOW_UP_DELAY = timedelta(days=1)
+
+# How late a reminder may still go out, e.g. after downtime; older ones are skipped
+GRACE = {
+    "24_hours": timedelta(hours=1),
+    "1_hour": timedelta(minutes=10),
+    "reminder": timedelta(days=1),
+}
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite hands back naive datetimes; everything here is UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def scheduled_start(invitation: Invitation, assessment: Assessment) -> Optional[datetime]:
+    """The candidate's own slot wins over the assessment-wide start time"""
+    return _utc(invitation.scheduled_start or assessment.scheduled_start_time)
+
+
+def reminders_for(invitation: Invitation, assessment: Assessment, now: datetime) -> List[Dict]:
+    """Rows for the reminders an accepted invitation should still receive"""
+    start = scheduled_start(invitation, assessment)
+    if start:
+        due = [(reminder_type, start - offset) for reminder_type, offset in BEFORE_START.items()]
+    elif invitation.responded_at:
+        due = [("reminder", _utc(invitation.responded_at) + FOLLOW_UP_DELAY)]
+    else:
+        due = []
+    return [
+        {"invitation_id": invitation.id, "reminder_type": reminder_type, "due_at": due_at}
+        for reminder_type, due_at in due
+        if due_at + GRACE[reminder_type] > now
+    ]
+
+
+def is_stale(reminder: ScheduledReminder, now: datetime) -> bool:
+    return _utc(reminder.due_at) + GRACE[reminder.reminder_type] < now
+
+
+def _schedule(db: Session, invitations: Iterable[Invitation], assessment: Optional[Assessment] = None) -> int:
+    now = datetime.now(timezone.utc)
+    rows = []
+    for invitation in invitations:
+        rows.extend(reminders_for(invitation, assessment or invitation.assessment, now))
+    if rows:
+        db.execute(insert(ScheduledReminder), rows)
+    return len(rows)
+
+
+def schedule_invitation(db: Session, invitation: Invitation) -> int:
+    """(Re)create the pending reminders of one invitation; call when it is accepted"""
+    db.execute(
+        delete(ScheduledReminder)
+        .where(ScheduledReminder.invitation_id == invitation.id, ScheduledReminder.status == ReminderStatus.PENDING)
+        .execution_options(synchronize_session=False)
+    )
+    return _schedule(db, [invitation])
+
+
+def reschedule_assessment(db: Session, assessment: Assessment) -> int:
+    """Recompute pending reminders after an assessment's start time changes"""
+    accepted = select(Invitation.id).filter(
+        Invitation.assessment_id == assessment.id,
+        Invitation.status == InvitationStatus.ACCEPTED
+    )
+    db.execute(
+        delete(ScheduledReminder)
+        .where(ScheduledReminder.invitation_id.in_(accepted), ScheduledReminder.status == ReminderStatus.PENDING)
+        .execution_options(synchronize_session=False)
+    )
+    return _schedule(db, db.scalars(select(Invitation).filter(Invitation.id.in_(accepted))).all(), assessment)
+
+
+def backfill(db: Session) -> int:
+    """Schedule reminders for accepted invitations that have never had any.
+
+    Runs as a migration step, before later steps add their columns, so it
+    reads plain columns rather than loading Invitation and Assessment rows.
+    """
+    has_reminders = select(ScheduledReminder.id).filter(
+        ScheduledReminder.invitation_id == Invitation.id
+    ).exists()
+    # Each row stands in for both the invitation and its assessment in reminders_for
+    invitations = db.execute(
+        select(Invitation.id, Invitation.scheduled_start, Invitation.responded_at, Assessment.scheduled_start_time)
+        .join(Assessment, Invitation.assessment_id == Assessment.id)
+        .filter(Invitation.status == InvitationStatus.ACCEPTED, ~has_reminders)
+    ).all()
+    now = datetime.now(timezone.utc)
+    rows = [row for invitation in invitations for row in reminders_for(invitation, invitation, now)]
+    if rows:
+        db.execute(insert(ScheduledReminder), rows)
+    return len(rows)
+
+
+def next_due_at(db: Session) -> Optional[datetime]:
+    return _utc(db.scalar(
+        select(func.min(ScheduledReminder.due_at)).filter(ScheduledReminder.status == ReminderStatus.PENDING)
+    ))
+
+
+def claim_due(db: Session, limit: int, now: datetime) -> List[ScheduledReminder]:
+    """Lock up to `limit` due reminders with their invitation, candidate and assessment loaded.
+
+    The rows stay locked (on PostgreSQL) until the caller marks them and commits.
+    """
+    return db.scalars(
+        select(ScheduledReminder)
+        .options(
+            selectinload(ScheduledReminder.invitation).selectinload(Invitation.interviewee),
+            selectinload(ScheduledReminder.invitation)
+            .selectinload(Invitation.assessment)
+            .selectinload(Assessment.questions),
+        )
+        .filter(ScheduledReminder.status == ReminderStatus.PENDING, ScheduledReminder.due_at <= now)
+        .order_by(ScheduledReminder.due_at, ScheduledReminder.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+
+def mark(db: Session, reminder_ids: List[int], status: ReminderStatus):
+    if not reminder_ids:
+        return
+    values = {"status": status}
+    if status == ReminderStatus.SENT:
+        values["sent_at"] = datetime.now(timezone.utc)
+    db.execute(
+        update(ScheduledReminder)
+        .where(ScheduledReminder.id.in_(reminder_ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,195 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from config import get_settings
+from models import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Columns kept in the cache. The password hash is deliberately left out; code
+# that needs it must load the user from the database.
+CACHED_COLUMNS = (
+    "id", "email", "username", "full_name", "profile_picture",
+    "role", "is_active", "created_at", "updated_at",
+)
+
+
+class MemoryBackend:
+    """Bounded per-process LRU with a TTL per entry"""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return values
+
+    def set(self, user_id: int, values: Dict):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Cache shared by every worker, so an invalidation in one is seen by all"""
+
+    prefix = "user-cache:"
+
+    def __init__(self, url: str, ttl: int):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Optional[Dict]:
+        raw = self.client.get(f"{self.prefix}{user_id}")
+        if raw is None:
+            return None
+        values = json.loads(raw)
+        values["role"] = UserRole[values["role"]]
+        for name in ("created_at", "updated_at"):
+            if values[name]:
+                values[name] = datetime.fromisoformat(values[name])
+        return values
+
+    def set(self, user_id: int, values: Dict):
+        encoded = dict(values, role=values["role"].name)
+        for name in ("created_at", "updated_at"):
+            if encoded[name]:
+                encoded[name] = encoded[name].isoformat()
+        self.client.setex(f"{self.prefix}{user_id}", self.ttl, json.dumps(encoded))
+
+    def delete(self, user_id: int):
+        self.client.delete(f"{self.prefix}{user_id}")
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class UserCache:
+    """Cache of user records for authentication, keyed by user id.
+
+    Hits return a detached User without the password hash. Entries are
+    invalidated when a session commits a change to (or deletion of) a User;
+    bulk UPDATE statements bypass that hook and are only bounded by the TTL.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> Optional[User]:
+        try:
+            values = self.backend.get(user_id)
+        except Exception as e:
+            logger.warning(f"User cache lookup failed: {e}")
+            values = None
+        if values is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user: User):
+        values = {name: getattr(user, name) for name in CACHED_COLUMNS}
+        try:
+            self.backend.set(user.id, values)
+        except Exception as e:
+            logger.warning(f"User cache store failed: {e}")
+
+    def invalidate(self, user_id: int):
+        self.invalidations += 1
+        try:
+            self.backend.delete(user_id)
+        except Exception as e:
+            logger.warning(f"User cache invalidation failed: {e}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.backend.evictions,
+        }
+
+
+def _create_backend():
+    if settings.user_cache_url:
+        try:
+            return RedisBackend(settings.user_cache_url, settings.user_cache_ttl)
+        except ImportError:
+            logger.warning("redis is not installed; using the in-process user cache")
+    return MemoryBackend(settings.user_cache_size, settings.user_cache_ttl)
+
+
+user_cache = UserCache(_create_backend())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_user_ids", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Test CodeWars API integration"""
 
+from database import SessionLocal
 from services.codewars_service import codewars_service
 
 # Test fetching a specific kata
@@ -14,7 +15,8 @@ else:
 
 # Test searching katas
 print("\nSearching for katas...")
-katas = codewars_service.search_katas("array")
+with SessionLocal() as db:
+    katas = codewars_service.search_katas(db, "array")
 print(f"Found {len(katas)} katas")
 for kata in katas[:3]:
-    print(f"  - {kata.get('name')} (Difficulty: {kata.get('rank', {}).get('name', 'Unknown')})")
+    print(f"  - {kata.get('title')} (Difficulty: {kata.get('difficulty') or 'Unknown'})")
@@ -1,18 +1,73 @@
+import json
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from database import Base, get_db
+from sqlalchemy.pool import NullPool
+from database import Base, get_db, get_async_db
 from main import app
-from models import User, UserRole
+from models import (
+    User, UserRole, Assessment, AssessmentStatus, Question, QuestionType,
+    Submission, SubmissionStatus, Answer
+)
 from auth import get_password_hash
+from services.user_cache import user_cache
+from services.grading import answer_keys
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# TestClient may run each request on a fresh event loop, so don't pool async connections
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def login(client, username, password="password123"):
+    response = client.post("/api/auth/login", data={
+        "username": username,
+        "password": password
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def add_answered_questions(db_session, assessment, submission, count, start=0):
+    for index in range(start, start + count):
+        question = Question(
+            assessment_id=assessment.id,
+            question_type=QuestionType.MULTIPLE_CHOICE,
+            title=f"Question {index}",
+            points=10,
+            order=index,
+            options=["A", "B"],
+            correct_answer="A"
+        )
+        db_session.add(question)
+        db_session.flush()
+        db_session.add(Answer(
+            submission_id=submission.id,
+            question_id=question.id,
+            answer_text="A" if index % 2 == 0 else "B",
+            points_earned=10 if index % 2 == 0 else 0
+        ))
+    db_session.commit()
 
 @pytest.fixture
 def db_session():
+    user_cache.clear()
+    answer_keys.clear()
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
     try:
@@ -28,7 +83,12 @@ def client(db_session):
             yield db_session
         finally:
             pass
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     return TestClient(app)
 
 @pytest.fixture
@@ -69,6 +129,12 @@ def test_health_check(client):
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
 
+def test_database_health_check(client):
+    response = client.get("/health/db")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+    assert response.json()["pool"]["checkouts"] >= 1
+
 def test_register_user(client):
     response = client.post("/api/auth/register", json={
         "email": "newuser@test.com",
@@ -153,3 +219,1063 @@ def test_logout(client, test_recruiter):
     response = client.post("/api/auth/logout", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
     assert response.json()["message"] == "Successfully logged out"
+
+def test_question_analysis_query_count_is_constant(client, db_session, test_recruiter, test_interviewee):
+    headers = login(client, "recruiter")
+    assessment = Assessment(
+        title="Analytics Assessment",
+        creator_id=test_recruiter.id,
+        status=AssessmentStatus.PUBLISHED
+    )
+    db_session.add(assessment)
+    db_session.commit()
+    submission = Submission(
+        assessment_id=assessment.id,
+        interviewee_id=test_interviewee.id,
+        status=SubmissionStatus.GRADED
+    )
+    db_session.add(submission)
+    db_session.commit()
+
+    add_answered_questions(db_session, assessment, submission, 2)
+    with count_queries() as small:
+        response = client.get("/api/analytics/question-analysis", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+    add_answered_questions(db_session, assessment, submission, 10, start=2)
+    with count_queries() as large:
+        response = client.get("/api/analytics/question-analysis", headers=headers)
+    analysis = response.json()
+    assert len(analysis) == 12
+    assert len(large) == len(small)
+
+    first = next(q for q in analysis if q["question_title"] == "Question 0")
+    assert first["total_attempts"] == 1
+    assert first["correct_answers"] == 1
+    assert first["answer_patterns"] == {"option_distribution": {"A": 1}, "most_common_option": "A"}
+
+def test_performance_trends_buckets(client, db_session, test_recruiter, test_interviewee):
+    from datetime import datetime, timedelta
+    headers = login(client, "recruiter")
+    assessment = Assessment(title="Trend Assessment", creator_id=test_recruiter.id)
+    db_session.add(assessment)
+    db_session.commit()
+    now = datetime.utcnow()
+    for days_ago, score in [(0, 8.0), (0, 6.0), (3, 5.0), (40, 10.0)]:
+        db_session.add(Submission(
+            assessment_id=assessment.id,
+            interviewee_id=test_interviewee.id,
+            status=SubmissionStatus.GRADED,
+            score=score,
+            max_score=10.0,
+            submitted_at=now - timedelta(days=days_ago)
+        ))
+    db_session.commit()
+
+    with count_queries() as statements:
+        response = client.get("/api/analytics/trends?days=7", headers=headers)
+    trends = response.json()
+    assert response.status_code == 200
+    assert len(trends) == 7
+    assert trends[-1] == {"date": now.strftime("%Y-%m-%d"), "submissions_count": 2, "average_score": 70.0}
+    assert trends[-4]["submissions_count"] == 1
+    assert len([s for s in statements if "FROM submissions" in s]) == 1
+    assert sum(t["submissions_count"] for t in trends) == 3
+
+    yearly = client.get("/api/analytics/trends?days=365", headers=headers)
+    assert len(yearly.json()) == 365
+    assert sum(t["submissions_count"] for t in yearly.json()) == 4
+
+    monthly = client.get("/api/analytics/trends?days=365&granularity=month", headers=headers).json()
+    assert all(t["date"].endswith("-01") for t in monthly)
+    assert sum(t["submissions_count"] for t in monthly) == 4
+
+    weekly = client.get("/api/analytics/trends?days=30&granularity=week", headers=headers).json()
+    assert all(datetime.strptime(t["date"], "%Y-%m-%d").weekday() == 0 for t in weekly)
+    assert sum(t["submissions_count"] for t in weekly) == 3
+
+    assert client.get("/api/analytics/trends?granularity=hour", headers=headers).status_code == 400
+
+def test_get_assessments_query_count_is_constant(client, db_session, test_recruiter, test_interviewee):
+    headers = login(client, "recruiter")
+
+    def add_assessments(count):
+        for index in range(count):
+            assessment = Assessment(title=f"Assessment {index}", creator_id=test_recruiter.id)
+            db_session.add(assessment)
+            db_session.flush()
+            db_session.add(Question(
+                assessment_id=assessment.id,
+                question_type=QuestionType.SUBJECTIVE,
+                title="Describe a project"
+            ))
+            db_session.add(Submission(
+                assessment_id=assessment.id,
+                interviewee_id=test_interviewee.id,
+                score=index
+            ))
+        db_session.commit()
+
+    add_assessments(1)
+    with count_queries() as small:
+        response = client.get("/api/assessments", headers=headers)
+    assert len(response.json()) == 1
+
+    add_assessments(5)
+    with count_queries() as large:
+        response = client.get("/api/assessments", headers=headers)
+    assessments = response.json()
+    assert len(assessments) == 6
+    assert len(large) == len(small)
+    assert all(a["total_submissions"] == 1 and a["total_questions"] == 1 for a in assessments)
+    assert all(a["total_invitations"] == 0 for a in assessments)
+    assert all(len(a["questions"]) == 1 for a in assessments)
+    assert sorted(a["average_score"] for a in assessments) == [0.0, 0.0, 1.0, 2.0, 3.0, 4.0]
+
+def test_assessment_stats_follow_submission_lifecycle(client, db_session, test_recruiter, test_interviewee):
+    from services import assessment_stats
+    recruiter_headers = login(client, "recruiter")
+    candidate_headers = login(client, "interviewee")
+    assessment = Assessment(
+        title="Stats Assessment",
+        creator_id=test_recruiter.id,
+        status=AssessmentStatus.PUBLISHED
+    )
+    db_session.add(assessment)
+    db_session.flush()
+    question = Question(
+        assessment_id=assessment.id,
+        question_type=QuestionType.MULTIPLE_CHOICE,
+        title="Pick A",
+        points=10,
+        options=["A", "B"],
+        correct_answer="A"
+    )
+    db_session.add(question)
+    db_session.commit()
+
+    submission_id = client.post("/api/submissions", headers=candidate_headers,
+                                json={"assessment_id": assessment.id}).json()["id"]
+    client.post(f"/api/submissions/{submission_id}/answers", headers=candidate_headers, json={
+        "submission_id": submission_id, "question_id": question.id, "answer_text": "A"
+    })
+    assert client.post(f"/api/submissions/{submission_id}/submit", headers=candidate_headers).status_code == 200
+    assert client.post(f"/api/submissions/{submission_id}/grade", headers=recruiter_headers).status_code == 200
+
+    statistics = client.get(f"/api/assessments/{assessment.id}/statistics", headers=recruiter_headers).json()
+    assert statistics["total_submissions"] == 1
+    assert statistics["completed_submissions"] == 1
+    assert statistics["highest_score"] == 10.0
+
+    comparison = client.get("/api/analytics/assessment-comparison", headers=recruiter_headers).json()
+    assert comparison[0]["average_score"] == 100.0
+    assert comparison[0]["pass_rate"] == 100.0
+
+    stats = db_session.query(assessment_stats.AssessmentStats).filter_by(assessment_id=assessment.id).one()
+    incremental = {name: getattr(stats, name) for name in assessment_stats.COUNTERS}
+    assessment_stats.rebuild(db_session, assessment.id)
+    db_session.commit()
+    db_session.refresh(stats)
+    assert incremental == {name: getattr(stats, name) for name in assessment_stats.COUNTERS}
+
+def test_cursor_pagination_walks_every_row_once(client, db_session, test_interviewee):
+    from datetime import datetime
+    from models import Notification
+    headers = login(client, "interviewee")
+    same_time = datetime(2025, 1, 1, 12, 0, 0)
+    for index in range(7):
+        db_session.add(Notification(
+            user_id=test_interviewee.id,
+            title=f"Notification {index}",
+            message="Hello",
+            created_at=same_time if index < 4 else datetime(2025, 1, 2, 12, 0, index)
+        ))
+    db_session.commit()
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        page = client.get(f"/api/notifications?limit=3&cursor={cursor}", headers=headers).json()
+        assert len(page["items"]) <= 3
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+
+    plain = client.get("/api/notifications", headers=headers).json()
+    assert seen == [item["id"] for item in sorted(plain, key=lambda n: (n["created_at"], n["id"]), reverse=True)]
+    assert len(set(seen)) == 7
+    assert client.get("/api/notifications?cursor=not-a-cursor", headers=headers).status_code == 400
+    assert isinstance(client.get("/api/invitations?cursor=", headers=headers).json()["items"], list)
+    assert isinstance(client.get("/api/submissions?cursor=", headers=headers).json()["items"], list)
+    assert isinstance(client.get("/api/assessments?cursor=", headers=headers).json()["items"], list)
+
+def test_submission_list_summary_and_full_detail(client, db_session, test_recruiter, test_interviewee):
+    headers = login(client, "recruiter")
+    assessment = Assessment(title="Listing Assessment", creator_id=test_recruiter.id)
+    db_session.add(assessment)
+    db_session.commit()
+
+    def add_submissions(count):
+        for _ in range(count):
+            submission = Submission(assessment_id=assessment.id, interviewee_id=test_interviewee.id)
+            db_session.add(submission)
+            db_session.flush()
+            add_answered_questions(db_session, assessment, submission, 3)
+
+    add_submissions(1)
+    with count_queries() as small:
+        client.get("/api/submissions?detail=full", headers=headers)
+    add_submissions(4)
+    with count_queries() as large:
+        full = client.get("/api/submissions?detail=full", headers=headers).json()
+    assert len(large) == len(small)
+    assert len(full) == 5
+    assert all(len(s["answers"]) == 3 for s in full)
+    assert len(full[0]["assessment"]["questions"]) == 15
+
+    summary = client.get("/api/submissions", headers=headers).json()
+    assert len(summary) == 5
+    assert "answers" not in summary[0]
+    assert "questions" not in summary[0]["assessment"]
+    assert summary[0]["interviewee"]["username"] == "interviewee"
+    assert client.get("/api/submissions?detail=everything", headers=headers).status_code == 422
+
+def test_async_endpoints_return_eager_loaded_details(client, db_session, test_recruiter, test_interviewee):
+    from models import Invitation
+    recruiter_headers = login(client, "recruiter")
+    candidate_headers = login(client, "interviewee")
+    assessment = Assessment(title="Async Assessment", creator_id=test_recruiter.id)
+    db_session.add(assessment)
+    db_session.flush()
+    db_session.add(Invitation(assessment_id=assessment.id, interviewee_id=test_interviewee.id))
+    submission = Submission(assessment_id=assessment.id, interviewee_id=test_interviewee.id)
+    db_session.add(submission)
+    db_session.flush()
+    add_answered_questions(db_session, assessment, submission, 2)
+
+    invitations = client.get("/api/invitations", headers=candidate_headers).json()
+    assert invitations[0]["assessment"]["title"] == "Async Assessment"
+    assert len(invitations[0]["assessment"]["questions"]) == 2
+    assert invitations[0]["interviewee"]["username"] == "interviewee"
+
+    detail = client.get(f"/api/submissions/{submission.id}", headers=recruiter_headers).json()
+    assert len(detail["answers"]) == 2
+    assert detail["answers"][0]["question"]["title"].startswith("Question")
+    assert client.get(f"/api/submissions/{submission.id}", headers=candidate_headers).status_code == 200
+
+    response = client.put("/api/users/profile", headers=candidate_headers, json={"full_name": "Renamed"})
+    assert response.json()["user"]["full_name"] == "Renamed"
+    assert client.get("/api/auth/me", headers=candidate_headers).json()["full_name"] == "Renamed"
+
+def test_current_user_is_cached_until_the_user_changes(client, db_session, test_interviewee):
+    headers = login(client, "interviewee")
+    before = user_cache.stats()
+    client.get("/api/auth/me", headers=headers)
+    client.get("/api/auth/me", headers=headers)
+    after = user_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+    user = db_session.get(User, test_interviewee.id)
+    user.is_active = False
+    db_session.commit()
+    assert client.get("/api/auth/me", headers=headers).status_code == 400
+
+    user.is_active = True
+    db_session.commit()
+    response = client.post("/api/users/change-password", headers=headers, json={
+        "current_password": "password123",
+        "new_password": "newpassword1",
+        "confirm_password": "newpassword1"
+    })
+    assert response.status_code == 200
+    assert client.get("/health/cache").json()["invalidations"] >= 3
+
+def test_login_rehashes_password_when_bcrypt_cost_changes(client, db_session):
+    from passlib.context import CryptContext
+    from auth import pwd_context
+    cheap = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    user = User(
+        email="legacy@test.com",
+        username="legacy",
+        hashed_password=cheap.hash("password123"),
+        role=UserRole.INTERVIEWEE
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    assert client.post("/api/auth/login", data={"username": "legacy", "password": "password123"}).status_code == 200
+    db_session.refresh(user)
+    assert not pwd_context.needs_update(user.hashed_password)
+    assert client.post("/api/auth/login", data={"username": "legacy", "password": "password123"}).status_code == 200
+
+def test_bulk_invitations_skip_ineligible_candidates(client, db_session, test_recruiter, test_interviewee):
+    from models import EmailOutbox, Invitation, Notification
+    headers = login(client, "recruiter")
+    assessment = Assessment(title="Campus Cohort", creator_id=test_recruiter.id)
+    candidates = [
+        User(email=f"cohort{index}@test.com", username=f"cohort{index}", hashed_password="x", role=UserRole.INTERVIEWEE)
+        for index in range(4)
+    ]
+    db_session.add_all([assessment, *candidates])
+    db_session.flush()
+    db_session.add(Invitation(assessment_id=assessment.id, interviewee_id=test_interviewee.id))
+    db_session.commit()
+
+    requested = [test_interviewee.id, test_recruiter.id, 9999] + [c.id for c in candidates[:3]] + [candidates[0].id]
+    with count_queries() as statements:
+        response = client.post("/api/invitations/bulk", headers=headers, json={
+            "assessment_id": assessment.id, "interviewee_ids": requested
+        })
+    assert response.status_code == 201
+    assert sorted(i["interviewee_id"] for i in response.json()) == sorted(c.id for c in candidates[:3])
+    assert all(i["status"] == "pending" for i in response.json())
+    assert len(statements) <= 7
+    assert db_session.query(Notification).filter_by(notification_type="invitation").count() == 3
+    # The whole chunk is emailed through one batched outbox message
+    queued = db_session.query(EmailOutbox).one()
+    assert queued.to_email is None
+    assert sorted(r["email"] for r in queued.recipients) == sorted(c.email for c in candidates[:3])
+
+    response = client.post("/api/invitations/bulk?stream=true", headers=headers, json={
+        "assessment_id": assessment.id, "interviewee_ids": [c.id for c in candidates]
+    })
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [i["interviewee_id"] for i in lines[0]["created"]] == [candidates[3].id]
+    assert lines[-1] == {"done": True, "requested": 4, "created": 1}
+    assert db_session.query(Invitation).filter_by(assessment_id=assessment.id).count() == 5
+
+def test_emails_go_through_the_outbox(client, db_session, test_recruiter, test_interviewee):
+    from models import EmailOutbox, EmailStatus
+    from services import email_outbox
+    from services.email_service import MemoryTransport
+    headers = login(client, "recruiter")
+    assessment = Assessment(title="Outbox Assessment", creator_id=test_recruiter.id)
+    db_session.add(assessment)
+    db_session.commit()
+
+    response = client.post("/api/invitations", headers=headers, json={
+        "assessment_id": assessment.id, "interviewee_id": test_interviewee.id
+    })
+    assert response.status_code == 201
+    queued = db_session.query(EmailOutbox).one()
+    assert queued.status == EmailStatus.PENDING
+    assert queued.to_email == "interviewee@test.com"
+
+    class FailingTransport:
+        def send(self, *args):
+            raise RuntimeError("provider unavailable")
+
+    assert email_outbox.process_batch(db_session, FailingTransport()) == 1
+    db_session.refresh(queued)
+    assert queued.status == EmailStatus.PENDING
+    assert queued.attempts == 1
+    assert "provider unavailable" in queued.last_error
+    # Backing off: not due yet
+    assert email_outbox.process_batch(db_session, MemoryTransport()) == 0
+
+    queued.next_attempt_at = queued.created_at
+    db_session.commit()
+    transport = MemoryTransport()
+    assert email_outbox.process_batch(db_session, transport) == 1
+    db_session.refresh(queued)
+    assert queued.status == EmailStatus.SENT
+    assert transport.sent[0]["subject"] == "Invitation to Assessment: Outbox Assessment"
+
+    db_session.add(EmailOutbox(to_email="x@test.com", subject="s", body="b", attempts=7))
+    db_session.commit()
+    email_outbox.process_batch(db_session, FailingTransport())
+    assert db_session.query(EmailOutbox).filter_by(to_email="x@test.com").one().status == EmailStatus.FAILED
+
+def test_batch_send_splits_into_personalized_requests(db_session):
+    from models import EmailOutbox
+    from services import email_outbox
+    from services.email_service import MAX_BATCH_RECIPIENTS, MemoryTransport, email_service
+    recipients = [
+        {"email": f"c{index}@test.com", "substitutions": {"-name-": f"Candidate {index}"}}
+        for index in range(MAX_BATCH_RECIPIENTS + 5)
+    ]
+    results = email_service.send_batch(recipients, "Hello -name-", "Dear -name-,", db=db_session)
+    db_session.commit()
+    assert [r["recipients"] for r in results] == [MAX_BATCH_RECIPIENTS, 5]
+    assert all(r["status"] == "queued" for r in results)
+    assert db_session.query(EmailOutbox).count() == 2
+
+    transport = MemoryTransport()
+    assert email_outbox.process_batch(db_session, transport) == 2
+    assert transport.requests == 2
+    assert len(transport.sent) == MAX_BATCH_RECIPIENTS + 5
+    assert transport.sent[-1] == {
+        "to_email": f"c{MAX_BATCH_RECIPIENTS + 4}@test.com",
+        "subject": f"Hello Candidate {MAX_BATCH_RECIPIENTS + 4}",
+        "body": f"Dear Candidate {MAX_BATCH_RECIPIENTS + 4},",
+        "html_body": None,
+    }
+
+    transport = MemoryTransport()
+    email_service.transport, previous = transport, email_service.transport
+    try:
+        results = email_service.send_batch(recipients[:3], "Hi", "Body")
+    finally:
+        email_service.transport = previous
+    assert results == [{"batch": 1, "recipients": 3, "status": "sent"}]
+    assert transport.requests == 1
+
+def test_reminders_are_indexed_by_due_time(client, db_session, test_recruiter, test_interviewee):
+    from datetime import datetime, timedelta, timezone
+    from models import EmailOutbox, Invitation, InvitationStatus, ReminderStatus, ScheduledReminder
+    from services import reminders
+    from services.notification_scheduler import notification_scheduler
+    start = datetime.now(timezone.utc) + timedelta(hours=30)
+    assessment = Assessment(title="Reminder Assessment", creator_id=test_recruiter.id, scheduled_start_time=start)
+    db_session.add(assessment)
+    db_session.flush()
+    invitation = Invitation(assessment_id=assessment.id, interviewee_id=test_interviewee.id)
+    # Accepted candidates whose reminders are not due must not add to the work
+    others = [
+        User(email=f"busy{index}@test.com", username=f"busy{index}", hashed_password="x", role=UserRole.INTERVIEWEE)
+        for index in range(20)
+    ]
+    later = Assessment(title="Later Assessment", creator_id=test_recruiter.id, scheduled_start_time=start)
+    db_session.add_all([invitation, later, *others])
+    db_session.flush()
+    db_session.add_all([
+        Invitation(assessment_id=later.id, interviewee_id=other.id, status=InvitationStatus.ACCEPTED)
+        for other in others
+    ])
+    db_session.flush()
+    assert reminders.backfill(db_session) == 40
+    db_session.commit()
+
+    headers = login(client, "interviewee")
+    assert client.post(f"/api/invitations/{invitation.id}/accept", headers=headers).status_code == 200
+    rows = db_session.query(ScheduledReminder).filter_by(invitation_id=invitation.id).order_by(ScheduledReminder.due_at).all()
+    assert [r.reminder_type for r in rows] == ["24_hours", "1_hour"]
+    assert abs(reminders.next_due_at(db_session) - (start - timedelta(hours=24))) < timedelta(seconds=1)
+    assert notification_scheduler.process_due(db_session) == 0
+
+    # Moving the start brings the 24 hour reminder due now
+    headers = login(client, "recruiter")
+    response = client.put(f"/api/assessments/{assessment.id}", headers=headers, json={
+        "scheduled_start_time": (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat()
+    })
+    assert response.status_code == 200
+    assert db_session.query(ScheduledReminder).filter_by(invitation_id=invitation.id).count() == 2
+    with count_queries() as statements:
+        assert notification_scheduler.process_due(db_session) == 1
+    assert len(statements) <= 10
+    assert notification_scheduler.process_due(db_session) == 0
+
+    statuses = {r.reminder_type: r.status for r in db_session.query(ScheduledReminder).filter_by(invitation_id=invitation.id)}
+    assert statuses == {"24_hours": ReminderStatus.SENT, "1_hour": ReminderStatus.PENDING}
+    queued = db_session.query(EmailOutbox).one()
+    assert queued.subject == "Reminder: Assessment Tomorrow - Reminder Assessment"
+    assert queued.recipients[0]["email"] == "interviewee@test.com"
+    assert queued.recipients[0]["substitutions"]["-name-"] == "Test Interviewee"
+
+def test_failed_reminder_stays_pending(client, db_session, test_recruiter, test_interviewee):
+    from datetime import datetime, timedelta, timezone
+    from models import EmailOutbox, Invitation, InvitationStatus, ReminderStatus, ScheduledReminder
+    from services import reminders
+    from services.email_service import email_service
+    from services.notification_scheduler import notification_scheduler
+    start = datetime.now(timezone.utc) + timedelta(hours=24) - timedelta(minutes=1)
+    assessment = Assessment(title="Flaky Assessment", creator_id=test_recruiter.id, scheduled_start_time=start)
+    db_session.add(assessment)
+    db_session.flush()
+    invitation = Invitation(assessment_id=assessment.id, interviewee_id=test_interviewee.id,
+                            status=InvitationStatus.ACCEPTED)
+    db_session.add(invitation)
+    db_session.flush()
+    reminders.schedule_invitation(db_session, invitation)
+    db_session.commit()
+
+    def failing_send(*args, **kwargs):
+        raise RuntimeError("outbox unavailable")
+
+    email_service.send_batch = failing_send
+    try:
+        with pytest.raises(RuntimeError):
+            notification_scheduler.process_due(db_session)
+    finally:
+        del email_service.send_batch
+    reminder = db_session.query(ScheduledReminder).filter_by(reminder_type="24_hours").one()
+    assert reminder.status == ReminderStatus.PENDING
+    assert db_session.query(EmailOutbox).count() == 0
+
+    assert notification_scheduler.process_due(db_session) == 1
+    db_session.refresh(reminder)
+    assert reminder.status == ReminderStatus.SENT
+    assert db_session.query(EmailOutbox).count() == 1
+
+def test_scheduler_status_reports_the_leader(client, db_session):
+    from services.leader_election import INSTANCE_ID, LeaderLock, record_election, record_tick
+    from services.notification_scheduler import notification_scheduler
+    lock = LeaderLock("test", 1, database_url="sqlite:///./test.db")
+    assert lock.try_acquire()
+    record_election(db_session, notification_scheduler.name)
+    record_tick(db_session, notification_scheduler.name)
+
+    body = client.get("/health/scheduler").json()
+    assert body["instance"] == INSTANCE_ID
+    assert body["leader"] == INSTANCE_ID
+    assert body["last_tick_at"] is not None
+    assert body["role"] in ("leader", "standby", "stopped")
+
+@contextmanager
+def codewars_stub(latency=0.0):
+    """Local stand-in for the Codewars API that counts requests, honours ETags and adds latency"""
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            kata_id = self.path.rsplit("/", 1)[-1]
+            calls.append((kata_id, self.headers.get("If-None-Match")))
+            time.sleep(latency)
+            if kata_id == "missing":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = json.dumps({"id": kata_id, "name": f"Kata {kata_id}", "description": "Solve it",
+                               "rank": {"name": "8 kyu"}, "tags": [], "languages": ["python"]}).encode()
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", calls
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_kata_cache_serves_repeat_lookups_without_network(db_session):
+    import time
+    from models import KataCatalog
+    from services.codewars_service import CodewarsService, KataCache
+    with codewars_stub() as (base_url, calls):
+        service = CodewarsService(base_url, KataCache(TestingSessionLocal))
+        assert service.get_kata_by_id("abc")["name"] == "Kata abc"
+        start = time.perf_counter()
+        for _ in range(100):
+            assert service.get_kata_by_id("abc")["name"] == "Kata abc"
+        assert (time.perf_counter() - start) / 100 < 0.001
+        assert calls == [("abc", None)]
+        assert db_session.get(KataCatalog, "abc").name == "Kata abc"
+
+        # A new process starts with an empty LRU but finds the kata in the database
+        service = CodewarsService(base_url, KataCache(TestingSessionLocal))
+        assert service.get_kata_by_id("abc")["name"] == "Kata abc"
+        assert len(calls) == 1
+
+        # Once stale it is revalidated, and a 304 keeps the cached payload
+        service = CodewarsService(base_url, KataCache(TestingSessionLocal, ttl=0))
+        assert service.get_kata_by_id("abc")["name"] == "Kata abc"
+        assert calls[-1] == ("abc", '"v1"')
+
+        assert service.get_kata_by_id("missing") is None
+
+def test_kata_search_fetches_concurrently(db_session):
+    import time
+    from services.codewars_service import CodewarsService, KataCache
+    with codewars_stub(latency=0.3) as (base_url, calls):
+        service = CodewarsService(base_url, KataCache(TestingSessionLocal))
+        kata_ids = ["k1", "k2", "missing", "k3", "k4", "k5"]
+        start = time.perf_counter()
+        katas = service.get_katas(kata_ids)
+        elapsed = time.perf_counter() - start
+        # Roughly one fetch's latency, not six; the failed fetch is left out
+        assert elapsed < 0.9
+        assert [kata["id"] for kata in katas] == ["k1", "k2", "k3", "k4", "k5"]
+
+        start = time.perf_counter()
+        assert len(service.get_katas(kata_ids[:2] + ["k6"], timeout=0.1)) == 2
+        assert time.perf_counter() - start < 0.25
+        time.sleep(0.3)  # let the abandoned fetch finish before the tables are dropped
+
+def test_kata_catalog_search(client, db_session, test_recruiter):
+    import time
+    from services import kata_catalog
+    words = ["array", "string", "graph", "matrix", "prime", "sort"]
+    kata_catalog.upsert_katas(db_session, [
+        {
+            "id": f"kata{index}",
+            "name": f"{words[index % 6].title()} puzzle {index}",
+            "description": f"Work with a {words[(index + 1) % 6]}",
+            "rank": {"name": f"{index % 5 + 4} kyu"},
+            "tags": ["Algorithms"],
+            "languages": ["Python"] if index % 3 != 2 else ["JavaScript"],
+        }
+        for index in range(3000)
+    ])
+    assert kata_catalog.load_snapshot(db_session) == 5
+    db_session.commit()
+    headers = login(client, "recruiter")
+
+    response = client.get("/api/codewars/katas/search", headers=headers, params={"query": "jad"})
+    assert [k["title"] for k in response.json()] == ["Jaden Casing Strings"]
+
+    start = time.perf_counter()
+    response = client.get("/api/codewars/katas/search", headers=headers, params={
+        "query": "prim", "difficulty": "5 kyu", "language": "python", "limit": 10
+    })
+    assert time.perf_counter() - start < 0.5
+    katas = response.json()
+    assert len(katas) == 10
+    assert all(k["difficulty"] == "5 kyu" and "python" in k["languages"] for k in katas)
+    # Name matches rank ahead of description matches
+    assert katas[0]["title"].startswith("Prime")
+
+    assert len(client.get("/api/codewars/katas/search", headers=headers).json()) == 20
+    assert client.get("/api/codewars/katas/search", headers=headers, params={"limit": 1000}).status_code == 422
+
+def test_seeding_falls_back_to_the_snapshot_when_offline(db_session):
+    from seed_katas import SEED_KATA_IDS, seed
+    from services import kata_catalog
+    from services.codewars_service import CodewarsService, KataCache
+    described, blank, stale = SEED_KATA_IDS[:3]
+    kata_catalog.upsert_katas(db_session, [
+        {"id": described, "name": "Who likes it?", "description": "Build the likes text"},
+        {"id": blank, "name": "Find the odd int", "description": ""},
+    ])
+    db_session.commit()
+    with codewars_stub() as (base_url, calls):
+        pass  # the stub is gone, so its port refuses connections
+    offline = CodewarsService(base_url, KataCache(TestingSessionLocal))
+    seed(db_session, offline)
+    # A snapshot entry without a description is skipped rather than saved blank
+    questions = {q.codewars_kata_id: q for q in db_session.query(Question)}
+    assert set(questions) == {described}
+    assert questions[described].description == "Build the likes text"
+
+    # A question left blank by an earlier run is filled in once Codewars is back
+    db_session.add(Question(assessment_id=questions[described].assessment_id, question_type=QuestionType.CODING,
+                            title="Old", description="", codewars_kata_id=stale))
+    db_session.commit()
+    with codewars_stub() as (base_url, calls):
+        seed(db_session, CodewarsService(base_url, KataCache(TestingSessionLocal)))
+    assert len(calls) == len(SEED_KATA_IDS) - 1
+    assert db_session.query(Question).count() == len(SEED_KATA_IDS)
+    assert db_session.query(Question).filter_by(codewars_kata_id=stale).one().description == "Solve it"
+
+def test_snapshot_covers_the_seed_katas(db_session, tmp_path):
+    import shutil
+    from models import KataCatalog, KataCache as CachedKata
+    from seed_katas import SEED_KATA_IDS
+    from services import kata_catalog
+    from services.codewars_service import CodewarsService, KataCache
+    path = str(tmp_path / "kata_catalog.json")
+    shutil.copy(kata_catalog.SNAPSHOT_PATH, path)
+    with codewars_stub() as (base_url, calls):
+        service = CodewarsService(base_url, KataCache(TestingSessionLocal))
+        assert kata_catalog.regenerate_snapshot(db_session, service, path) == len(SEED_KATA_IDS)
+    with open(path) as f:
+        katas = {kata["id"]: kata for kata in json.load(f)["katas"]}
+    assert set(katas) == set(SEED_KATA_IDS)
+    assert all(kata["description"] for kata in katas.values())
+
+    # Offline, the katas already in the snapshot are kept rather than dropped
+    db_session.query(KataCatalog).delete()
+    db_session.commit()
+    offline = CodewarsService(base_url, KataCache(TestingSessionLocal))
+    assert kata_catalog.regenerate_snapshot(db_session, offline, path) == len(SEED_KATA_IDS)
+
+    # A snapshot with blank seed katas is refused and left as it was
+    db_session.query(KataCatalog).delete()
+    db_session.query(CachedKata).delete()
+    db_session.commit()
+    with open(path) as f:
+        snapshot = json.load(f)
+    snapshot["katas"][0]["description"] = ""
+    with open(path, "w") as f:
+        json.dump(snapshot, f)
+    cold = CodewarsService(base_url, KataCache(TestingSessionLocal))
+    with pytest.raises(RuntimeError, match=snapshot["katas"][0]["id"]):
+        kata_catalog.regenerate_snapshot(db_session, cold, path)
+    with open(path) as f:
+        assert json.load(f) == snapshot
+
+def test_migrations_run_once_and_then_only_check_the_version(tmp_path):
+    from sqlalchemy import inspect, text
+    import migrate
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as conn:
+        conn.execute(text("CREATE TABLE questions (id INTEGER PRIMARY KEY, assessment_id INTEGER, question_text TEXT)"))
+
+    assert migrate.upgrade(legacy) == len(migrate.MIGRATIONS)
+    assert "correct_answers" in {c["name"] for c in inspect(legacy).get_columns("questions")}
+    assert migrate.current_version(legacy) == (migrate.LATEST_VERSION, migrate.schema_fingerprint(legacy.dialect))
+
+    statements = []
+    event.listen(legacy, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert migrate.upgrade(legacy) == 0
+    assert len(statements) == 1
+
+    # A model change alone (here, a dropped index) is repaired without a numbered step
+    with legacy.begin() as conn:
+        conn.execute(text("UPDATE schema_version SET fingerprint = 'old'"))
+        conn.execute(text("DROP INDEX ix_scheduled_reminders_status_due_at"))
+    assert migrate.upgrade(legacy) == 0
+    assert "ix_scheduled_reminders_status_due_at" in {i["name"] for i in inspect(legacy).get_indexes("scheduled_reminders")}
+    legacy.dispose()
+
+def test_upgrading_a_populated_baseline_database(tmp_path):
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import inspect, text
+    import migrate
+    legacy = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    # The schema as it was before the numbered migrations: no new tables or columns
+    baseline_tables = ["users", "assessments", "questions", "invitations", "submissions", "answers", "feedbacks",
+                       "notifications"]
+    Base.metadata.create_all(legacy, tables=[Base.metadata.tables[name] for name in baseline_tables])
+    start = datetime.now(timezone.utc) + timedelta(days=3)
+    with legacy.begin() as conn:
+        conn.execute(text("DROP INDEX uq_answers_submission_question"))
+        conn.execute(text("ALTER TABLE assessments DROP COLUMN answer_key_version"))
+        conn.execute(text("ALTER TABLE submissions DROP COLUMN sync_seq"))
+        conn.execute(text("ALTER TABLE answers DROP COLUMN content_hash"))
+        conn.execute(text(
+            "INSERT INTO users (id, email, username, hashed_password, role) VALUES "
+            "(1, 'r@test.com', 'r', 'x', 'RECRUITER'), (2, 'c@test.com', 'c', 'x', 'INTERVIEWEE')"
+        ))
+        conn.execute(text(
+            "INSERT INTO assessments (id, title, creator_id, scheduled_start_time) VALUES (1, 'Old', 1, :start)"
+        ), {"start": start})
+        conn.execute(text("INSERT INTO questions (id, assessment_id, question_type, title, points) "
+                          "VALUES (1, 1, 'MULTIPLE_CHOICE', 'Q', 10)"))
+        conn.execute(text("INSERT INTO invitations (id, assessment_id, interviewee_id, status) "
+                          "VALUES (1, 1, 2, 'ACCEPTED')"))
+        conn.execute(text("INSERT INTO submissions (id, assessment_id, interviewee_id, status, score, submitted_at) "
+                          "VALUES (1, 1, 2, 'SUBMITTED', 10, :start)"), {"start": start})
+        conn.execute(text("INSERT INTO answers (id, submission_id, question_id, answer_text) "
+                          "VALUES (1, 1, 1, 'A'), (2, 1, 1, 'B')"))
+
+    assert migrate.upgrade(legacy) == len(migrate.MIGRATIONS)
+    assert migrate.current_version(legacy) == (migrate.LATEST_VERSION, migrate.schema_fingerprint(legacy.dialect))
+    assert "answer_key_version" in {c["name"] for c in inspect(legacy).get_columns("assessments")}
+    with legacy.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM scheduled_reminders")).scalar() == 2
+        assert conn.execute(text("SELECT submission_count FROM assessment_stats")).scalar() == 1
+        assert conn.execute(text("SELECT answer_text FROM answers")).scalars().all() == ["B"]
+
+def test_autosave_writes_only_changed_answers(client, db_session, test_recruiter, test_interviewee):
+    from services import answer_store
+    from services.autosave_buffer import autosave_buffer
+    assessment = Assessment(title="Autosave", creator_id=test_recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db_session.add(assessment)
+    db_session.commit()
+    submission = Submission(
+        assessment_id=assessment.id,
+        interviewee_id=test_interviewee.id,
+        status=SubmissionStatus.IN_PROGRESS
+    )
+    db_session.add(submission)
+    db_session.commit()
+    add_answered_questions(db_session, assessment, submission, 3)
+    answers = {a.question_id: a for a in db_session.query(Answer)}
+    first, second, third = sorted(answers)
+    headers = login(client, "interviewee")
+
+    payload = {"answers": {str(first): "A", str(second): "B", str(third): "A"}}
+    assert client.post(f"/api/submissions/{submission.id}/save", json=payload, headers=headers).status_code == 200
+    autosave_buffer.flush(db_session)
+    # Unchanged on resave: the upsert's WHERE skips every row
+    assert answer_store.save_answers(db_session, submission.id, {first: "A", second: "B", third: "A"}) == []
+    db_session.rollback()
+
+    payload = {"answers": {str(first): "A", str(second): ["A", "B"]}}
+    with count_queries() as statements:
+        response = client.post(f"/api/submissions/{submission.id}/save", json=payload, headers=headers)
+        autosave_buffer.flush(db_session)
+    assert response.status_code == 200
+    assert sum(s.startswith("INSERT") for s in statements) == 1
+    assert not any(s.startswith("DELETE") and "feedbacks" in s for s in statements)
+
+    db_session.expire_all()
+    saved = {a.question_id: a for a in db_session.query(Answer)}
+    assert set(saved) == {first, second}
+    # The answer kept its row and its grading
+    assert saved[first].id == answers[first].id and saved[first].points_earned == 10
+    assert saved[second].selected_answers == ["A", "B"] and saved[second].answer_text is None
+
+def test_autosave_buffer_coalesces_and_survives_a_crash(client, db_session, test_recruiter, test_interviewee, tmp_path):
+    from services.autosave_buffer import AutosaveBuffer, autosave_buffer
+    assessment = Assessment(title="Buffered", creator_id=test_recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db_session.add(assessment)
+    db_session.commit()
+    submission = Submission(
+        assessment_id=assessment.id,
+        interviewee_id=test_interviewee.id,
+        status=SubmissionStatus.IN_PROGRESS
+    )
+    db_session.add(submission)
+    db_session.commit()
+    questions = [
+        Question(assessment_id=assessment.id, question_type=QuestionType.MULTIPLE_CHOICE, title=f"Q{index}",
+                 points=5, order=index, options=["A", "B"], correct_answer="B")
+        for index in range(2)
+    ]
+    db_session.add_all(questions)
+    db_session.commit()
+
+    buffer = AutosaveBuffer(TestingSessionLocal, durability="journal", journal_dir=str(tmp_path))
+    for keystroke in range(20):
+        buffer.save(None, submission.id, {questions[0].id: "A" * keystroke, questions[1].id: "B"})
+    assert buffer.transactions == 0
+    assert buffer.pending(submission.id)[questions[0].id]["answer_text"] == "A" * 19
+
+    # The process dies before flushing; the next one replays its journal
+    buffer.journal.close()
+    survivor = AutosaveBuffer(TestingSessionLocal, durability="journal", journal_dir=str(tmp_path))
+    assert survivor.recover() == 20
+    assert survivor.flush() == 2
+    assert survivor.transactions == 1
+    assert {a.answer_text for a in db_session.query(Answer)} == {"A" * 19, "B"}
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".jsonl"] == [f"autosave-{survivor.journal.owner}-2.jsonl"]
+
+    # Submit flushes what the candidate saved last before grading it
+    headers = login(client, "interviewee")
+    for answer in ("B", "A", "B"):
+        response = client.post(f"/api/submissions/{submission.id}/answers", headers=headers, json={
+            "submission_id": submission.id, "question_id": questions[0].id, "answer_text": answer
+        })
+        assert response.status_code == 201 and response.json()["answer_text"] == answer
+    if autosave_buffer.buffering:
+        assert autosave_buffer.pending(submission.id)
+    response = client.post(f"/api/submissions/{submission.id}/submit", headers=headers)
+    assert response.json()["score"] == 10
+    survivor.journal.close()
+
+def test_autosave_rejects_foreign_questions_and_isolates_bad_rows(client, db_session, test_recruiter, test_interviewee):
+    from services.autosave_buffer import AutosaveBuffer
+    assessment = Assessment(title="Strict", creator_id=test_recruiter.id, status=AssessmentStatus.PUBLISHED)
+    other = Assessment(title="Other", creator_id=test_recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db_session.add_all([assessment, other])
+    db_session.commit()
+    question, foreign = (
+        Question(assessment_id=owner.id, question_type=QuestionType.SUBJECTIVE, title="Q", order=0)
+        for owner in (assessment, other)
+    )
+    submission = Submission(assessment_id=assessment.id, interviewee_id=test_interviewee.id,
+                            status=SubmissionStatus.IN_PROGRESS)
+    db_session.add_all([question, foreign, submission])
+    db_session.commit()
+    headers = login(client, "interviewee")
+
+    response = client.post(f"/api/submissions/{submission.id}/answers", headers=headers, json={
+        "submission_id": submission.id, "question_id": foreign.id, "answer_text": "A"
+    })
+    assert response.status_code == 400
+    response = client.post(f"/api/submissions/{submission.id}/save", headers=headers,
+                           json={"answers": {str(question.id): "A", str(foreign.id): "B"}})
+    assert response.status_code == 400
+    response = client.post(f"/api/submissions/{submission.id}/sync", headers=headers,
+                           json={"ops": [{"seq": 1, "question_id": foreign.id, "answer_text": "B"}]})
+    assert response.status_code == 400
+    assert db_session.query(Answer).count() == 0
+
+    # A row the database rejects is dropped; the rest of the batch is still written
+    strict = create_engine(SQLALCHEMY_DATABASE_URL)
+    event.listen(strict, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    buffer = AutosaveBuffer(sessionmaker(bind=strict), durability="buffered")
+    buffer.save(None, submission.id, {question.id: "A", 999999: "B"})
+    assert buffer.flush() == 1
+    assert not buffer.pending(submission.id)
+    assert [a.answer_text for a in db_session.query(Answer)] == ["A"]
+    strict.dispose()
+
+    # Saves still buffered when the submission is graded are dropped, not written over the graded answers
+    buffer = AutosaveBuffer(TestingSessionLocal, durability="buffered")
+    buffer.save(None, submission.id, {question.id: "Late"})
+    submission.status = SubmissionStatus.GRADED
+    db_session.commit()
+    assert buffer.flush() == 0
+    assert not buffer.pending(submission.id)
+    db_session.expire_all()
+    assert [a.answer_text for a in db_session.query(Answer)] == ["A"]
+
+def test_answer_sync_is_idempotent_and_resumable(client, db_session, test_recruiter, test_interviewee):
+    assessment = Assessment(title="Sync", creator_id=test_recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db_session.add(assessment)
+    db_session.commit()
+    submission = Submission(
+        assessment_id=assessment.id,
+        interviewee_id=test_interviewee.id,
+        status=SubmissionStatus.IN_PROGRESS
+    )
+    db_session.add(submission)
+    db_session.commit()
+    questions = [
+        Question(assessment_id=assessment.id, question_type=QuestionType.SUBJECTIVE, title=f"Q{index}", order=index)
+        for index in range(3)
+    ]
+    db_session.add_all(questions)
+    db_session.commit()
+    first, second, third = (question.id for question in questions)
+    headers = login(client, "interviewee")
+    url = f"/api/submissions/{submission.id}/sync"
+
+    def sync(*ops):
+        response = client.post(url, headers=headers, json={"ops": [
+            {"seq": seq, "question_id": question_id, **fields} for seq, question_id, fields in ops
+        ]})
+        assert response.status_code == 200, response.text
+        return response.json()["acked_seq"], response.json()["applied"]
+
+    assert sync() == (0, 0)
+    assert sync((1, first, {"answer_text": "a"}), (2, second, {"code_solution": "x = 1"}),
+                (3, first, {"answer_text": "ab"})) == (3, 3)
+    # The acknowledgement was lost: the client resends from seq 2 together with new work
+    assert sync((2, second, {"code_solution": "x = 1"}), (3, first, {"answer_text": "ab"}),
+                (4, second, {"op": "delete"}), (5, third, {"selected_answers": ["A"]})) == (5, 2)
+    # Seq 6 never arrived; 7 waits for it
+    assert sync((7, first, {"answer_text": "lost"})) == (5, 0)
+    assert sync((6, first, {"answer_text": "abc"}), (7, first, {"answer_text": "abcd"})) == (7, 2)
+
+    db_session.expire_all()
+    answers = {a.question_id: a for a in db_session.query(Answer)}
+    assert set(answers) == {first, third}
+    assert answers[first].answer_text == "abcd"
+    assert answers[third].selected_answers == ["A"]
+    assert db_session.get(Submission, submission.id).sync_seq == 7
+
+def test_submit_grades_multiple_choice_and_multiple_answer(client, db_session, test_recruiter, test_interviewee):
+    from services import grading
+    recruiter_headers = login(client, "recruiter")
+    response = client.post("/api/assessments", headers=recruiter_headers, json={"title": "Graded", "questions": [
+        {"question_type": "multiple_choice", "title": "Pick", "points": 4, "options": ["A", "B"], "correct_answer": "B"},
+        {"question_type": "multiple_answer", "title": "Pick all", "points": 6,
+         "options": ["A", "B", "C", "D"], "correct_answers": ["A", "C", "D"]},
+        {"question_type": "subjective", "title": "Explain", "points": 10},
+    ]})
+    assessment_id = response.json()["id"]
+    pick, pick_all, explain = (q["id"] for q in response.json()["questions"])
+    submission = Submission(
+        assessment_id=assessment_id,
+        interviewee_id=test_interviewee.id,
+        status=SubmissionStatus.IN_PROGRESS
+    )
+    db_session.add(submission)
+    db_session.commit()
+
+    headers = login(client, "interviewee")
+    for answer in ({"question_id": pick, "answer_text": " B "},
+                   {"question_id": pick_all, "selected_answers": ["C", "A", "B"]},
+                   {"question_id": explain, "answer_text": "Because"}):
+        client.post(f"/api/submissions/{submission.id}/answers", headers=headers,
+                    json={"submission_id": submission.id, **answer})
+    with count_queries() as statements:
+        response = client.post(f"/api/submissions/{submission.id}/submit", headers=headers)
+    # Two of three right picks minus one wrong pick: a third of the points
+    assert response.json()["score"] == 6
+    assert sum(s.startswith("UPDATE answers") for s in statements) == 1
+    db_session.expire_all()
+    graded = {a.question_id: (a.is_correct, a.points_earned) for a in db_session.query(Answer)}
+    assert graded == {pick: (True, 4), pick_all: (False, 2), explain: (None, 0)}
+
+    # Adding a question bumps the key version, so the next grading compiles a new key
+    compiled = grading.answer_keys.compiled
+    client.post(f"/api/assessments/{assessment_id}/questions", headers=recruiter_headers, json={
+        "question_type": "multiple_choice", "title": "More", "options": ["A"], "correct_answer": "A"
+    })
+    assessment = db_session.get(Assessment, assessment_id)
+    db_session.refresh(assessment)
+    assert assessment.answer_key_version == 1
+    key = grading.answer_keys.get(db_session, assessment)
+    assert grading.answer_keys.compiled == compiled + 1 and len(key) == 3
+    assert grading.grade_answers(key, [(pick_all, None, ["A", "C", "D"])]) == [(pick_all, True, 6)]
+    assert grading.grade_answers(key, [(pick_all, None, ["A", "B"])], partial_credit=True)[0].points_earned == 0
+    assert grading.grade_answers(key, [(pick_all, None, ["A", "C"])], partial_credit=False)[0].points_earned == 0
+
+def test_editing_the_answer_key_regrades_submissions(client, db_session, test_recruiter, test_interviewee):
+    from datetime import datetime
+    from models import AssessmentStats
+    from services import grading
+    assessment = Assessment(title="Typo in key", creator_id=test_recruiter.id, status=AssessmentStatus.PUBLISHED)
+    db_session.add(assessment)
+    db_session.commit()
+    question = Question(assessment_id=assessment.id, question_type=QuestionType.MULTIPLE_CHOICE, title="Q",
+                        points=5, options=["A", "B"], correct_answer="A")
+    essay = Question(assessment_id=assessment.id, question_type=QuestionType.SUBJECTIVE, title="Essay", points=5)
+    db_session.add_all([question, essay])
+    db_session.commit()
+    submissions = []
+    for index, choice in enumerate(["B", "B", "A", "B", "A", "B"]):
+        submission = Submission(
+            assessment_id=assessment.id,
+            interviewee_id=test_interviewee.id,
+            status=SubmissionStatus.IN_PROGRESS if index == 5 else SubmissionStatus.GRADED,
+            submitted_at=None if index == 5 else datetime.utcnow()
+        )
+        db_session.add(submission)
+        db_session.flush()
+        db_session.add_all([
+            Answer(submission_id=submission.id, question_id=question.id, answer_text=choice),
+            # Graded by hand; a regrade keeps these points
+            Answer(submission_id=submission.id, question_id=essay.id, answer_text="...", points_earned=3),
+        ])
+        db_session.flush()
+        if index < 5:
+            submission.score = grading.grade_submission(db_session, submission) + 3
+        submissions.append(submission)
+    db_session.commit()
+    headers = login(client, "recruiter")
+
+    response = client.put(f"/api/assessments/{assessment.id}/questions/{question.id}", headers=headers,
+                          json={"correct_answer": "B"})
+    assert response.status_code == 200 and response.json()["correct_answer"] == "B"
+    db_session.expire_all()
+    assert [s.score for s in db_session.query(Submission).order_by(Submission.id)] == [8, 8, 3, 8, 3, 0]
+    assert db_session.query(AssessmentStats).filter_by(assessment_id=assessment.id).one().score_sum == 30
+
+    reports = list(grading.regrade_chunks(db_session, db_session.get(Assessment, assessment.id), chunk_size=2))
+    assert [r.get("submissions") for r in reports] == [2, 2, 1, 5]
+    assert reports[-1] == {"done": True, "submissions": 5, "answers_changed": 0, "submissions_changed": 0}
+
+    # Editing a title leaves the key, and the grades, alone
+    response = client.put(f"/api/assessments/{assessment.id}/questions/{question.id}", headers=headers,
+                          json={"title": "Renamed"})
+    assert response.status_code == 200
+    response = client.post(f"/api/assessments/{assessment.id}/regrade?stream=true", headers=headers)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {"done": True, "submissions": 5, "answers_changed": 0, "submissions_changed": 0}
+    assert db_session.get(Assessment, assessment.id).answer_key_version == 1
+
+    # Points feed both the score and the maximum
+    response = client.put(f"/api/assessments/{assessment.id}/questions/{question.id}", headers=headers,
+                          json={"points": None})
+    assert response.status_code == 422
+    response = client.put(f"/api/assessments/{assessment.id}/questions/{question.id}", headers=headers,
+                          json={"points": 10})
+    assert response.status_code == 200
+    db_session.expire_all()
+    graded = db_session.query(Submission).filter(Submission.submitted_at.isnot(None)).order_by(Submission.id).all()
+    assert [(s.score, s.max_score) for s in graded] == [(13, 15), (13, 15), (3, 15), (13, 15), (3, 15)]
+
+    # A question that is no longer auto-graded keeps none of its auto-awarded points
+    response = client.put(f"/api/assessments/{assessment.id}/questions/{question.id}", headers=headers,
+                          json={"question_type": "subjective"})
+    assert response.status_code == 200
+    db_session.expire_all()
+    assert [s.score for s in graded] == [3, 3, 3, 3, 3]
+    assert {a.is_correct for a in db_session.query(Answer).filter_by(question_id=question.id)} == {None}
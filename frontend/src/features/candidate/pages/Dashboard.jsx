@@ -18,19 +18,25 @@ export default function CandidateDashboard() {
 
   const [activeTab, setActiveTab] = useState("upcoming");
 
+  // Feedback is only shown on the completed and results tabs
+  const submissionDetail = activeTab === "completed" || activeTab === "results" ? "full" : "summary";
+
   useEffect(() => {
     dispatch(fetchInvitations());
-    dispatch(fetchSubmissions());
     dispatch(fetchAssessments());
-    
+  }, [dispatch]);
+
+  useEffect(() => {
+    dispatch(fetchSubmissions(submissionDetail));
+
     // Set up polling for real-time updates
     const interval = setInterval(() => {
       dispatch(fetchInvitations());
-      dispatch(fetchSubmissions());
+      dispatch(fetchSubmissions(submissionDetail));
     }, 30000); // Poll every 30 seconds
 
     return () => clearInterval(interval);
-  }, [dispatch]);
+  }, [dispatch, submissionDetail]);
 
   const invitations = invitationsState.items || [];
   const submissions = submissionsState.items || [];
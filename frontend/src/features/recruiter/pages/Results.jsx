@@ -55,10 +55,14 @@ export default function Results() {
   }, [assessments]);
 
   useEffect(() => {
-    dispatch(fetchSubmissions());
     dispatch(fetchAssessments());
   }, [dispatch]);
 
+  // Only the analytics view reads answers; the table needs the summaries alone
+  useEffect(() => {
+    dispatch(fetchSubmissions(showAnalytics ? "full" : "summary"));
+  }, [dispatch, showAnalytics]);
+
   const filteredSubmissions = useMemo(() => {
     if (!filterAssessment) return submissions;
     return submissions.filter((s) => s.assessment_id === Number(filterAssessment));
@@ -4,7 +4,7 @@ import PageWrapper from "../../../components/layout/PageWrapper";
 import Button from "../../../components/common/Button";
 import { useAppDispatch, useAppSelector } from "../../../app/hooks";
 import { fetchAssessments } from "../../assessments/assessmentSlice";
-import { fetchSubmissions } from "../../submissions/submissionsSlice";
+import { fetchSubmissionById } from "../../submissions/submissionsSlice";
 import apiClient from "../../../services/apiClient";
 import { detectQuestionType, isCodingQuestion, isMultipleChoiceQuestion, isMultipleAnswerQuestion } from "../../../utils/questionTypes";
 import BackToDashboardButton from "../../../components/common/BackToDashboardButton";
@@ -15,7 +15,7 @@ export default function SubmissionDetail() {
   const dispatch = useAppDispatch();
   const navigate = useNavigate();
 
-  const { items: submissions, loading: submissionsLoading } = useAppSelector((s) => s.submissions);
+  const { submission: loadedSubmission, loading: submissionsLoading } = useAppSelector((s) => s.submissions);
   const { items: assessments, loading: assessmentsLoading } = useAppSelector((s) => s.assessments);
 
   const [submission, setSubmission] = useState(null);
@@ -26,12 +26,12 @@ export default function SubmissionDetail() {
   const [isSaving, setIsSaving] = useState(false);
 
   useEffect(() => {
-    dispatch(fetchSubmissions());
+    dispatch(fetchSubmissionById(id));
     dispatch(fetchAssessments());
-  }, [dispatch]);
+  }, [dispatch, id]);
 
   useEffect(() => {
-    const sub = submissions.find((s) => s.id === Number(id));
+    const sub = loadedSubmission?.id === Number(id) ? loadedSubmission : null;
     if (sub) {
       setSubmission(sub);
       // Convert answers array to object for easier access
@@ -62,7 +62,7 @@ export default function SubmissionDetail() {
       }
       setScores(initScores);
     }
-  }, [submissions, assessments, id]);
+  }, [loadedSubmission, assessments, id]);
 
   useEffect(() => {
     const total = Object.values(scores).reduce((sum, s) => sum + (Number(s) || 0), 0);
@@ -88,7 +88,7 @@ export default function SubmissionDetail() {
       await apiClient.post(`/submissions/${submission.id}/grade`);
       
       // Refresh the data
-      dispatch(fetchSubmissions());
+      dispatch(fetchSubmissionById(submission.id));
     } catch (error) {
       console.error('Save error:', error);
     }
@@ -118,7 +118,7 @@ export default function SubmissionDetail() {
       <PageWrapper>
         <div className="max-w-4xl mx-auto p-6">
           <p className="text-sm text-slate-600">Submission not found.</p>
-          <p className="text-xs text-slate-500 mt-2">Debug: ID={id}, Submissions={submissions.length}</p>
+          <p className="text-xs text-slate-500 mt-2">Debug: ID={id}</p>
         </div>
       </PageWrapper>
     );
@@ -12,9 +12,10 @@ const initialState = {
 
 export const fetchSubmissions = createAsyncThunk(
   "submissions/fetchSubmissions",
-  async (_, { rejectWithValue }) => {
+  // "summary" leaves out answers and feedback; pass "full" only where those are shown
+  async (detail = "summary", { rejectWithValue }) => {
     try {
-      const { data } = await apiClient.get("/api/submissions");
+      const { data } = await apiClient.get("/api/submissions", { params: { detail } });
       return data;
     } catch (err) {
       const detail = err?.response?.data?.detail;